@@ -1,23 +1,28 @@
-from flask import Flask, render_template, jsonify, Response
+import time
+_startup_start = time.perf_counter()
+from flask import Flask, render_template, jsonify, Response, request, g, send_file, url_for
 from collections import deque
 import random
-import time
-import matplotlib.pyplot as plt
 import io
+import math
+import atexit
 import os
-import subprocess
+import threading
 import base64
-import mariadb
 from datetime import datetime, timedelta
-from src.utils.camera import get_camera
-from src.utils.edgedevice import load_models  # Import from edge device
-# Models----------------
-from src.models.time_lapse import capture_single_photo
-from src.models.analyze_image import analyze_image
-from src.models.object_detection import generate_frames as generate_frames_with_detection  # Import object detection
-import threading
+from src.utils.warmup import Warmup
+from src.utils.metrics import REGISTRY, DB_QUERY_SECONDS, DB_CONNECT_FAILURES, HTTP_REQUEST_SECONDS, TASK_SECONDS, gauge
+from src.utils.events import EventBus, PeriodicTask
+from src.models.time_lapse_scheduler import TimeLapseScheduler
+from src.models.capture_index import CaptureIndex
+from src.models.analysis_jobs import AnalysisJobService, QueueFullError
+from src.models.model_config import MODELS
 import logging
 
+# Heavy modules (matplotlib, mariadb, OpenCV, tflite, GStreamer) are imported
+# where they are used or by the startup warm-up below, so the dashboard can
+# serve requests before the camera and models are ready.
+
 app = Flask(__name__)
 
 # Configure logging
@@ -29,67 +34,230 @@ app.config['MYSQL_USER'] = 'rootdash_user'
 app.config['MYSQL_PASSWORD'] = 'your_password'
 app.config['MYSQL_DB'] = 'rootdash'
 
+# Video stream configuration: "pipeline" runs capture, motion, inference and
+# encoding on separate threads; "serial" runs them one after another.
+app.config['STREAM_MODE'] = os.getenv("STREAM_MODE", "pipeline")
+
+# Default JPEG quality and frame-rate cap for /video_feed; clients can ask for a
+# smaller tier with ?w=<width>&q=<quality>&fps=<rate>
+app.config['STREAM_JPEG_QUALITY'] = int(os.getenv("STREAM_JPEG_QUALITY", 80))
+app.config['STREAM_MAX_FPS'] = float(os.getenv("STREAM_MAX_FPS", 30))
+# Encode with simplejpeg (libjpeg-turbo) when installed instead of cv2.imencode
+app.config['USE_SIMPLEJPEG'] = os.getenv("USE_SIMPLEJPEG", "1") == "1"
+
+# Target inference rate per model category (Hz) and how many models may run on one frame
+app.config['INFERENCE_RATES'] = {
+    "plants": 0.2,
+    "bugs": 5,
+    "birds": 2,
+    "flowers": 0.2,
+    "animals": 1,
+}
+app.config['INFERENCE_MAX_PER_FRAME'] = int(os.getenv("INFERENCE_MAX_PER_FRAME", 1))
+
+# Minimum probability (0-1) for a result to be reported, and how many candidate labels to keep
+app.config['CONFIDENCE_THRESHOLDS'] = {
+    "plants": 0.3,
+    "bugs": 0.3,
+    "birds": 0.3,
+    "flowers": 0.3,
+    "animals": 0.3,
+}
+app.config['DETECTION_TOP_K'] = 3
+
+# Detection mode: "full" classifies the whole frame, "motion" skips inference on a
+# still scene and classifies the moving regions with the ROI categories
+app.config['DETECTION_MODE'] = os.getenv("DETECTION_MODE", "full")
+app.config['ROI_CATEGORIES'] = ["bugs", "birds", "animals"]
+app.config['ROI_MAX_REGIONS'] = 3
+
+# Motion detection: algorithm ("mog2", "knn" or "diff"), downscale factor applied before
+# detection, minimum moving area in full-resolution pixels, and optional regions of
+# interest as (x, y, w, h) rectangles or polygons in full-resolution pixels
+app.config['MOTION_ALGORITHM'] = os.getenv("MOTION_ALGORITHM", "mog2")
+app.config['MOTION_SCALE'] = float(os.getenv("MOTION_SCALE", 0.25))
+app.config['MOTION_MIN_AREA'] = int(os.getenv("MOTION_MIN_AREA", 500))
+app.config['MOTION_ROI'] = None
+
+# Reuse inference results while the scene is unchanged: mean grey-level difference
+# of a 16x16 thumbnail below the threshold counts as the same scene (0 disables the cache)
+app.config['INFERENCE_CACHE_THRESHOLD'] = float(os.getenv("INFERENCE_CACHE_THRESHOLD", 4.0))
+app.config['INFERENCE_CACHE_TTL'] = float(os.getenv("INFERENCE_CACHE_TTL", 300))
+
+# Collect stage timings, counters and gauges for /metrics (cheap enough to leave on)
+app.config['METRICS_ENABLED'] = os.getenv("METRICS_ENABLED", "1") == "1"
+REGISTRY.enabled = app.config['METRICS_ENABLED']
+
+# Server-sent events: while /events clients are subscribed to them, sensors are sampled and
+# pushed every SENSOR_SAMPLE_INTERVAL seconds; a reading is stored in MariaDB at most every
+# SENSOR_STORE_INTERVAL seconds (and then whether anyone is watching or not);
+# growth data is checked for changes every GROWTH_CHECK_INTERVAL seconds
+app.config['SENSOR_SAMPLE_INTERVAL'] = float(os.getenv("SENSOR_SAMPLE_INTERVAL", 2))
+app.config['SENSOR_STORE_INTERVAL'] = float(os.getenv("SENSOR_STORE_INTERVAL", 60))
+app.config['GROWTH_CHECK_INTERVAL'] = float(os.getenv("GROWTH_CHECK_INTERVAL", 30))
+app.config['EVENTS_HEARTBEAT'] = float(os.getenv("EVENTS_HEARTBEAT", 15))
+
+# Detection history: number of detections kept in memory (about 33 bytes each) and
+# how often new ones are bulk-inserted into the detection_history table (seconds)
+app.config['DETECTION_HISTORY_CAPACITY'] = int(os.getenv("DETECTION_HISTORY_CAPACITY", 100000))
+app.config['DETECTION_FLUSH_INTERVAL'] = float(os.getenv("DETECTION_FLUSH_INTERVAL", 60))
+# Most detections one /detection_history response returns
+app.config['DETECTION_HISTORY_MAX_LIMIT'] = int(os.getenv("DETECTION_HISTORY_MAX_LIMIT", 5000))
+
+# Camera capture: one persistent capture service feeds both the live stream and the
+# time-lapse. "auto" uses a GStreamer pipeline when the bindings are installed and
+# OpenCV otherwise. Stills are full-resolution grabs ("still") or the newest live frame ("latest").
+app.config['CAPTURE_BACKEND'] = os.getenv("CAPTURE_BACKEND", "auto")
+app.config['CAMERA_DEVICE'] = os.getenv("CAMERA_DEVICE", "/dev/video0")
+app.config['CAMERA_FRAMERATE'] = int(os.getenv("CAMERA_FRAMERATE", 30))
+app.config['CAMERA_LIVE_SIZE'] = (640, 480)
+app.config['CAMERA_STILL_SIZE'] = None  # e.g. (1920, 1080); None keeps the live size
+app.config['TIME_LAPSE_CAPTURE_MODE'] = os.getenv("TIME_LAPSE_CAPTURE_MODE", "still")
+
 # Time-lapse configuration
 app.config['TIME_LAPSE_FOLDER'] = os.path.expanduser("~/BASE/dev_tpu/coral/dashboard/media/time_lapse")
 
 # Ensure the time-lapse folder exists
 os.makedirs(app.config['TIME_LAPSE_FOLDER'], exist_ok=True)
 
+# Time-lapse jobs are kept in this file so schedules survive restarts
+app.config['TIME_LAPSE_JOBS_FILE'] = os.path.join(os.path.dirname(app.config['TIME_LAPSE_FOLDER']), "time_lapse_jobs.json")
+app.config['TIME_LAPSE_DEFAULT_INTERVAL'] = float(os.getenv("TIME_LAPSE_DEFAULT_INTERVAL", 3600))
+
+# Every saved time-lapse image is recorded in this SQLite catalog; index existing images
+# once with `python -m src.models.capture_index <TIME_LAPSE_FOLDER>`
+app.config['CAPTURE_INDEX'] = os.getenv("CAPTURE_INDEX", os.path.join(os.path.dirname(app.config['TIME_LAPSE_FOLDER']), "capture_index.sqlite3"))
+
+# Image analysis runs in-process on ANALYSIS_WORKERS threads; at most ANALYSIS_MAX_QUEUED
+# jobs wait. Results are appended to ANALYSIS_CSV for ANALYSIS_PLANT_ID/ANALYSIS_EXPERIMENT_ID.
+app.config['ANALYSIS_WORKERS'] = int(os.getenv("ANALYSIS_WORKERS", 1))
+app.config['ANALYSIS_MAX_QUEUED'] = int(os.getenv("ANALYSIS_MAX_QUEUED", 10))
+app.config['ANALYSIS_PLANT_ID'] = int(os.getenv("PLANT_ID", 1))
+app.config['ANALYSIS_EXPERIMENT_ID'] = int(os.getenv("EXPERIMENT_ID", 1))
+
+# Scale calibration: the pixels-per-inch measured from the reference object is stored per
+# camera and experiment and reused for CALIBRATION_VALIDITY seconds, or until the scene
+# differs from the calibration image by more than CALIBRATION_SCENE_THRESHOLD grey levels
+app.config['CALIBRATION_FILE'] = os.path.join(os.path.dirname(app.config['TIME_LAPSE_FOLDER']), "calibration.json")
+app.config['CALIBRATION_VALIDITY'] = float(os.getenv("CALIBRATION_VALIDITY", 7 * 24 * 3600))
+app.config['CALIBRATION_SCENE_THRESHOLD'] = float(os.getenv("CALIBRATION_SCENE_THRESHOLD", 20))
+# After a failed detection the previous PPI (or the default) is used for this many seconds
+app.config['CALIBRATION_RETRY_INTERVAL'] = float(os.getenv("CALIBRATION_RETRY_INTERVAL", 3600))
+
+# Time-lapse storage: codec ("png", "jpeg" or "webp"), codec options and an optional folder
+# for a lossless PNG archive copy. TIME_LAPSE_STORAGE overrides these per experiment, e.g.
+# {"exp002": {"codec": "webp", "options": {"quality": 90}, "archive_folder": "/mnt/archive"}}
+app.config['TIME_LAPSE_CODEC'] = os.getenv("TIME_LAPSE_CODEC", "png")
+app.config['TIME_LAPSE_CODEC_OPTIONS'] = {}
+app.config['TIME_LAPSE_ARCHIVE_FOLDER'] = os.getenv("TIME_LAPSE_ARCHIVE_FOLDER") or None
+app.config['TIME_LAPSE_STORAGE'] = {}
+
+# Images are encoded and written by IMAGE_WRITER_WORKERS background threads; captures wait
+# once IMAGE_WRITER_MAX_PENDING images are queued. With IMAGE_WRITER_FSYNC every file is
+# flushed to disk, IMAGE_WRITER_SYNC_BATCH files at a time, and a partial batch after at
+# most IMAGE_WRITER_MAX_SYNC_DELAY seconds.
+app.config['IMAGE_WRITER_WORKERS'] = int(os.getenv("IMAGE_WRITER_WORKERS", 2))
+app.config['IMAGE_WRITER_MAX_PENDING'] = int(os.getenv("IMAGE_WRITER_MAX_PENDING", 16))
+app.config['IMAGE_WRITER_FSYNC'] = os.getenv("IMAGE_WRITER_FSYNC", "0") == "1"
+app.config['IMAGE_WRITER_SYNC_BATCH'] = int(os.getenv("IMAGE_WRITER_SYNC_BATCH", 1))
+app.config['IMAGE_WRITER_MAX_SYNC_DELAY'] = float(os.getenv("IMAGE_WRITER_MAX_SYNC_DELAY", 60))
+
+# Time-lapse videos: default frame rate and size, the largest a client may request,
+# where videos are kept, and the analysis CSV the height overlay is read from
+app.config['TIME_LAPSE_VIDEO_FOLDER'] = os.path.join(os.path.dirname(app.config['TIME_LAPSE_FOLDER']), "time_lapse_video")
+app.config['TIME_LAPSE_VIDEO_FPS'] = float(os.getenv("TIME_LAPSE_VIDEO_FPS", 10))
+app.config['TIME_LAPSE_VIDEO_SIZE'] = (1280, 720)
+app.config['TIME_LAPSE_VIDEO_MAX_FPS'] = float(os.getenv("TIME_LAPSE_VIDEO_MAX_FPS", 60))
+app.config['TIME_LAPSE_VIDEO_MAX_SIZE'] = (3840, 2160)
+app.config['ANALYSIS_CSV'] = os.path.join(os.path.dirname(app.config['TIME_LAPSE_FOLDER']), "convert", "time_lapse_data.csv")
+
 # Connect to MariaDB
+mariadb_missing_logged = False
+
 def get_db_connection():
+    global mariadb_missing_logged
     try:
-        conn = mariadb.connect(
-            host=app.config['MYSQL_HOST'],
-            user=app.config['MYSQL_USER'],
-            password=app.config['MYSQL_PASSWORD'],
-            database=app.config['MYSQL_DB']
-        )
+        import mariadb  # Imported on first use to keep startup fast
+    except ImportError as e:
+        DB_CONNECT_FAILURES.inc()
+        if not mariadb_missing_logged:
+            # Not going to change while the app runs; say it once
+            mariadb_missing_logged = True
+            logging.error(f"MariaDB connector not available: {e}")
+        return None
+    try:
+        with DB_QUERY_SECONDS.time(query="connect"):
+            conn = mariadb.connect(
+                host=app.config['MYSQL_HOST'],
+                user=app.config['MYSQL_USER'],
+                password=app.config['MYSQL_PASSWORD'],
+                database=app.config['MYSQL_DB']
+            )
         return conn
     except mariadb.Error as e:
+        DB_CONNECT_FAILURES.inc()
         logging.error(f"Error connecting to MariaDB: {e}")
         return None
 
 # Global variable to store the last 5 inference results
 last_detections = deque(maxlen=5)
 
-# Define models and labels for CORAL object detection
-models = {
-    "plants": {
-        "model_path": "test_data/mobilenet_v2_1.0_224_inat_plant_quant_edgetpu.tflite",
-        "label_path": "test_data/inat_plant_labels.txt"
-    },
-    "bugs": {
-        "model_path": "test_data/mobilenet_v2_1.0_224_inat_insect_quant_edgetpu.tflite",
-        "label_path": "test_data/inat_insect_labels.txt"
-    },
-    "birds": {
-        "model_path": "test_data/mobilenet_v2_1.0_224_inat_bird_quant_edgetpu.tflite",
-        "label_path": "test_data/inat_bird_labels.txt"
-    },
-    "flowers": {
-        "model_path": "test_data/mobilenet_v2_1.0_224_flowers_quant_edgetpu.tflite",
-        "label_path": "test_data/flower_labels.txt"
-    },
-    "animals": {
-        "model_path": "test_data/mobilenet_v2_1.0_224_inat_mammal_quant_edgetpu.tflite",
-        "label_path": "test_data/inat_mammal_labels.txt"
-    }
-}
+# Define models and labels for CORAL object detection (see src/models/model_config.py)
+models = MODELS
 
-# Load models and labels
-interpreters, labels = load_models(models)
+# Inference backend: "auto" uses the Edge TPU when present and falls back to CPU
+# interpreters (spread over INTERPRETER_POOL_PROCESSES worker processes when > 1);
+# "edgetpu", "cpu" and "pool" force a backend
+app.config['INFERENCE_BACKEND'] = os.getenv("INFERENCE_BACKEND", "auto")
+app.config['CPU_NUM_THREADS'] = int(os.getenv("CPU_NUM_THREADS", 1))
+app.config['INTERPRETER_POOL_PROCESSES'] = int(os.getenv("INTERPRETER_POOL_PROCESSES", os.cpu_count() or 1))
 
-# Initialize camera
-camera = get_camera()
+# Startup mode: "background" warms up models and camera on a background thread,
+# "lazy" waits for the first request that needs them, "eager" loads everything
+# before the app starts serving
+app.config['STARTUP_MODE'] = os.getenv("STARTUP_MODE", "background")
+app.config['STARTUP_WAIT_TIMEOUT'] = float(os.getenv("STARTUP_WAIT_TIMEOUT", 30))
 
-# Routes
-@app.route("/")
-def index():
-    return render_template("index.html")
+# One timer thread runs every time-lapse experiment
+time_lapse_scheduler = TimeLapseScheduler(
+    lambda job: capture_time_lapse_job(job),
+    app.config['TIME_LAPSE_JOBS_FILE']
+)
 
-@app.route("/sensor_data")
-def sensor_data():
-    """Simulate sensor data and store it in MariaDB."""
+# Catalog of saved time-lapse images
+capture_index = CaptureIndex(app.config['CAPTURE_INDEX'])
+
+# Analysis jobs started from the dashboard
+analysis_jobs = AnalysisJobService(
+    lambda params, job: run_analysis_job(params, job),
+    max_workers=app.config['ANALYSIS_WORKERS'],
+    max_queued=app.config['ANALYSIS_MAX_QUEUED']
+)
+
+# Pushed to the browser over /events
+events = EventBus(heartbeat=app.config['EVENTS_HEARTBEAT'])
+gauge("rootdash_event_clients", "Connected /events clients.").set_function(lambda: events.clients)
+sensor_sampler = None
+sensor_store_lock = threading.Lock()
+sensor_stored_at = None
+growth_watcher = None
+growth_fingerprint = None
+
+# Set by the startup warm-up
+interpreters, labels = {}, {}
+camera = None
+motion_engine = None
+detector = None
+broadcaster = None
+capture_worker = None
+image_writer = None
+video_builder = None
+calibration = None
+detection_store = None
+detection_flusher = None
+
+def read_sensors():
+    """Simulate a sensor and system-stats reading."""
     sensor_data = {
         "analog_value": random.randint(0, 1023),
         "color_red": random.randint(0, 255),
@@ -103,126 +271,623 @@ def sensor_data():
         "storage_usage": random.uniform(0, 100),
         "ip_address": "192.168.1.1",
     }
+    return {**sensor_data, **system_stats}
 
-    # Insert sensor data into MariaDB
+def store_sensor_sample(sample):
+    """Insert a sensor reading into MariaDB."""
     conn = get_db_connection()
     if conn:
+        import mariadb
         try:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO sensor_data (analog_value, color_red, accel_x, pressure, temperature_sht, cpu_usage, ram_usage, storage_usage, ip_address)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                sensor_data["analog_value"],
-                sensor_data["color_red"],
-                sensor_data["accel_x"],
-                sensor_data["pressure"],
-                sensor_data["temperature_sht"],
-                system_stats["cpu_usage"],
-                system_stats["ram_usage"],
-                system_stats["storage_usage"],
-                system_stats["ip_address"]
-            ))
-            conn.commit()
+            with DB_QUERY_SECONDS.time(query="insert_sensor_data"):
+                cursor.execute('''
+                    INSERT INTO sensor_data (analog_value, color_red, accel_x, pressure, temperature_sht, cpu_usage, ram_usage, storage_usage, ip_address)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    sample["analog_value"],
+                    sample["color_red"],
+                    sample["accel_x"],
+                    sample["pressure"],
+                    sample["temperature_sht"],
+                    sample["cpu_usage"],
+                    sample["ram_usage"],
+                    sample["storage_usage"],
+                    sample["ip_address"]
+                ))
+                conn.commit()
         except mariadb.Error as e:
             logging.error(f"Error inserting sensor data: {e}")
         finally:
             conn.close()
 
-    return jsonify({**sensor_data, **system_stats})
-def capture_single_photo(output_folder):
+def sensor_store_due(now=None):
+    """Return True if no reading was stored in the last SENSOR_STORE_INTERVAL seconds."""
+    now = time.monotonic() if now is None else now
+    return sensor_stored_at is None or now - sensor_stored_at >= app.config['SENSOR_STORE_INTERVAL']
+
+def sample_sensors():
+    """Take one sensor reading, push it to the event stream and store it if a stored reading is due."""
+    global sensor_stored_at
+    sample = read_sensors()
+    sample["timestamp"] = datetime.now().isoformat()
+    with sensor_store_lock:
+        now = time.monotonic()
+        store = sensor_store_due(now)
+        if store:
+            sensor_stored_at = now
+    if store:
+        store_sensor_sample(sample)
+    events.publish("sensor", sample)
+    return sample
+
+def poll_sensors():
+    """Sampler tick: read the sensors only while someone receives them or a stored reading is due."""
+    if events.subscribers("sensor") or sensor_store_due():
+        sample_sensors()
+
+def check_growth_data():
+    """Push a "growth" event when the growth_rate table changes."""
+    global growth_fingerprint
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        with DB_QUERY_SECONDS.time(query="growth_fingerprint"):
+            cursor.execute("SELECT COUNT(*), SUM(rate), SUM(height), MAX(time_after_planting) FROM growth_rate")
+            fingerprint = tuple(str(value) for value in cursor.fetchone())
+    finally:
+        conn.close()
+    if fingerprint != growth_fingerprint:
+        if growth_fingerprint is not None:
+            events.publish("growth", {"changed_at": datetime.now().isoformat()})
+        growth_fingerprint = fingerprint
+
+def start_event_sources():
+    """Start the sensor sampler and the growth-data watcher."""
+    global sensor_sampler, growth_watcher
+    sensor_sampler = PeriodicTask("sensor-sampler", app.config['SENSOR_SAMPLE_INTERVAL'], poll_sensors)
+    growth_watcher = PeriodicTask("growth-watcher", app.config['GROWTH_CHECK_INTERVAL'], check_growth_data)
+    sensor_sampler.start()
+    growth_watcher.start()
+
+def start_time_lapse_scheduler():
+    """Restore the saved time-lapse jobs and start the scheduler."""
+    time_lapse_scheduler.start()
+
+def publish_detections(fresh):
+    """Push the last detections to the event stream as soon as new ones arrive."""
+    events.publish("detections", list(last_detections))
+
+def import_vision_modules():
+    """Import OpenCV, NumPy and the detection modules."""
+    import src.models.object_detection  # noqa: F401
+
+def import_analysis_modules():
+    """Import the image analysis module and load the calibrations so analysis jobs start warm."""
+    global calibration
+    import src.models.analyze_image  # noqa: F401
+    from src.models.calibration import CalibrationStore
+    calibration = CalibrationStore(
+        app.config['CALIBRATION_FILE'],
+        validity=app.config['CALIBRATION_VALIDITY'],
+        scene_threshold=app.config['CALIBRATION_SCENE_THRESHOLD'],
+        retry_interval=app.config['CALIBRATION_RETRY_INTERVAL']
+    )
+
+def init_models():
+    """Load models and labels."""
+    global interpreters, labels
+    from src.utils.edgedevice import load_models  # Import from edge device
+    interpreters, labels = load_models(
+        models,
+        backend=app.config['INFERENCE_BACKEND'],
+        num_threads=app.config['CPU_NUM_THREADS'],
+        processes=app.config['INTERPRETER_POOL_PROCESSES']
+    )
+
+def init_camera():
+    """Start the capture service that owns the camera."""
+    global camera
+    from src.utils.capture_service import create_capture_service
+    camera = create_capture_service(
+        backend=app.config['CAPTURE_BACKEND'],
+        device=app.config['CAMERA_DEVICE'],
+        live_size=app.config['CAMERA_LIVE_SIZE'],
+        still_size=app.config['CAMERA_STILL_SIZE'],
+        framerate=app.config['CAMERA_FRAMERATE']
+    )
+    if camera is None:
+        raise RuntimeError("Camera not available")
+
+def init_image_writer():
+    """Start the background workers that encode and save time-lapse images."""
+    global image_writer
+    from src.utils.image_writer import ImageWriter
+    image_writer = ImageWriter(
+        workers=app.config['IMAGE_WRITER_WORKERS'],
+        max_pending=app.config['IMAGE_WRITER_MAX_PENDING'],
+        fsync=app.config['IMAGE_WRITER_FSYNC'],
+        sync_batch=app.config['IMAGE_WRITER_SYNC_BATCH'],
+        index=capture_index,
+        max_sync_delay=app.config['IMAGE_WRITER_MAX_SYNC_DELAY']
+    )
+
+def time_lapse_storage(experiment_id):
+    """Return the codec, codec options and archive folder used for an experiment's images."""
+    storage = app.config['TIME_LAPSE_STORAGE'].get(experiment_id, {})
+    return (
+        storage.get("codec", app.config['TIME_LAPSE_CODEC']),
+        storage.get("options", app.config['TIME_LAPSE_CODEC_OPTIONS']),
+        storage.get("archive_folder", app.config['TIME_LAPSE_ARCHIVE_FOLDER'])
+    )
+
+def start_stream():
+    """Start the producer that owns the camera and feeds the broadcaster."""
+    global motion_engine, detector, broadcaster, capture_worker, detection_store, detection_flusher
+    from src.models.object_detection import ObjectDetector  # Import object detection
+    from src.models.detection_store import DetectionStore
+    from src.models.inference_scheduler import InferenceScheduler
+    from src.models.inference_cache import InferenceCache
+    from src.models.motion import MotionEngine
+    from src.utils.broadcaster import FrameBroadcaster, CaptureWorker
+    from src.utils.pipeline import DetectionPipeline
+    import src.utils.jpeg
+
+    src.utils.jpeg.USE_SIMPLEJPEG = app.config['USE_SIMPLEJPEG'] and src.utils.jpeg.simplejpeg is not None
+
+    # One producer owns the camera and runs detection once per frame;
+    # every /video_feed client reads from the shared broadcaster.
+    scheduler = InferenceScheduler(
+        rates=app.config['INFERENCE_RATES'],
+        max_per_frame=app.config['INFERENCE_MAX_PER_FRAME']
+    )
+    inference_cache = None
+    if app.config['INFERENCE_CACHE_THRESHOLD'] > 0:
+        inference_cache = InferenceCache(
+            threshold=app.config['INFERENCE_CACHE_THRESHOLD'],
+            ttl=app.config['INFERENCE_CACHE_TTL']
+        )
+    motion_engine = MotionEngine(
+        algorithm=app.config['MOTION_ALGORITHM'],
+        scale=app.config['MOTION_SCALE'],
+        min_area=app.config['MOTION_MIN_AREA'],
+        roi=app.config['MOTION_ROI']
+    )
+    detector = ObjectDetector(
+        interpreters, labels, last_detections,
+        scheduler=scheduler,
+        mode=app.config['DETECTION_MODE'],
+        roi_categories=app.config['ROI_CATEGORIES'],
+        max_regions=app.config['ROI_MAX_REGIONS'],
+        cache=inference_cache,
+        thresholds=app.config['CONFIDENCE_THRESHOLDS'],
+        top_k=app.config['DETECTION_TOP_K'],
+        motion=motion_engine
+    )
+    detector.subscribe(publish_detections)
+
+    # Keep every detection in the history buffer and persist it in bulk
+    detection_store = DetectionStore(labels, capacity=app.config['DETECTION_HISTORY_CAPACITY'])
+    detector.subscribe(detection_store.add)
+    detection_flusher = PeriodicTask(
+        "detection-flush", app.config['DETECTION_FLUSH_INTERVAL'],
+        lambda: detection_store.flush(get_db_connection)
+    )
+    detection_flusher.start()
+
+    broadcaster = FrameBroadcaster(
+        buffer_size=2,
+        default_quality=app.config['STREAM_JPEG_QUALITY'],
+        max_fps=app.config['STREAM_MAX_FPS']
+    )
+    if app.config['STREAM_MODE'] == "pipeline":
+        capture_worker = DetectionPipeline(camera, detector, broadcaster)
+    else:
+        capture_worker = CaptureWorker(camera, detector.process, broadcaster)
+    capture_worker.start()
+
+warmup = Warmup()
+warmup.add("event_sources", start_event_sources)
+warmup.add("time_lapse_scheduler", start_time_lapse_scheduler)
+warmup.add("vision_imports", import_vision_modules)
+warmup.add("image_writer", init_image_writer, requires=("vision_imports",))
+warmup.add("analysis_imports", import_analysis_modules, requires=("vision_imports",))
+warmup.add("models", init_models, requires=("vision_imports",))
+warmup.add("camera", init_camera, requires=("vision_imports",))
+warmup.add("stream", start_stream, requires=("models", "camera"))
+
+def shutdown():
+    """Stop scheduling captures, then finish queued image writes and sync a partial fsync batch."""
+    time_lapse_scheduler.stop()
+    if image_writer is not None:
+        image_writer.close()
+
+# Interpreter pool workers re-run this file as __mp_main__ when the app is
+# started with `python app.py`; they must not warm up a second camera and model set
+if __name__ == "__mp_main__":
+    pass
+else:
+    # threading's exit hooks run before concurrent.futures stops its worker threads at
+    # interpreter exit; an atexit handler would only run after the writer's pool is gone
+    getattr(threading, "_register_atexit", atexit.register)(shutdown)
+    if app.config['STARTUP_MODE'] == "eager":
+        warmup.start(background=False)
+    elif app.config['STARTUP_MODE'] == "background":
+        warmup.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Time every request by route (not by URL, to keep the label set small)."""
+    start = g.pop("request_start", None)
+    if start is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+# Routes
+@app.route("/")
+def index():
+    return render_template("index.html")
+
+@app.route("/startup_status")
+def startup_status():
+    """Return warm-up readiness and the startup-time breakdown."""
+    return jsonify(warmup.status())
+
+@app.route("/metrics")
+def metrics():
+    """Return stage timings, counters and gauges in the Prometheus text format."""
+    return Response(REGISTRY.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics.json")
+def metrics_json():
+    """Return the same metrics as JSON, with estimated latency percentiles, for the dashboard."""
+    return jsonify(REGISTRY.as_dict())
+
+@app.route("/sensor_data")
+def sensor_data():
+    """Return the latest sensor reading (taken by the background sampler, or now if it is stale)."""
+    sample = events.latest("sensor")
+    if sample is None or (datetime.now() - datetime.fromisoformat(sample["timestamp"])).total_seconds() \
+            > app.config['SENSOR_SAMPLE_INTERVAL']:
+        # Nobody is subscribed to /events, so the sampler is idle
+        sample = sample_sensors()
+    return jsonify(sample)
+
+@app.route("/events")
+def event_stream():
+    """
+    Server-sent-event stream of "detections", "sensor" and "growth" events.
+    Optional query parameter: events (comma-separated event types to receive).
+    """
+    warmup.wait("event_sources", timeout=0)
+    types = request.args.get("events")
+    stream = events.stream(types.split(",") if types else None)
+    return Response(stream, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def capture_single_photo(output_folder, experiment_id="exp001"):
     """
-    Simulate capturing a single photo.
-    Replace this with your actual photo capture logic.
+    Capture a single photo from the running camera stream and save it.
+    :param output_folder: Folder to save the image.
+    :param experiment_id: Experiment the image belongs to.
+    :return: Tuple (success, message).
     """
     try:
-        # Simulate photo capture
-        time.sleep(1)  # Simulate delay
-        logging.info(f"Photo captured and saved to {output_folder}")
-        return True, "Photo captured successfully"
+        if not warmup.wait("camera", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+            return False, "Camera not available"
+        # Without the writer the photo is saved on this thread
+        warmup.wait("image_writer", timeout=0)
+        from src.models.time_lapse import capture_single_photo as capture_photo
+        codec, options, archive_folder = time_lapse_storage(experiment_id)
+        with TASK_SECONDS.time(task="capture_photo"):
+            return capture_photo(
+                output_folder=output_folder,
+                experiment_id=experiment_id,
+                capture_service=camera,
+                mode=app.config['TIME_LAPSE_CAPTURE_MODE'],
+                writer=image_writer,
+                codec=codec,
+                options=options,
+                archive_folder=archive_folder,
+                index=capture_index
+            )
     except Exception as e:
         logging.error(f"Error capturing photo: {e}")
         return False, str(e)
 
-def capture_time_lapse(output_folder, interval, num_images):
-    """
-    Capture time-lapse images and save them to the specified folder.
-    
-    :param output_folder: Folder to save the images.
-    :param interval: Time interval between captures (in seconds).
-    :param num_images: Number of images to capture.
-    """
-    for i in range(num_images):
-        success, message = capture_single_photo(output_folder=output_folder)
-        if success:
-            logging.info(f"Captured image {i + 1}/{num_images}: {message}")
-        else:
-            logging.error(f"Failed to capture image {i + 1}/{num_images}: {message}")
-        time.sleep(interval)
-
-@app.route("/pause_feed", methods=["POST"])
-def pause_feed():
-    """Pause the live feed to allow the camera to be used by other processes."""
-    global is_feed_paused
-    is_feed_paused = True
-    logging.info("Live feed paused.")
-    return jsonify({"message": "Live feed paused."}), 200
-
-@app.route("/resume_feed", methods=["POST"])
-def resume_feed():
-    """Resume the live feed after the camera is released by other processes."""
-    global is_feed_paused
-    is_feed_paused = False
-    logging.info("Live feed resumed.")
+def capture_time_lapse_job(job):
+    """Capture one image for a scheduled time-lapse job."""
+    return capture_single_photo(
+        output_folder=job.output_folder or app.config['TIME_LAPSE_FOLDER'],
+        experiment_id=job.experiment_id
+    )
 
 @app.route("/start_time_lapse", methods=["POST"])  # Use the @app.route decorator
 def start_time_lapse():
-    """Start capturing time-lapse images in a separate thread."""
+    """
+    Schedule a time-lapse job.
+    Optional JSON body: experiment_id, interval (seconds) or cron ("min hour day month weekday"),
+    start_at and end_at (Unix timestamps), max_images, output_folder (inside TIME_LAPSE_FOLDER).
+    Starting the same schedule again for an experiment returns the existing job.
+    """
+    options = request.get_json(silent=True) or {}
+    experiment_id = options.get("experiment_id", "exp001")
+    cron = options.get("cron")
+    interval = None if cron else options.get("interval", app.config['TIME_LAPSE_DEFAULT_INTERVAL'])
+    output_folder = options.get("output_folder")
+    if output_folder is not None:
+        if not isinstance(output_folder, str):
+            return jsonify({"message": "output_folder must be a path"}), 400
+        root = os.path.realpath(app.config['TIME_LAPSE_FOLDER'])
+        output_folder = os.path.realpath(os.path.join(root, output_folder))
+        if output_folder != root and not output_folder.startswith(os.path.join(root, "")):
+            return jsonify({"message": "output_folder must be inside the time-lapse folder"}), 400
     try:
-        # Start the time-lapse capture in a separate thread
-        thread = threading.Thread(target=capture_time_lapse, kwargs={
-            'output_folder': app.config['TIME_LAPSE_FOLDER'],
-            'interval': 3600,  # 1 hour interval
-            'num_images': 1    # Capture 1 image
-        })
-        thread.daemon = True  # Daemonize thread to exit when the main program exits
-        thread.start()
-        return jsonify({"message": "Time-lapse capture started successfully!"}), 200
+        warmup.wait("time_lapse_scheduler", timeout=app.config['STARTUP_WAIT_TIMEOUT'])
+        job = time_lapse_scheduler.find_job(experiment_id, interval=interval, cron=cron)
+        if job:
+            return jsonify({"message": "Time-lapse is already scheduled.", "job": job}), 200
+        job = time_lapse_scheduler.add_job(
+            experiment_id,
+            interval=interval,
+            cron=cron,
+            start_at=options.get("start_at"),
+            end_at=options.get("end_at"),
+            max_images=options.get("max_images"),
+            output_folder=output_folder
+        )
+        return jsonify({"message": "Time-lapse capture started successfully!", "job": job}), 200
+    except ValueError as e:
+        return jsonify({"message": f"Invalid time-lapse schedule: {e}"}), 400
     except Exception as e:
         logging.error(f"Failed to start time-lapse capture: {e}")
         return jsonify({"message": f"Failed to start time-lapse capture: {str(e)}"}), 500
 
-@app.route("/analyze_images", methods=["POST"])
-def analyze_images():
-    """Run the analyze_image.py script as a subprocess."""
+@app.route("/time_lapse_jobs")
+def time_lapse_jobs():
+    """List the scheduled time-lapse jobs, soonest first."""
+    return jsonify(time_lapse_scheduler.list_jobs())
+
+@app.route("/time_lapse_jobs/<job_id>/pause", methods=["POST"])
+def pause_time_lapse_job(job_id):
+    """Pause a time-lapse job."""
+    job = time_lapse_scheduler.pause(job_id)
+    if job is None:
+        return jsonify({"message": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/time_lapse_jobs/<job_id>/resume", methods=["POST"])
+def resume_time_lapse_job(job_id):
+    """Resume a paused time-lapse job."""
+    job = time_lapse_scheduler.resume(job_id)
+    if job is None:
+        return jsonify({"message": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/time_lapse_jobs/<job_id>", methods=["DELETE"])
+def cancel_time_lapse_job(job_id):
+    """Cancel a time-lapse job."""
+    if not time_lapse_scheduler.cancel(job_id):
+        return jsonify({"message": "Job not found"}), 404
+    return jsonify({"message": "Job cancelled."})
+
+def get_video_builder():
+    """Create the time-lapse video builder on first use."""
+    global video_builder
+    if video_builder is None:
+        from src.models.time_lapse_video import TimeLapseVideoBuilder
+        video_builder = TimeLapseVideoBuilder(app.config['TIME_LAPSE_FOLDER'], app.config['TIME_LAPSE_VIDEO_FOLDER'])
+    return video_builder
+
+def video_options(values):
+    """
+    Read fps, width, height and overlay from request arguments or a JSON body.
+    Raises ValueError for values the encoder cannot use or above the configured maximum,
+    since every distinct combination is rendered and stored separately.
+    """
+    width, height = app.config['TIME_LAPSE_VIDEO_SIZE']
+    max_width, max_height = app.config['TIME_LAPSE_VIDEO_MAX_SIZE']
+    fps = float(values.get("fps", app.config['TIME_LAPSE_VIDEO_FPS']))
+    size = (int(values.get("width", width)), int(values.get("height", height)))
+    if not (math.isfinite(fps) and 0 < fps <= app.config['TIME_LAPSE_VIDEO_MAX_FPS']):
+        raise ValueError(f"fps must be between 0 and {app.config['TIME_LAPSE_VIDEO_MAX_FPS']:g}")
+    if not (0 < size[0] <= max_width and 0 < size[1] <= max_height):
+        raise ValueError(f"size must be between 2x2 and {max_width}x{max_height}")
+    if size[0] % 2 or size[1] % 2:
+        # H.264 with yuv420p needs even dimensions
+        raise ValueError("width and height must be even")
+    return {
+        "fps": fps,
+        "size": size,
+        "overlay": str(values.get("overlay", "0")).lower() in ("1", "true"),
+    }
+
+@app.route("/time_lapse_video/<experiment_id>", methods=["POST"])
+def build_time_lapse_video(experiment_id):
+    """
+    Append new captures to an experiment's time-lapse video in the background.
+    JSON body (all optional): fps, width, height, overlay (draw time and measured height), rebuild.
+    """
+    data = request.get_json(silent=True) or {}
     try:
-        # Get the absolute path to the analyze_image.py script
-        script_path = os.path.abspath("src/models/analyze_image.py")
-
-        # Check if the script exists
-        if not os.path.exists(script_path):
-            logging.error(f"Script not found: {script_path}")
-            return jsonify({"message": "Script not found!"}), 404
-
-        # Run the script using subprocess
-        logging.info(f"Running script: {script_path}")
-        result = subprocess.run(
-            ["python", script_path],  # Command to execute the script
-            capture_output=True,      # Capture stdout and stderr
-            text=True                 # Return output as a string
-        )
+        options = video_options(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid video options: {e}"}), 400
+    get_video_builder().build_async(
+        experiment_id,
+        heights_csv=app.config['ANALYSIS_CSV'] if options["overlay"] else None,
+        rebuild=bool(data.get("rebuild")),
+        **options
+    )
+    url = url_for("time_lapse_video", experiment_id=experiment_id, fps=options["fps"],
+                  width=options["size"][0], height=options["size"][1], overlay=int(options["overlay"]))
+    return jsonify({"message": "Time-lapse video build started.", "video": url}), 202
 
-        # Log the script's output and errors
-        if result.returncode == 0:
-            logging.info(f"Script output: {result.stdout}")
-            return jsonify({"message": "Script executed successfully!", "output": result.stdout}), 200
-        else:
-            logging.error(f"Script failed with error: {result.stderr}")
-            return jsonify({"message": "Script execution failed!", "error": result.stderr}), 500
+@app.route("/time_lapse_video/<experiment_id>")
+def time_lapse_video(experiment_id):
+    """
+    Serve an experiment's time-lapse video (supports range requests for seeking).
+    Optional query parameters: fps, width, height, overlay (select the rendering).
+    """
+    try:
+        options = video_options(request.args)
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid video options: {e}"}), 400
+    path = get_video_builder().video_path(experiment_id, **options)
+    if not os.path.exists(path):
+        return jsonify({"message": "Video not built yet."}), 404
+    return send_file(path, mimetype="video/mp4", conditional=True, max_age=0)
 
-    except Exception as e:
-        logging.error(f"Error running script: {e}")
-        return jsonify({"message": f"Failed to run script: {str(e)}"}), 500
+@app.route("/time_lapse_video/<experiment_id>/status")
+def time_lapse_video_status(experiment_id):
+    """Return the manifest of an experiment's video and whether a build is in progress."""
+    try:
+        options = video_options(request.args)
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid video options: {e}"}), 400
+    builder = get_video_builder()
+    return jsonify({
+        "building": builder.building(experiment_id, **options),
+        "manifest": builder.manifest(experiment_id, **options)
+    })
+
+def run_analysis_job(params, job):
+    """
+    Analyze time-lapse images for an analysis job.
+    :param params: Job parameters: images (list of paths), or unanalyzed (with optional
+                   experiment_id and limit); by default the newest capture is analyzed.
+    :param job: The AnalysisJob, used to report progress.
+    :return: Dictionary with the measurements per image.
+    """
+    from src.models.analyze_image import find_newest_image, process_image
+    if not warmup.wait("analysis_imports", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+        raise RuntimeError("Analysis modules are not available")
+    if params.get("images"):
+        images = params["images"]
+    elif params.get("unanalyzed"):
+        images = [row["path"] for row in capture_index.unanalyzed(params.get("experiment_id"), params.get("limit"))]
+    else:
+        newest = find_newest_image(app.config['TIME_LAPSE_FOLDER'], params.get("experiment_id"), capture_index)
+        images = [newest] if newest else []
+    if not images:
+        raise ValueError("No images to analyze")
+
+    job.progress(0, len(images))
+    results = []
+    with TASK_SECONDS.time(task="analyze_images"):
+        for done, path in enumerate(images, start=1):
+            plant_data = process_image(
+                path,
+                os.path.dirname(app.config['ANALYSIS_CSV']),
+                params.get("plant_id", app.config['ANALYSIS_PLANT_ID']),
+                params.get("analysis_experiment_id", app.config['ANALYSIS_EXPERIMENT_ID']),
+                calibration=calibration,
+                camera_id=app.config['CAMERA_DEVICE'],
+                method=params.get("method")
+            )
+            if plant_data is not None:
+                capture_index.mark_analyzed([path])
+            results.append({"image": path, "plants": plant_data})
+            job.progress(done)
+    return {"analyzed": sum(result["plants"] is not None for result in results), "images": results}
+
+def queue_analysis(params):
+    """Queue an analysis job and build the JSON response."""
+    try:
+        job, created = analysis_jobs.submit(params)
+    except QueueFullError as e:
+        return jsonify({"message": str(e)}), 429
+    job["status_url"] = url_for("analysis_job_status", job_id=job["job_id"])
+    job["message"] = "Analysis queued." if created else "An identical analysis is already queued."
+    return jsonify(job), 202 if created else 200
+
+@app.route("/analysis_jobs", methods=["POST"])
+def create_analysis_job():
+    """
+    Queue an image analysis job and return its id.
+    JSON body (all optional): images (paths inside the time-lapse folder), unanalyzed (analyze
+    every capture not analyzed yet), experiment_id, limit, plant_id, analysis_experiment_id,
+    method ("edges" or "vegetation").
+    Without images or unanalyzed the newest capture is analyzed.
+    """
+    data = request.get_json(silent=True) or {}
+    params = {key: data[key] for key in ("images", "unanalyzed", "experiment_id", "limit", "plant_id",
+                                         "analysis_experiment_id", "method") if data.get(key) is not None}
+    if params.get("method") not in (None, "edges", "vegetation"):
+        return jsonify({"message": "method must be \"edges\" or \"vegetation\""}), 400
+    if "images" in params:
+        if not isinstance(params["images"], list):
+            return jsonify({"message": "images must be a list of paths"}), 400
+        root = os.path.join(os.path.realpath(app.config['TIME_LAPSE_FOLDER']), "")
+        params["images"] = [os.path.realpath(os.path.join(app.config['TIME_LAPSE_FOLDER'], path))
+                            for path in params["images"]]
+        if not all(path.startswith(root) for path in params["images"]):
+            return jsonify({"message": "Images must be inside the time-lapse folder"}), 400
+    return queue_analysis(params)
+
+@app.route("/analysis_jobs")
+def list_analysis_jobs():
+    """List analysis jobs, newest first."""
+    return jsonify({"jobs": analysis_jobs.list_jobs(), "stats": analysis_jobs.stats()})
+
+@app.route("/analysis_jobs/<job_id>")
+def analysis_job_status(job_id):
+    """Return the state, progress and result of an analysis job."""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"message": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/calibration")
+def list_calibrations():
+    """Return the stored scale calibrations and the known reference objects."""
+    if not warmup.wait("analysis_imports", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+        return jsonify({"error": "Calibration is not available", "startup": warmup.status()}), 503
+    from src.models.analyze_image import REFERENCE_OBJECTS
+    return jsonify({"calibrations": calibration.list_calibrations(), "reference_objects": list(REFERENCE_OBJECTS)})
+
+@app.route("/calibration/<experiment_id>", methods=["POST"])
+def update_calibration(experiment_id):
+    """
+    Pin the reference object of an experiment and/or recalibrate it.
+    JSON body (all optional): reference_object (name to pin, null to unpin), recalibrate (true to
+    calibrate now from the newest capture), camera_id (defaults to the configured camera).
+    """
+    if not warmup.wait("analysis_imports", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+        return jsonify({"error": "Calibration is not available", "startup": warmup.status()}), 503
+    import cv2
+    from src.models.analyze_image import REFERENCE_OBJECTS, find_reference_object
+    data = request.get_json(silent=True) or {}
+    camera_id = data.get("camera_id", app.config['CAMERA_DEVICE'])
+
+    if "reference_object" in data:
+        if data["reference_object"] is not None and data["reference_object"] not in REFERENCE_OBJECTS:
+            return jsonify({"message": f"Unknown reference object: {data['reference_object']}"}), 400
+        calibration.pin(camera_id, experiment_id, data["reference_object"])
+    if data.get("recalibrate"):
+        calibration.recalibrate(camera_id, experiment_id)
+        newest = capture_index.newest(experiment_id)
+        image = cv2.imread(newest["path"]) if newest else None
+        if image is not None and calibration.ppi(image, find_reference_object, camera_id, experiment_id) is None:
+            return jsonify({"message": "No reference object found in the newest capture.",
+                            "calibration": calibration.get(camera_id, experiment_id)}), 422
+    return jsonify({"calibration": calibration.get(camera_id, experiment_id)})
+
+@app.route("/analyze_images", methods=["POST"])
+def analyze_images():
+    """Queue analysis of the newest time-lapse image (poll the returned status_url for the result)."""
+    return queue_analysis({})
 
 @app.route("/inference_data")
 def inference_data():
@@ -230,27 +895,76 @@ def inference_data():
     global last_detections
     return jsonify(list(last_detections))
 
+@app.route("/detection_history")
+def detection_history():
+    """
+    Return stored detections, oldest first.
+    Optional query parameters: minutes (time window, default 60), category, label,
+    min_confidence (0-1), limit (newest N, default 500, at most DETECTION_HISTORY_MAX_LIMIT;
+    0 returns no detections).
+    """
+    if not warmup.wait("stream", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+        return jsonify({"error": "Detection history is not available", "startup": warmup.status()}), 503
+    minutes = request.args.get("minutes", 60, type=float)
+    records = detection_store.query(
+        start=time.time() - minutes * 60,
+        category=request.args.get("category"),
+        label=request.args.get("label"),
+        min_confidence=request.args.get("min_confidence", type=float)
+    )
+    limit = request.args.get("limit", 500, type=int)
+    if limit == 0:
+        newest = records[:0]
+    else:
+        # records[-limit:] would return everything for a negative limit
+        newest = records[-max(1, min(limit, app.config['DETECTION_HISTORY_MAX_LIMIT'])):]
+    return jsonify({
+        "count": len(records),
+        "detections": detection_store.to_dicts(newest),
+        "stats": detection_store.stats()
+    })
+
+@app.route("/detection_history/top_labels")
+def detection_top_labels():
+    """
+    Return the most frequent labels per hour.
+    Optional query parameters: hours (time window, default 24), category, top (labels per hour, default 5).
+    """
+    if not warmup.wait("stream", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+        return jsonify({"error": "Detection history is not available", "startup": warmup.status()}), 503
+    hours = request.args.get("hours", 24, type=float)
+    return jsonify(detection_store.top_labels_per_hour(
+        start=time.time() - hours * 3600,
+        category=request.args.get("category"),
+        top=request.args.get("top", 5, type=int)
+    ))
+
 @app.route("/growth_graph")
 def growth_graph():
     """Fetch growth data from the database and return a base64-encoded image of the graph."""
     try:
+        import matplotlib
+        matplotlib.use("Agg")  # Render off-screen; imported here to keep startup fast
+        import matplotlib.pyplot as plt
+
         # Fetch data from the database
         conn = get_db_connection()
         if conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT 
-                    p.name AS plant_name, 
-                    gr.height, 
-                    gr.time_after_planting
-                FROM 
-                    growth_rate gr
-                JOIN 
-                    plants p ON gr.plant_id = p.id
-                ORDER BY 
-                    gr.time_after_planting
-            ''')
-            rows = cursor.fetchall()
+            with DB_QUERY_SECONDS.time(query="growth_graph"):
+                cursor.execute('''
+                    SELECT 
+                        p.name AS plant_name, 
+                        gr.height, 
+                        gr.time_after_planting
+                    FROM 
+                        growth_rate gr
+                    JOIN 
+                        plants p ON gr.plant_id = p.id
+                    ORDER BY 
+                        gr.time_after_planting
+                ''')
+                rows = cursor.fetchall()
             conn.close()
 
             if not rows:
@@ -301,8 +1015,9 @@ def stored_growth_graph():
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT image FROM growth_graph ORDER BY id DESC LIMIT 1")
-        row = cursor.fetchone()
+        with DB_QUERY_SECONDS.time(query="stored_growth_graph"):
+            cursor.execute("SELECT image FROM growth_graph ORDER BY id DESC LIMIT 1")
+            row = cursor.fetchone()
         conn.close()
         if row:
             return jsonify({"image": row[0]})
@@ -316,18 +1031,19 @@ def growth_rate():
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                gr.rate, 
-                gr.height, 
-                gr.time_after_planting, 
-                p.name AS plant_name
-            FROM 
-                growth_rate gr
-            JOIN 
-                plants p ON gr.plant_id = p.id
-        ''')
-        data = cursor.fetchall()
+        with DB_QUERY_SECONDS.time(query="growth_rate"):
+            cursor.execute('''
+                SELECT 
+                    gr.rate, 
+                    gr.height, 
+                    gr.time_after_planting, 
+                    p.name AS plant_name
+                FROM 
+                    growth_rate gr
+                JOIN 
+                    plants p ON gr.plant_id = p.id
+            ''')
+            data = cursor.fetchall()
         conn.close()
         return jsonify([{
             "rate": row[0],
@@ -343,16 +1059,17 @@ def seasonal_status():
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                gr.time_after_planting, 
-                p.name AS plant_name
-            FROM 
-                growth_rate gr
-            JOIN 
-                plants p ON gr.plant_id = p.id
-        ''')
-        data = cursor.fetchall()
+        with DB_QUERY_SECONDS.time(query="seasonal_status"):
+            cursor.execute('''
+                SELECT 
+                    gr.time_after_planting, 
+                    p.name AS plant_name
+                FROM 
+                    growth_rate gr
+                JOIN 
+                    plants p ON gr.plant_id = p.id
+            ''')
+            data = cursor.fetchall()
         conn.close()
 
         seasonal_status_data = []
@@ -386,16 +1103,17 @@ def harvest_scheduler():
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                gr.time_after_planting, 
-                p.name AS plant_name
-            FROM 
-                growth_rate gr
-            JOIN 
-                plants p ON gr.plant_id = p.id
-        ''')
-        data = cursor.fetchall()
+        with DB_QUERY_SECONDS.time(query="harvest_scheduler"):
+            cursor.execute('''
+                SELECT 
+                    gr.time_after_planting, 
+                    p.name AS plant_name
+                FROM 
+                    growth_rate gr
+                JOIN 
+                    plants p ON gr.plant_id = p.id
+            ''')
+            data = cursor.fetchall()
         conn.close()
 
         harvest_scheduler_data = []
@@ -417,8 +1135,20 @@ def harvest_scheduler():
 
 @app.route("/video_feed")
 def video_feed():
-    """Route to stream video from the USB camera with object detection."""
-    return Response(generate_frames_with_detection(camera, interpreters, labels, last_detections), mimetype="multipart/x-mixed-replace; boundary=frame")
+    """
+    Route to stream video from the USB camera with object detection.
+    Optional query parameters: w (width in pixels), q (JPEG quality), fps (maximum frame rate).
+    """
+    if not warmup.wait("stream", timeout=app.config['STARTUP_WAIT_TIMEOUT']):
+        return jsonify({"error": "Video stream is not available", "startup": warmup.status()}), 503
+    stream = broadcaster.stream(
+        width=request.args.get("w", type=int),
+        quality=request.args.get("q", type=int),
+        fps=request.args.get("fps", type=float)
+    )
+    return Response(stream, mimetype="multipart/x-mixed-replace; boundary=frame")
+
+warmup.record("app_module", time.perf_counter() - _startup_start)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8086)
\ No newline at end of file
@@ -0,0 +1 @@
+#Blank
\ No newline at end of file
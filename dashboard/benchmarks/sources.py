@@ -0,0 +1,170 @@
+# benchmarks/sources.py
+import time
+
+import cv2
+import numpy as np
+
+
+class SyntheticCamera:
+    """
+    Camera stand-in that renders frames with a few moving objects.
+
+    `read()` blocks until the next frame is due at the configured rate,
+    like a real camera, and always returns a freshly allocated frame.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, objects=3, seed=0):
+        """
+        :param width: Frame width in pixels.
+        :param height: Frame height in pixels.
+        :param fps: Frame rate of the simulated camera.
+        :param objects: Number of moving objects drawn on each frame.
+        :param seed: Seed for the background texture and object paths.
+        """
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps
+        rng = np.random.default_rng(seed)
+
+        # Green-ish textured background, rendered once
+        gradient = np.linspace(40, 120, width, dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 6, (height, width, 3)).astype(np.float32)
+        background = np.clip(gradient * np.array([0.6, 1.0, 0.5], dtype=np.float32) + noise, 0, 255)
+        self.background = background.astype(np.uint8)
+
+        self.objects = [
+            {
+                "position": rng.uniform([0, 0], [width, height]),
+                "velocity": rng.uniform(-1, 1, 2) * min(width, height) * 0.01,
+                "radius": int(min(width, height) * rng.uniform(0.02, 0.06)),
+                "color": tuple(int(c) for c in rng.integers(0, 255, 3)),
+            }
+            for _ in range(objects)
+        ]
+        self._next_frame = time.monotonic()
+        self.frames = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame = max(self._next_frame + self.interval, time.monotonic())
+
+        frame = self.background.copy()
+        for obj in self.objects:
+            obj["position"] += obj["velocity"]
+            for axis, limit in ((0, self.width), (1, self.height)):
+                if not 0 <= obj["position"][axis] < limit:
+                    obj["velocity"][axis] *= -1
+                    obj["position"][axis] = min(max(obj["position"][axis], 0), limit - 1)
+            center = (int(obj["position"][0]), int(obj["position"][1]))
+            cv2.circle(frame, center, obj["radius"], obj["color"], -1)
+        self.frames += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class VideoFileCamera:
+    """Camera stand-in that replays a recorded video in a loop at a fixed rate."""
+
+    def __init__(self, path, fps=None, width=None, height=None):
+        """
+        :param path: Path to the video file.
+        :param fps: Playback rate (defaults to the file's frame rate).
+        :param width: Optional width to resize frames to.
+        :param height: Optional height to resize frames to.
+        """
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise OSError(f"Cannot open video file: {path}")
+        fps = fps or self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.interval = 1.0 / fps
+        self.size = (width, height) if width and height else None
+        self._next_frame = time.monotonic()
+        self.frames = 0
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame = max(self._next_frame + self.interval, time.monotonic())
+
+        success, frame = self.capture.read()
+        if not success:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.capture.read()
+        if success and self.size:
+            frame = cv2.resize(frame, self.size)
+        self.frames += int(success)
+        return success, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class StubInterpreter:
+    """
+    Stand-in for a quantized MobileNet TFLite interpreter.
+
+    `invoke()` sleeps for the configured latency (releasing the GIL like a
+    real Edge TPU call) and produces a deterministic uint8 score vector, so
+    the rest of the frame pipeline does its real work.
+    """
+
+    def __init__(self, latency=0.01, input_size=224, classes=1000):
+        """
+        :param latency: Seconds spent in each `invoke()`.
+        :param input_size: Side length of the square RGB input.
+        :param classes: Number of output classes.
+        """
+        self.latency = latency
+        self._input = np.zeros((1, input_size, input_size, 3), dtype=np.uint8)
+        self._output = np.zeros((1, classes), dtype=np.uint8)
+        self._input_details = [{
+            "index": 0, "shape": np.array(self._input.shape), "dtype": np.uint8,
+            "quantization": (0.0078125, 128),
+        }]
+        self._output_details = [{
+            "index": 1, "shape": np.array(self._output.shape), "dtype": np.uint8,
+            "quantization": (0.00390625, 0),
+        }]
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return self._input_details
+
+    def get_output_details(self):
+        return self._output_details
+
+    def set_tensor(self, index, value):
+        np.copyto(self._input, value)
+
+    def tensor(self, index):
+        if index == 0:
+            return lambda: self._input
+        return lambda: self._output
+
+    def get_tensor(self, index):
+        return (self._input if index == 0 else self._output).copy()
+
+    def invoke(self):
+        time.sleep(self.latency)
+        self._output.fill(0)
+        self._output[0, int(self._input[0, ::16, ::16].mean() * 7) % self._output.shape[1]] = 200
+
+
+def stub_labels(classes=1000):
+    """Return a label table shaped like the output of `read_label_file`."""
+    table = np.empty(classes, dtype=object)
+    table[:] = [f"class {i}" for i in range(classes)]
+    return table
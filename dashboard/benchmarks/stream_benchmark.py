@@ -0,0 +1,313 @@
+# benchmarks/stream_benchmark.py
+"""
+Benchmark the detection stream without a camera or an Edge TPU.
+
+Runs the real detector, pipeline and broadcaster against a synthetic (or
+recorded-video) camera and stub interpreters with a configurable latency,
+or CPU tflite interpreters when the model files are present. Each scenario
+reports sustained FPS, per-stage latency percentiles, end-to-end frame age
+and memory growth, and all results are written to a JSON file that can be
+compared across commits.
+
+Run from the dashboard directory:
+    python -m benchmarks.stream_benchmark --duration 10 --models 1,5 --clients 1,3
+    python -m benchmarks.stream_benchmark --compare old.json new.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+import numpy as np
+
+import src.utils.broadcaster as broadcaster_module
+from src.models.object_detection import ObjectDetector
+from src.models.inference_scheduler import InferenceScheduler
+from src.models.model_config import MODELS
+from src.utils.broadcaster import FrameBroadcaster, CaptureWorker, stream_tier
+from src.utils.pipeline import DetectionPipeline
+from benchmarks.sources import SyntheticCamera, VideoFileCamera, StubInterpreter, stub_labels
+
+CATEGORIES = ["plants", "bugs", "birds", "flowers", "animals"]
+
+
+class StageTimer:
+    """Collect wall-clock durations per named stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, name, func):
+        """Return `func` wrapped so every call is timed under `name`."""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                with self._lock:
+                    self.samples[name].append(duration)
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    def summary(self):
+        with self._lock:
+            return {name: percentiles(values) for name, values in self.samples.items()}
+
+
+def percentiles(values, scale=1000.0):
+    """Summarize durations in seconds as milliseconds."""
+    if not values:
+        return {"count": 0}
+    data = np.asarray(values) * scale
+    return {
+        "count": int(data.size),
+        "mean_ms": float(data.mean()),
+        "p50_ms": float(np.percentile(data, 50)),
+        "p90_ms": float(np.percentile(data, 90)),
+        "p99_ms": float(np.percentile(data, 99)),
+        "max_ms": float(data.max()),
+    }
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_interpreters(count, latency, models_dir=None):
+    """
+    Return (interpreters, labels) for the first `count` categories.
+
+    With `models_dir`, CPU tflite interpreters are loaded for the models
+    that exist there; stub interpreters fill in the rest.
+    """
+    categories = CATEGORIES[:count]
+    interpreters, labels = {}, {}
+    if models_dir:
+        from src.utils.edgedevice import load_models
+        available = {}
+        for category in categories:
+            paths = {key: os.path.join(models_dir, os.path.basename(path)) for key, path in MODELS[category].items()}
+            if os.path.exists(paths["label_path"]):
+                available[category] = paths
+        interpreters, labels = load_models(available, backend="cpu")
+
+    for category in categories:
+        if category not in interpreters:
+            interpreters[category] = StubInterpreter(latency=latency)
+            labels[category] = stub_labels()
+    return interpreters, labels
+
+
+def run_scenario(params, make_camera, interpreters, labels, duration, warmup):
+    """Run one scenario and return its measurements."""
+    timer = StageTimer()
+    camera = make_camera()
+    camera.read = timer.wrap("capture", camera.read)
+
+    scheduler = None
+    if params["scheduler"]:
+        scheduler = InferenceScheduler(
+            rates={"plants": 0.2, "bugs": 5, "birds": 2, "flowers": 0.2, "animals": 1}
+        )
+    detector = ObjectDetector(interpreters, labels, deque(maxlen=5), scheduler=scheduler,
+                              mode=params["detection_mode"])
+    detector.detect_motion = timer.wrap("motion", detector.detect_motion)
+    detector.classify = timer.wrap("inference", detector.classify)
+    detector.annotate = timer.wrap("annotate", detector.annotate)
+
+    broadcaster = FrameBroadcaster()
+    original_encode = broadcaster_module.encode_jpeg
+    broadcaster_module.encode_jpeg = timer.wrap("encode", original_encode)
+
+    if params["stream_mode"] == "pipeline":
+        producer = DetectionPipeline(camera, detector, broadcaster)
+    else:
+        producer = CaptureWorker(camera, detector.process, broadcaster)
+
+    width, quality, _ = stream_tier(params["client_width"] or None)
+    stop = threading.Event()
+    measuring = threading.Event()
+    delivered = [0] * params["clients"]
+    ages = []
+    ages_lock = threading.Lock()
+
+    def client(index):
+        last_sequence = 0
+        while not stop.is_set():
+            item = broadcaster.wait_for_frame(last_sequence, timeout=1.0)
+            if item is None:
+                continue
+            last_sequence = item[0]
+            if broadcaster.encoded(item, width, quality) is None or not measuring.is_set():
+                continue
+            delivered[index] += 1
+            with ages_lock:
+                ages.append(time.time() - item[1])
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(params["clients"])]
+    try:
+        producer.start()
+        for thread in threads:
+            thread.start()
+
+        time.sleep(warmup)
+        timer.reset()
+        start_sequence = broadcaster.sequence
+        rss_start = rss_mb()
+        measuring.set()
+        start = time.perf_counter()
+        time.sleep(duration)
+        elapsed = time.perf_counter() - start
+        measuring.clear()
+        published = broadcaster.sequence - start_sequence
+        rss_end = rss_mb()
+    finally:
+        stop.set()
+        producer.stop()
+        broadcaster.close()
+        for thread in threads:
+            thread.join(2.0)
+        broadcaster_module.encode_jpeg = original_encode
+
+    result = {
+        "params": params,
+        "fps": {
+            "published": published / elapsed,
+            "client_mean": float(np.mean(delivered)) / elapsed,
+            "client_min": min(delivered) / elapsed,
+        },
+        "stages": timer.summary(),
+        "frame_age": percentiles(ages),
+        "memory": {"rss_start_mb": rss_start, "rss_end_mb": rss_end, "growth_mb": rss_end - rss_start},
+    }
+    if isinstance(producer, DetectionPipeline):
+        result["pipeline"] = producer.stats()
+    return result
+
+
+def compare(old_path, new_path):
+    """Print the FPS and frame-age change of every scenario present in both files."""
+    def load(path):
+        with open(path) as f:
+            data = json.load(f)
+        return data, {json.dumps(s["params"], sort_keys=True): s for s in data["scenarios"]}
+
+    old_data, old = load(old_path)
+    new_data, new = load(new_path)
+    print(f"{old_data.get('commit', '?')[:10]} -> {new_data.get('commit', '?')[:10]}")
+    for key in new:
+        if key not in old:
+            continue
+        a, b = old[key], new[key]
+        fps_a, fps_b = a["fps"]["client_mean"], b["fps"]["client_mean"]
+        age_a, age_b = a["frame_age"].get("p50_ms", 0), b["frame_age"].get("p50_ms", 0)
+        change = (fps_b - fps_a) / fps_a * 100 if fps_a else 0.0
+        print(f"{b['params']['name']:<40} fps {fps_a:7.2f} -> {fps_b:7.2f} ({change:+.1f}%)  "
+              f"age p50 {age_a:7.1f} -> {age_b:7.1f} ms")
+
+
+def parse_list(value, cast=int):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection stream.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--models", default="1,5", help="Comma-separated model counts")
+    parser.add_argument("--resolutions", default="640x480,1280x720", help="Comma-separated WxH camera sizes")
+    parser.add_argument("--clients", default="1,3", help="Comma-separated concurrent client counts")
+    parser.add_argument("--stream-modes", default="pipeline,serial", help="pipeline and/or serial")
+    parser.add_argument("--detection-mode", default="full", choices=["full", "motion"])
+    parser.add_argument("--scheduler", action="store_true", help="Use the per-category inference scheduler")
+    parser.add_argument("--client-width", type=int, default=0, help="Stream tier width requested by clients")
+    parser.add_argument("--fps", type=float, default=30.0, help="Synthetic camera frame rate")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub interpreter latency in seconds")
+    parser.add_argument("--video", help="Replay this video file instead of the synthetic camera")
+    parser.add_argument("--models-dir", help="Use CPU tflite models from this directory where present")
+    parser.add_argument("--output", help="Result file (default benchmarks/results/stream_<commit>_<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    logging.getLogger().setLevel(logging.WARNING)
+    commit = git_commit()
+    scenarios = []
+    grid = itertools.product(
+        parse_list(args.models), parse_list(args.resolutions, parse_resolution),
+        parse_list(args.clients), parse_list(args.stream_modes, str)
+    )
+    for model_count, (width, height), clients, stream_mode in grid:
+        name = f"{stream_mode}-{model_count}m-{width}x{height}-{clients}c"
+        params = {
+            "name": name, "models": model_count, "width": width, "height": height,
+            "clients": clients, "stream_mode": stream_mode, "detection_mode": args.detection_mode,
+            "scheduler": args.scheduler, "client_width": args.client_width,
+            "camera_fps": args.fps, "latency": args.latency, "video": args.video,
+        }
+        if args.video:
+            make_camera = lambda: VideoFileCamera(args.video, fps=args.fps, width=width, height=height)
+        else:
+            make_camera = lambda: SyntheticCamera(width, height, fps=args.fps)
+
+        interpreters, labels = load_interpreters(model_count, args.latency, args.models_dir)
+        result = run_scenario(params, make_camera, interpreters, labels, args.duration, args.warmup)
+        scenarios.append(result)
+        print(f"{name:<40} {result['fps']['client_mean']:6.2f} fps  "
+              f"age p50 {result['frame_age'].get('p50_ms', 0):7.1f} ms  "
+              f"rss +{result['memory']['growth_mb']:.1f} MB")
+
+    output = args.output or os.path.join(
+        "benchmarks", "results",
+        f"stream_{(commit or 'nocommit')[:10]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "scenarios": scenarios,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
 # models/__init__.py
-from src.utils.edgedevice import load_models
-from .object_detection import generate_frames
+# Submodules are imported on first use: importing a light module such as
+# src.models.capture_index must not load OpenCV and the TFLite runtime.
+import importlib
 
-__all__ = ["load_models", "generate_frames"]
\ No newline at end of file
+_EXPORTS = {
+    "load_models": "src.utils.edgedevice",
+    "generate_frames": "src.models.object_detection",
+}
+
+__all__ = ["load_models", "generate_frames"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,147 @@
+# src/models/analysis_jobs.py
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when too many analysis jobs are waiting."""
+
+
+class AnalysisJob:
+    """State of one queued or finished analysis job."""
+
+    def __init__(self, job_id, key, params):
+        self.job_id = job_id
+        self.key = key
+        self.params = params
+        self.state = "queued"
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.state in ("queued", "running")
+
+    def progress(self, done, total=None):
+        """Report progress from inside the job."""
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "params": self.params,
+            "progress": {"done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class AnalysisJobService:
+    """
+    Run image analysis jobs on a long-lived worker pool inside the app.
+
+    The analysis modules are imported once and stay loaded, so a job only
+    pays for the analysis itself instead of a fresh interpreter. A job with
+    the same parameters as one that is still queued or running is not queued
+    again; the existing job is returned instead. At most `max_workers` jobs
+    run at once and at most `max_queued` wait; finished jobs are kept for
+    status queries until `history` newer ones have finished.
+    """
+
+    def __init__(self, run, max_workers=1, max_queued=10, history=100):
+        """
+        :param run: Callable `run(params, job)` doing the work; it may call `job.progress(done, total)`
+                    and its return value becomes the job result.
+        :param max_workers: Number of jobs run at once.
+        :param max_queued: Maximum number of jobs waiting to run.
+        :param history: Number of finished jobs kept.
+        """
+        self.run = run
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+
+    @staticmethod
+    def job_key(params):
+        """Return the deduplication key of a job's parameters."""
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def submit(self, params):
+        """
+        Queue a job, or return the identical job that is already queued or running.
+        :param params: JSON-serializable job parameters.
+        :return: Tuple (job dictionary, created) where created is False for a deduplicated job.
+        :raises QueueFullError: If `max_queued` jobs are already waiting.
+        """
+        key = self.job_key(params)
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and job.active:
+                    return job.to_dict(), False
+            if sum(job.state == "queued" for job in self._jobs.values()) >= self.max_queued:
+                raise QueueFullError(f"{self.max_queued} analysis jobs are already waiting")
+            job = AnalysisJob(uuid.uuid4().hex[:12], key, params)
+            self._jobs[job.job_id] = job
+            self._trim()
+        self._executor.submit(self._execute, job)
+        logging.info(f"Analysis job {job.job_id} queued: {key}")
+        return job.to_dict(), True
+
+    def _execute(self, job):
+        job.state = "running"
+        job.started_at = time.time()
+        try:
+            job.result = self.run(job.params, job)
+            job.state = "done"
+            logging.info(f"Analysis job {job.job_id} finished in {time.time() - job.started_at:.1f} s.")
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+            logging.error(f"Analysis job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._trim()
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond `history`."""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list_jobs(self):
+        """Return every known job, newest first."""
+        with self._lock:
+            return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def stats(self):
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {state: states.count(state) for state in ("queued", "running", "done", "failed")}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
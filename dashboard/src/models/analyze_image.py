@@ -3,9 +3,23 @@ import numpy as np
 import os
 from datetime import datetime
 import csv
+import hashlib
+import json
 import logging
 from dotenv import load_dotenv
 
+try:
+    from src.models.capture_index import CaptureIndex, parse_capture_name
+    from src.models.features import ImageFeatures
+    from src.models.measurement import measure_plants, to_records, vegetation_mask
+except ModuleNotFoundError as e:
+    # Run as a script from src/models; any other missing module is a real error
+    if e.name != "src":
+        raise
+    from capture_index import CaptureIndex, parse_capture_name
+    from features import ImageFeatures
+    from measurement import measure_plants, to_records, vegetation_mask
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -25,22 +39,58 @@ REFERENCE_OBJECTS = {
 # Default pixels per inch (PPI) if no reference object is detected
 DEFAULT_PPI = int(os.getenv("PIXELS_PER_INCH", 100))
 
-def detect_reference_object(image):
+# Plant measurement: Canny thresholds and the smallest contour area (pixels) counted as a plant
+CANNY_THRESHOLDS = (int(os.getenv("CANNY_LOW", 100)), int(os.getenv("CANNY_HIGH", 200)))
+MIN_PLANT_AREA = int(os.getenv("MIN_PLANT_AREA", 500))
+
+# Measurement method: "edges" (bounding boxes of Canny contours) or "vegetation" (one connected
+# component per plant in an ExG or HSV vegetation mask); the ExG threshold is a number or
+# "otsu" to choose it per image
+MEASUREMENT_METHOD = os.getenv("MEASUREMENT_METHOD", "edges")
+VEGETATION_INDEX = os.getenv("VEGETATION_INDEX", "exg")
+VEGETATION_THRESHOLD = os.getenv("VEGETATION_THRESHOLD", "0.1").strip().lower()
+VEGETATION_THRESHOLD = VEGETATION_THRESHOLD if VEGETATION_THRESHOLD == "otsu" else float(VEGETATION_THRESHOLD)
+
+# Bump when the analysis code changes in a way that changes its results
+ANALYSIS_VERSION = 1
+
+def analysis_version(calibrated=False, method=None):
+    """
+    Return a version string identifying the analysis code and its parameters.
+    Stored with every batch result, so results are recomputed after the code or a threshold changes.
+    :param calibrated: Whether a stored calibration is used instead of per-image reference detection.
+    :param method: Measurement method (defaults to MEASUREMENT_METHOD).
+    """
+    params = {
+        "default_ppi": DEFAULT_PPI,
+        "canny_thresholds": CANNY_THRESHOLDS,
+        "min_plant_area": MIN_PLANT_AREA,
+    }
+    if calibrated:
+        params["calibrated"] = True
+    if (method or MEASUREMENT_METHOD) == "vegetation":
+        params["method"] = "vegetation"
+        params["vegetation"] = [VEGETATION_INDEX, VEGETATION_THRESHOLD]
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:8]
+    return f"v{ANALYSIS_VERSION}-{digest}"
+
+def find_reference_object(image, reference_object=None):
     """
     Detect a reference object in the image and calculate pixels per inch (PPI).
-    :param image: Input image (NumPy array).
-    :return: Pixels per inch (PPI) or None if no reference object is found.
+    :param image: Input image (NumPy array or ImageFeatures).
+    :param reference_object: Optional name from REFERENCE_OBJECTS; only that object is looked for.
+    :return: Tuple (object name, PPI), or None if no reference object is found.
     """
+    features = ImageFeatures.of(image)
+    candidates = REFERENCE_OBJECTS
+    if reference_object is not None:
+        if reference_object not in REFERENCE_OBJECTS:
+            raise ValueError(f"Unknown reference object: {reference_object}")
+        candidates = {reference_object: REFERENCE_OBJECTS[reference_object]}
     try:
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-
-        # Detect circles (for round objects like quarters, baseballs, etc.)
+        # Detect circles (for round objects like quarters, baseballs, etc.) on the blurred grayscale image
         circles = cv2.HoughCircles(
-            blurred,
+            features.blurred,
             cv2.HOUGH_GRADIENT,
             dp=1,
             minDist=50,
@@ -50,23 +100,20 @@ def detect_reference_object(image):
             maxRadius=200
         )
 
-        if circles is not None:
+        if circles is not None and any("diameter" in obj_data for obj_data in candidates.values()):
             circles = np.round(circles[0, :]).astype("int")
             for (x, y, r) in circles:
                 # Check if the detected circle matches a known reference object
                 diameter_pixels = r * 2
-                for obj_name, obj_data in REFERENCE_OBJECTS.items():
+                for obj_name, obj_data in candidates.items():
                     if "diameter" in obj_data:
                         expected_diameter = obj_data["diameter"]
                         ppi = diameter_pixels / expected_diameter
                         logging.info(f"Detected {obj_name}. Pixels per inch (PPI): {ppi}")
-                        return ppi
+                        return obj_name, ppi
 
         # Detect rectangles (for credit cards, A4 paper, etc.)
-        edges = cv2.Canny(blurred, 100, 200)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        for contour in contours:
+        for contour in features.contours(100, 200, blurred=True):
             # Approximate the contour to a polygon
             epsilon = 0.02 * cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, epsilon, True)
@@ -77,7 +124,7 @@ def detect_reference_object(image):
                 aspect_ratio = float(w) / h
 
                 # Compare aspect ratio to known reference objects
-                for obj_name, obj_data in REFERENCE_OBJECTS.items():
+                for obj_name, obj_data in candidates.items():
                     if "width" in obj_data and "height" in obj_data:
                         expected_aspect_ratio = obj_data["width"] / obj_data["height"]
                         if abs(aspect_ratio - expected_aspect_ratio) < 0.1:  # Allow some tolerance
@@ -86,36 +133,67 @@ def detect_reference_object(image):
                             ppi_height = h / obj_data["height"]
                             ppi = (ppi_width + ppi_height) / 2  # Average PPI
                             logging.info(f"Detected {obj_name}. Pixels per inch (PPI): {ppi}")
-                            return ppi
+                            return obj_name, ppi
 
-        logging.warning("No reference object detected. Using default PPI.")
+        logging.warning("No reference object detected.")
         return None
     except Exception as e:
         logging.error(f"Error detecting reference object: {e}")
         return None
 
-def analyze_image(image):
+def detect_reference_object(image, reference_object=None):
+    """
+    Detect a reference object in the image and calculate pixels per inch (PPI).
+    :param image: Input image (NumPy array or ImageFeatures).
+    :param reference_object: Optional name from REFERENCE_OBJECTS; only that object is looked for.
+    :return: Pixels per inch (PPI) or None if no reference object is found.
+    """
+    found = find_reference_object(image, reference_object)
+    return found[1] if found else None
+
+def analyze_image(image, calibration=None, camera_id="default", experiment_id="default", method=None,
+                  raise_errors=False):
     """
     Analyze an image to detect plants and measure their size.
-    :param image: Input image (NumPy array).
-    :return: List of dictionaries with plant width and height in inches.
+
+    The grayscale and edge images are computed once (see ImageFeatures) and
+    shared by reference detection and plant measurement. With the
+    "vegetation" method each plant is one connected component of a
+    vegetation mask, measured in a single vectorized pass, instead of one
+    or more edge contours.
+    :param image: Input image (NumPy array or ImageFeatures).
+    :param calibration: Optional CalibrationStore; the stored PPI is reused instead of detecting
+                        the reference object in every image.
+    :param camera_id: Camera the image was taken with (calibration key).
+    :param experiment_id: Experiment the image belongs to (calibration key).
+    :param method: "edges" or "vegetation" (defaults to MEASUREMENT_METHOD).
+    :param raise_errors: Raise analysis errors instead of logging them and returning an empty list
+                         (the batch analyzer records them so the image is retried).
+    :return: List of dictionaries with plant width and height in inches (the vegetation method
+             adds area_sq_inches and the centroid in pixels), largest plant first for "vegetation".
     """
+    method = method or MEASUREMENT_METHOD
+    features = ImageFeatures.of(image)
     try:
         # Detect reference object and calculate PPI
-        ppi = detect_reference_object(image)
+        if calibration is not None:
+            ppi = calibration.ppi(features.image, lambda _, reference_object: find_reference_object(features, reference_object),
+                                  camera_id, experiment_id)
+        else:
+            ppi = detect_reference_object(features)
         if ppi is None:
+            logging.warning("No reference object detected. Using default PPI.")
             ppi = DEFAULT_PPI  # Fallback to default PPI if no reference object is found
 
-        # Convert to grayscale and detect edges
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-
-        # Find contours in the edges
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if method == "vegetation":
+            mask = vegetation_mask(features.image, VEGETATION_INDEX, VEGETATION_THRESHOLD)
+            columns = measure_plants(mask, MIN_PLANT_AREA, ppi)
+            return to_records(columns, ("width_inches", "height_inches", "area_sq_inches", "centroid_x", "centroid_y"))
 
+        # Find contours in the edges of the grayscale image
         plant_data = []
-        for contour in contours:
-            if cv2.contourArea(contour) > 500:  # Filter out small contours
+        for contour in features.contours(*CANNY_THRESHOLDS):
+            if cv2.contourArea(contour) > MIN_PLANT_AREA:  # Filter out small contours
                 x, y, w, h = cv2.boundingRect(contour)
                 # Convert pixel dimensions to inches using the calculated PPI
                 width_inches = w / ppi
@@ -124,48 +202,68 @@ def analyze_image(image):
 
         return plant_data
     except Exception as e:
+        if raise_errors:
+            raise
         logging.error(f"Error analyzing image: {e}")
         return []
 
-def find_newest_image(directory):
+def find_newest_image(directory, experiment_id=None, index=None):
     """
-    Find the newest image file in the specified directory.
+    Find the newest image file in the specified directory or its per-day subfolders.
     :param directory: Path to the directory.
+    :param experiment_id: Optional experiment whose newest image is wanted (index lookups only).
+    :param index: Optional CaptureIndex; when given, the newest capture is looked up instead of scanning.
     :return: Path to the newest image file, or None if no images are found.
     """
+    if index is not None:
+        newest = index.newest(experiment_id)
+        if newest is not None and os.path.exists(newest["path"]):
+            return newest["path"]
+        logging.warning("No indexed images found; scanning the directory.")
     try:
-        # List all image files in the directory
-        image_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        if not image_files:
+        # Walk the directory and the per-day subfolders created by capture_single_photo
+        newest_image, newest_mtime = None, None
+        for root, _, files in os.walk(directory):
+            for f in files:
+                if not f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+                    continue
+                path = os.path.join(root, f)
+                mtime = os.path.getmtime(path)
+                if newest_mtime is None or mtime > newest_mtime:
+                    newest_image, newest_mtime = path, mtime
+        if newest_image is None:
             logging.warning(f"No images found in the directory: {directory}")
-            return None
-        # Return the newest image file
-        newest_image = max(image_files, key=os.path.getmtime)
         return newest_image
-    except FileNotFoundError:
-        logging.error(f"Directory not found: {directory}")
-        return None
     except Exception as e:
         logging.error(f"Error finding newest image: {e}")
         return None
 
-def process_image(image_path, output_folder, plant_id, experiment_id):
+def capture_experiment(image_path):
+    """Return the experiment id in a time-lapse file name, or "default"."""
+    parsed = parse_capture_name(image_path)
+    return parsed[0] if parsed else "default"
+
+def process_image(image_path, output_folder, plant_id, experiment_id, calibration=None, camera_id="default", method=None):
     """
     Process a single image to detect plants and analyze their sizes.
     :param image_path: Path to the input image.
     :param output_folder: Folder to save the results.
     :param plant_id: ID of the plant (from the `plants` table).
     :param experiment_id: ID of the experiment (from the `experiments` table).
+    :param calibration: Optional CalibrationStore (keyed by camera and the experiment in the file name).
+    :param camera_id: Camera the image was taken with.
+    :param method: Measurement method ("edges" or "vegetation"; defaults to MEASUREMENT_METHOD).
+    :return: List of plant measurements, or None if the image could not be processed.
     """
     try:
         # Load the image
         image = cv2.imread(image_path)
         if image is None:
             logging.error(f"Error: Unable to load image at {image_path}")
-            return
+            return None
 
         # Analyze the image
-        plant_data = analyze_image(image)
+        plant_data = analyze_image(image, calibration, camera_id, capture_experiment(image_path), method)
 
         # Prepare data for CSV
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -197,8 +295,10 @@ def process_image(image_path, output_folder, plant_id, experiment_id):
         os.chmod(csv_file, 0o600)
 
         logging.info(f"Analysis results appended to {csv_file}")
+        return plant_data
     except Exception as e:
         logging.error(f"Error processing image: {e}")
+        return None
 
 def main():
     try:
@@ -213,8 +313,12 @@ def main():
         logging.info(f"Resolved time_lapse directory: {time_lapse_dir}")
         logging.info(f"Resolved output folder: {output_folder}")
 
+        # Use the capture index when the app has created one
+        index_path = os.getenv("CAPTURE_INDEX", os.path.join(os.path.dirname(time_lapse_dir), "capture_index.sqlite3"))
+        index = CaptureIndex(index_path) if os.path.exists(index_path) else None
+
         # Find the newest image in the directory
-        newest_image_path = find_newest_image(time_lapse_dir)
+        newest_image_path = find_newest_image(time_lapse_dir, index=index)
         if newest_image_path:
             logging.info(f"Analyzing the newest image: {newest_image_path}")
             
@@ -223,7 +327,9 @@ def main():
             experiment_id = int(os.getenv("EXPERIMENT_ID", 1))  # Default to 1 if not set
 
             # Process the image and save results
-            process_image(newest_image_path, output_folder, plant_id, experiment_id)
+            plant_data = process_image(newest_image_path, output_folder, plant_id, experiment_id)
+            if plant_data is not None and index is not None:
+                index.mark_analyzed([newest_image_path])
         else:
             logging.warning("No images found in the directory.")
     except Exception as e:
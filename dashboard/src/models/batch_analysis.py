@@ -0,0 +1,310 @@
+# src/models/batch_analysis.py
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+from src.models.analyze_image import analysis_version, analyze_image
+from src.models.calibration import CalibrationStore
+from src.models.capture_index import CaptureIndex, parse_capture_name
+
+CSV_FIELDS = ["timestamp", "plant_id", "experiment_id", "image_path", "width", "height"]
+
+_skip_hashes = frozenset()
+_calibration = None
+_camera_id = "default"
+_method = None
+
+
+def _init_worker(skip_hashes, calibration_path=None, camera_id="default", method=None):
+    """Process pool initializer: one OpenCV thread per process, since the pool already uses every core."""
+    global _skip_hashes, _calibration, _camera_id, _method
+    _skip_hashes = skip_hashes
+    _camera_id = camera_id
+    _method = method
+    if calibration_path:
+        # Calibrations made by a worker stay in that process
+        _calibration = CalibrationStore(calibration_path, save=False)
+    cv2.setNumThreads(1)
+
+
+def _analyze_file(path):
+    """
+    Read, hash, decode and analyze one image in a worker process.
+    :return: Tuple (path, content_hash, plants, error); plants is None when the hash was already
+             analyzed or the analysis failed, in which case error holds the reason.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    if content_hash in _skip_hashes:
+        return path, content_hash, None, None
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return path, content_hash, None, "Unable to decode image"
+    parsed = parse_capture_name(path)
+    experiment_id = parsed[0] if parsed else "default"
+    try:
+        plants = analyze_image(image, _calibration, _camera_id, experiment_id, _method, raise_errors=True)
+    except Exception as e:
+        return path, content_hash, None, f"{type(e).__name__}: {e}"
+    return path, content_hash, plants, None
+
+
+def iter_images(folder, start=None, end=None, experiment_id=None, index=None):
+    """
+    Yield (path, content_hash or None) for the captures to analyze, oldest first.
+
+    The capture index is used when it has entries (paged, and limited to
+    captures under `folder`); otherwise the per-day folders are walked one
+    at a time, so the list is never built up front.
+    :param start: Earliest capture time (datetime).
+    :param end: Latest capture time (datetime).
+    """
+    if index is not None and index.count():
+        rows = index.iter_range(start.timestamp() if start else None, end.timestamp() if end else None,
+                                experiment_id, folder=folder)
+        for row in rows:
+            yield row["path"], row["content_hash"]
+        return
+
+    for day in sorted(os.listdir(folder)):
+        day_folder = os.path.join(folder, day)
+        if not os.path.isdir(day_folder):
+            continue
+        try:
+            day_date = datetime.strptime(day, "%Y-%m-%d")
+        except ValueError:
+            continue
+        if (start and day_date + timedelta(days=1) <= start) or (end and day_date > end):
+            continue
+        captures = []
+        for name in os.listdir(day_folder):
+            parsed = parse_capture_name(name)
+            if parsed is None or (experiment_id is not None and parsed[0] != str(experiment_id)):
+                continue
+            captured_at = datetime.fromtimestamp(parsed[1])
+            if (start and captured_at < start) or (end and captured_at > end):
+                continue
+            captures.append((parsed[1], os.path.join(day_folder, name)))
+        for _, path in sorted(captures):
+            yield path, None
+
+
+class BatchAnalyzer:
+    """
+    Analyze many time-lapse images on a process pool.
+
+    Images are handed out a few at a time, so at most `workers * 2` are
+    decoded at once however large the archive is. Each result is keyed by
+    the image's content hash and the analysis version; images that already
+    have a result for the current version are skipped, and results are
+    committed every `checkpoint_every` images, so an interrupted run
+    resumes where it stopped. Images the analysis failed on are recorded
+    separately, without a result, so the next run retries them.
+    """
+
+    def __init__(self, index, csv_path=None, workers=None, checkpoint_every=50, report_interval=5.0,
+                 plant_id=1, experiment_id=1, calibration_path=None, camera_id="default", method=None):
+        """
+        :param index: CaptureIndex the results and progress are stored in.
+        :param csv_path: Optional CSV the measurements are appended to (timestamped with the capture time).
+        :param workers: Number of processes (defaults to the number of cores).
+        :param checkpoint_every: Results committed per transaction.
+        :param report_interval: Seconds between throughput log lines.
+        :param plant_id: Plant id written to the CSV.
+        :param experiment_id: Experiment id written to the CSV.
+        :param calibration_path: Optional calibration file; its PPI per experiment replaces per-image
+                                 reference detection.
+        :param camera_id: Camera the calibrations are looked up for.
+        :param method: Measurement method ("edges" or "vegetation"; defaults to MEASUREMENT_METHOD).
+        """
+        self.index = index
+        self.csv_path = csv_path
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_every = checkpoint_every
+        self.report_interval = report_interval
+        self.plant_id = plant_id
+        self.experiment_id = experiment_id
+        self.calibration_path = calibration_path
+        self.camera_id = camera_id
+        self.method = method
+        self.version = analysis_version(calibrated=bool(calibration_path), method=method)
+
+    def run(self, images, force=False):
+        """
+        Analyze images.
+        :param images: Iterable of (path, content_hash or None), e.g. from `iter_images`.
+        :param force: Analyze images even if they have a result for the current version.
+        :return: Dictionary of counters and throughput.
+        """
+        done_hashes = set() if force else self.index.analyzed_hashes(self.version)
+        stats = {"analyzed": 0, "skipped": 0, "failed": 0}
+        pending_results = []
+        pending_failures = []
+        start = last_report = time.perf_counter()
+        logging.info(f"Batch analysis {self.version} with {self.workers} process(es).")
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(frozenset(done_hashes), self.calibration_path, self.camera_id,
+                                           self.method)) as executor:
+            in_flight = set()
+            images = iter(images)
+            try:
+                while True:
+                    # Keep a bounded number of images in flight
+                    while len(in_flight) < self.workers * 2:
+                        item = next(images, None)
+                        if item is None:
+                            break
+                        path, content_hash = item
+                        if content_hash and content_hash in done_hashes:
+                            stats["skipped"] += 1
+                            continue
+                        in_flight.add(executor.submit(_analyze_file, path))
+                    if not in_flight:
+                        break
+
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._collect(future, stats, pending_results, pending_failures, done_hashes)
+                    if len(pending_results) + len(pending_failures) >= self.checkpoint_every:
+                        self._checkpoint(pending_results, pending_failures)
+
+                    now = time.perf_counter()
+                    if now - last_report >= self.report_interval:
+                        last_report = now
+                        logging.info(self._progress(stats, now - start))
+            finally:
+                # On an interruption keep whatever already finished
+                for future in in_flight:
+                    future.cancel()
+                self._checkpoint(pending_results, pending_failures)
+
+        elapsed = time.perf_counter() - start
+        stats["seconds"] = elapsed
+        stats["images_per_second"] = stats["analyzed"] / elapsed if elapsed else 0.0
+        logging.info(f"Batch analysis finished: {self._progress(stats, elapsed)}")
+        return stats
+
+    def _collect(self, future, stats, pending_results, pending_failures, done_hashes):
+        try:
+            path, content_hash, plants, error = future.result()
+        except Exception as e:
+            # Reading the file failed (or the worker died); there is no hash to record it under
+            logging.error(f"Error analyzing image: {e}")
+            stats["failed"] += 1
+            return
+        if error is not None:
+            logging.error(f"Error analyzing {path}: {error}")
+            stats["failed"] += 1
+            pending_failures.append((path, content_hash, error))
+        elif plants is None:
+            stats["skipped"] += 1
+        else:
+            stats["analyzed"] += 1
+            done_hashes.add(content_hash)
+            pending_results.append((path, content_hash, plants))
+
+    def _checkpoint(self, pending_results, pending_failures):
+        """Commit the finished results (and append them to the CSV) and the failures."""
+        if pending_failures:
+            self.index.record_failures(pending_failures, self.version)
+            pending_failures.clear()
+        if not pending_results:
+            return
+        self.index.record_analyses(
+            [(path, content_hash, json.dumps(plants)) for path, content_hash, plants in pending_results],
+            self.version
+        )
+        if self.csv_path:
+            self._append_csv(pending_results)
+        pending_results.clear()
+
+    def _append_csv(self, results):
+        directory = os.path.dirname(self.csv_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_exists = os.path.isfile(self.csv_path)
+        with open(self.csv_path, mode="a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if not file_exists:
+                writer.writeheader()
+            for path, _, plants in results:
+                parsed = parse_capture_name(path)
+                timestamp = datetime.fromtimestamp(parsed[1]) if parsed else datetime.now()
+                for plant in plants:
+                    writer.writerow({
+                        "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                        "plant_id": self.plant_id,
+                        "experiment_id": self.experiment_id,
+                        "image_path": os.path.basename(path),
+                        "width": plant["width_inches"],
+                        "height": plant["height_inches"]
+                    })
+
+    @staticmethod
+    def _progress(stats, elapsed):
+        rate = stats["analyzed"] / elapsed if elapsed else 0.0
+        return (f"{stats['analyzed']} analyzed, {stats['skipped']} skipped, {stats['failed']} failed "
+                f"in {elapsed:.0f} s ({rate:.1f} images/s)")
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a range of time-lapse images in parallel.")
+    parser.add_argument("folder", help="Time-lapse folder (with one subfolder per day)")
+    parser.add_argument("--start", type=parse_date, help="First day to analyze (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, help="Last day to analyze (YYYY-MM-DD)")
+    parser.add_argument("--experiment", help="Only analyze this experiment's images")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of cores)")
+    parser.add_argument("--db", help="Capture index (default: capture_index.sqlite3 next to the folder)")
+    parser.add_argument("--csv", help="Append measurements to this CSV (default: convert/time_lapse_data.csv next to the folder)")
+    parser.add_argument("--no-csv", action="store_true", help="Only store results in the capture index")
+    parser.add_argument("--calibration", help="Calibration file (default: calibration.json next to the folder, if present)")
+    parser.add_argument("--no-calibration", action="store_true", help="Detect the reference object in every image")
+    parser.add_argument("--camera", default=os.getenv("CAMERA_DEVICE", "/dev/video0"), help="Camera id of the calibrations")
+    parser.add_argument("--method", choices=["edges", "vegetation"], help="Measurement method (default: MEASUREMENT_METHOD)")
+    parser.add_argument("--scan", action="store_true", help="Walk the folders even if the capture index has entries")
+    parser.add_argument("--force", action="store_true", help="Re-analyze images that already have results")
+    parser.add_argument("--plant-id", type=int, default=int(os.getenv("PLANT_ID", 1)))
+    parser.add_argument("--experiment-id", type=int, default=int(os.getenv("EXPERIMENT_ID", 1)),
+                        help="Experiment id written to the CSV")
+    args = parser.parse_args()
+
+    folder = os.path.abspath(os.path.expanduser(args.folder))
+    parent = os.path.dirname(folder)
+    index = CaptureIndex(args.db or os.path.join(parent, "capture_index.sqlite3"))
+    csv_path = None if args.no_csv else args.csv or os.path.join(parent, "convert", "time_lapse_data.csv")
+    end = args.end + timedelta(days=1) - timedelta(microseconds=1) if args.end else None
+
+    calibration_path = args.calibration or os.path.join(parent, "calibration.json")
+    if args.no_calibration or not os.path.exists(calibration_path):
+        calibration_path = None
+
+    analyzer = BatchAnalyzer(index, csv_path=csv_path, workers=args.workers,
+                             plant_id=args.plant_id, experiment_id=args.experiment_id,
+                             calibration_path=calibration_path, camera_id=args.camera, method=args.method)
+    images = iter_images(folder, args.start, end, args.experiment, None if args.scan else index)
+    try:
+        stats = analyzer.run(images, force=args.force)
+    except KeyboardInterrupt:
+        print("Interrupted; finished results were saved and will be skipped next time.")
+        return
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
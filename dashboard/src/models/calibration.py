@@ -0,0 +1,194 @@
+# src/models/calibration.py
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class CalibrationStore:
+    """
+    Pixels-per-inch calibration per camera and experiment.
+
+    Detecting the reference object is the most expensive part of an image
+    analysis and its result jitters from frame to frame, although a fixed
+    camera's scale does not change. The PPI is therefore measured once and
+    reused until it is older than `validity`, the scene has changed (the
+    camera was moved or zoomed), or a recalibration is requested. Pinning the
+    reference object makes detection look only for that object. When detection
+    fails (e.g. the reference object was removed), the previous PPI is kept and
+    detection is not retried for `retry_interval`. Entries are saved to a JSON file.
+    """
+
+    def __init__(self, path=None, validity=7 * 24 * 3600, scene_threshold=20.0, size=(32, 32), save=True,
+                 retry_interval=3600):
+        """
+        :param path: JSON file the calibrations are loaded from and saved to (kept in memory only if None).
+        :param validity: Seconds a calibration stays valid.
+        :param scene_threshold: Mean absolute grey-level difference (0-255) between the scene at
+                                calibration time and now above which the camera is recalibrated.
+        :param size: (width, height) of the scene signature thumbnail.
+        :param save: Write changes back to `path` (disable in worker processes sharing the file).
+        :param retry_interval: Seconds to wait after a failed detection before detecting again.
+        """
+        self.path = path
+        self.save = save
+        self.validity = validity
+        self.scene_threshold = scene_threshold
+        self.size = size
+        self.retry_interval = retry_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def key(camera_id, experiment_id):
+        return f"{camera_id}/{experiment_id}"
+
+    def signature(self, image):
+        """Return a small grayscale thumbnail of the scene."""
+        thumbnail = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        return thumbnail.astype(np.int16)
+
+    def ppi(self, image, detect, camera_id="default", experiment_id="default", now=None):
+        """
+        Return the PPI for an image, calibrating only when needed.
+        :param image: BGR image (NumPy array).
+        :param detect: Callable `detect(image, reference_object)` returning (object name, ppi) or None.
+        :param camera_id: Camera the image was taken with.
+        :param experiment_id: Experiment the image belongs to.
+        :param now: Current time (defaults to time.time()).
+        :return: PPI, or None if there is no calibration and no reference object was found.
+        """
+        now = time.time() if now is None else now
+        key = self.key(camera_id, experiment_id)
+        signature = self.signature(image)
+        with self._lock:
+            entry = self._entries.get(key)
+        reason = self._stale(entry, signature, now)
+        if reason is None:
+            return entry["ppi"]
+        if self._backing_off(entry, now):
+            return entry.get("ppi")
+
+        logging.info(f"Calibrating {key}: {reason}.")
+        found = detect(image, entry.get("reference_object_pin") if entry else None)
+        if found is None:
+            self._failed(key, now)
+            if entry and entry.get("ppi"):
+                logging.warning(f"No reference object found; keeping the previous calibration of {key}.")
+                return entry["ppi"]
+            return None
+        self._store(key, found[0], found[1], signature, now)
+        return found[1]
+
+    def _backing_off(self, entry, now):
+        """Return True if the last detection failed less than `retry_interval` ago."""
+        return (entry is not None and not entry.get("recalibrate")
+                and now - entry.get("failed_at", -math.inf) < self.retry_interval)
+
+    def _failed(self, key, now):
+        """Record a failed detection, so the next ones wait for `retry_interval`."""
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry["failed_at"] = now
+            entry["recalibrate"] = False
+            self._save()
+
+    def _stale(self, entry, signature, now):
+        """Return why an entry needs recalibration, or None if it is still valid."""
+        if entry is None or not entry.get("ppi"):
+            return "no calibration yet"
+        if entry.get("recalibrate"):
+            return "recalibration requested"
+        if now - entry["calibrated_at"] > self.validity:
+            return "calibration expired"
+        reference = np.array(entry["signature"], dtype=np.int16)
+        if reference.shape != signature.shape:
+            return "scene size changed"
+        difference = float(np.abs(reference - signature).mean())
+        if difference > self.scene_threshold:
+            return f"scene changed ({difference:.1f} grey levels)"
+        return None
+
+    def calibrate(self, image, detect, camera_id="default", experiment_id="default"):
+        """Measure the PPI now, regardless of the stored calibration."""
+        self.recalibrate(camera_id, experiment_id)
+        return self.ppi(image, detect, camera_id, experiment_id)
+
+    def _store(self, key, reference_object, ppi, signature, now):
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry.update({
+                "ppi": float(ppi),
+                "reference_object": reference_object,
+                "calibrated_at": now,
+                "signature": signature.tolist(),
+                "recalibrate": False,
+            })
+            entry.pop("failed_at", None)
+            self._save()
+        logging.info(f"Calibrated {key}: {ppi:.2f} PPI from {reference_object}.")
+
+    def pin(self, camera_id, experiment_id, reference_object):
+        """
+        Only look for `reference_object` when calibrating (None unpins); forces a recalibration.
+        """
+        with self._lock:
+            entry = self._entries.setdefault(self.key(camera_id, experiment_id), {})
+            entry["reference_object_pin"] = reference_object
+            entry["recalibrate"] = True
+            self._save()
+
+    def recalibrate(self, camera_id, experiment_id):
+        """Recalibrate at the next analysis."""
+        with self._lock:
+            entry = self._entries.setdefault(self.key(camera_id, experiment_id), {})
+            entry["recalibrate"] = True
+            self._save()
+
+    def get(self, camera_id, experiment_id):
+        """Return a calibration without its scene signature, or None."""
+        with self._lock:
+            entry = self._entries.get(self.key(camera_id, experiment_id))
+            return self._public(entry) if entry else None
+
+    def list_calibrations(self):
+        with self._lock:
+            return {key: self._public(entry) for key, entry in self._entries.items()}
+
+    def _public(self, entry):
+        entry = {key: value for key, value in entry.items() if key != "signature"}
+        if entry.get("calibrated_at"):
+            entry["expires_at"] = entry["calibrated_at"] + self.validity
+        return entry
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read calibrations from {self.path}: {e}")
+
+    def _save(self):
+        """Write the calibrations atomically (temporary file, then rename)."""
+        if not self.path or not self.save:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logging.error(f"Could not save calibrations to {self.path}: {e}")
@@ -0,0 +1,375 @@
+# src/models/capture_index.py
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    path TEXT PRIMARY KEY,
+    experiment_id TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT,
+    analyzed_at REAL
+);
+CREATE INDEX IF NOT EXISTS captures_experiment_time ON captures (experiment_id, captured_at);
+CREATE INDEX IF NOT EXISTS captures_time ON captures (captured_at);
+CREATE INDEX IF NOT EXISTS captures_unanalyzed ON captures (captured_at) WHERE analyzed_at IS NULL;
+CREATE TABLE IF NOT EXISTS analysis_results (
+    content_hash TEXT NOT NULL,
+    analysis_version TEXT NOT NULL,
+    path TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    plants TEXT,
+    PRIMARY KEY (content_hash, analysis_version)
+);
+CREATE TABLE IF NOT EXISTS analysis_failures (
+    content_hash TEXT NOT NULL,
+    analysis_version TEXT NOT NULL,
+    path TEXT NOT NULL,
+    failed_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    PRIMARY KEY (content_hash, analysis_version)
+);
+"""
+
+
+def parse_capture_name(path):
+    """
+    Split a `<experiment_id>_<YYYYmmdd_HHMMSS>.<ext>` file name.
+    :return: Tuple (experiment_id, timestamp), or None if the name does not match.
+    """
+    stem, extension = os.path.splitext(os.path.basename(path))
+    if extension.lower() not in IMAGE_EXTENSIONS:
+        return None
+    parts = stem.rsplit("_", 2)
+    if len(parts) != 3:
+        return None
+    try:
+        captured_at = datetime.strptime(f"{parts[1]}_{parts[2]}", "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+    return parts[0], captured_at.timestamp()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CaptureIndex:
+    """
+    SQLite catalog of time-lapse captures.
+
+    Every saved image is recorded with its experiment, capture time, size and
+    content hash, so "newest image of an experiment", date-range and "not yet
+    analyzed" lookups are index seeks instead of directory scans, however
+    large the archive grows. The database runs in WAL mode, so the analysis
+    script can read it while the app writes.
+    """
+
+    def __init__(self, db_path):
+        """
+        :param db_path: SQLite database file (created if missing).
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, path, experiment_id, captured_at, size, content_hash=None):
+        """
+        Record a capture (replacing an earlier entry for the same path).
+        :param path: Image path.
+        :param experiment_id: Experiment the image belongs to.
+        :param captured_at: Capture time (Unix timestamp).
+        :param size: File size in bytes.
+        :param content_hash: SHA-256 of the file contents.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO captures (path, experiment_id, captured_at, size, content_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), str(experiment_id), captured_at, size, content_hash)
+            )
+
+    def add_file(self, path, content_hash=None):
+        """
+        Record a saved image, taking the experiment and time from its file name.
+        :param path: Image path following the time-lapse naming convention.
+        :param content_hash: SHA-256 of the contents (computed from the file if None).
+        :return: True if the file was recorded.
+        """
+        parsed = parse_capture_name(path)
+        if parsed is None:
+            logging.warning(f"Not indexing {path}: name does not follow <experiment_id>_<timestamp>.")
+            return False
+        experiment_id, captured_at = parsed
+        self.add(path, experiment_id, captured_at, os.path.getsize(path), content_hash or file_hash(path))
+        return True
+
+    def remove(self, path):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM captures WHERE path = ?", (os.path.abspath(path),))
+
+    def newest(self, experiment_id=None):
+        """
+        Return the newest capture, of one experiment or overall.
+        :return: Row dictionary, or None.
+        """
+        if experiment_id is None:
+            row = self._connection().execute(
+                "SELECT * FROM captures ORDER BY captured_at DESC LIMIT 1").fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT * FROM captures WHERE experiment_id = ? ORDER BY captured_at DESC LIMIT 1",
+                (str(experiment_id),)).fetchone()
+        return dict(row) if row else None
+
+    def in_range(self, start=None, end=None, experiment_id=None, limit=None):
+        """
+        Return captures in a time range, oldest first.
+        :param start: Earliest capture time (Unix timestamp).
+        :param end: Latest capture time (Unix timestamp).
+        :param experiment_id: Only this experiment.
+        :param limit: Maximum number of rows.
+        :return: List of row dictionaries.
+        """
+        clauses, params = [], []
+        if experiment_id is not None:
+            clauses.append("experiment_id = ?")
+            params.append(str(experiment_id))
+        if start is not None:
+            clauses.append("captured_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("captured_at <= ?")
+            params.append(end)
+        return self._select(clauses, params, limit)
+
+    def iter_range(self, start=None, end=None, experiment_id=None, folder=None, page_size=1000):
+        """
+        Yield captures in a time range, oldest first, one page at a time.
+
+        Pages are fetched with a keyset cursor on (captured_at, path), so a
+        large archive is never loaded into memory at once and no page is
+        skipped or repeated while new captures are added.
+        :param start: Earliest capture time (Unix timestamp).
+        :param end: Latest capture time (Unix timestamp).
+        :param experiment_id: Only this experiment.
+        :param folder: Only captures stored under this folder.
+        :param page_size: Rows fetched per query.
+        :return: Iterator of row dictionaries.
+        """
+        clauses, params = [], []
+        if experiment_id is not None:
+            clauses.append("experiment_id = ?")
+            params.append(str(experiment_id))
+        if start is not None:
+            clauses.append("captured_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("captured_at <= ?")
+            params.append(end)
+        if folder is not None:
+            prefix = os.path.join(os.path.abspath(folder), "")
+            clauses.append("substr(path, 1, ?) = ?")
+            params.extend([len(prefix), prefix])
+
+        cursor = None
+        while True:
+            page_clauses, page_params = list(clauses), list(params)
+            if cursor is not None:
+                page_clauses.append("(captured_at > ? OR (captured_at = ? AND path > ?))")
+                page_params.extend([cursor[0], cursor[0], cursor[1]])
+            query = "SELECT * FROM captures"
+            if page_clauses:
+                query += " WHERE " + " AND ".join(page_clauses)
+            query += " ORDER BY captured_at, path LIMIT ?"
+            rows = [dict(row) for row in self._connection().execute(query, page_params + [int(page_size)])]
+            yield from rows
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1]["captured_at"], rows[-1]["path"])
+
+    def unanalyzed(self, experiment_id=None, limit=None):
+        """Return captures that have not been analyzed yet, oldest first."""
+        clauses, params = ["analyzed_at IS NULL"], []
+        if experiment_id is not None:
+            clauses.append("experiment_id = ?")
+            params.append(str(experiment_id))
+        return self._select(clauses, params, limit)
+
+    def _select(self, clauses, params, limit):
+        query = "SELECT * FROM captures"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY captured_at"
+        if limit is not None:
+            query += " LIMIT ?"
+            params = params + [int(limit)]
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+    def mark_analyzed(self, paths, analyzed_at=None):
+        """Mark captures as analyzed."""
+        analyzed_at = analyzed_at or time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany("UPDATE captures SET analyzed_at = ? WHERE path = ?",
+                             [(analyzed_at, os.path.abspath(path)) for path in paths])
+
+    def analyzed_hashes(self, analysis_version):
+        """Return the content hashes that already have results for an analysis version."""
+        rows = self._connection().execute(
+            "SELECT content_hash FROM analysis_results WHERE analysis_version = ?", (analysis_version,))
+        return {row[0] for row in rows}
+
+    def record_analyses(self, results, analysis_version):
+        """
+        Store batch analysis results and mark their captures as analyzed.
+        :param results: List of (path, content_hash, plants) tuples; plants is a JSON string or None.
+        :param analysis_version: Version of the analysis that produced them.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO analysis_results (content_hash, analysis_version, path, analyzed_at, plants) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(content_hash, analysis_version, os.path.abspath(path), now, plants)
+                 for path, content_hash, plants in results]
+            )
+            conn.executemany("UPDATE captures SET analyzed_at = ? WHERE path = ?",
+                             [(now, os.path.abspath(path)) for path, _, _ in results])
+            conn.executemany("DELETE FROM analysis_failures WHERE (content_hash = ? OR path = ?) AND analysis_version = ?",
+                             [(content_hash, os.path.abspath(path), analysis_version)
+                              for path, content_hash, _ in results])
+
+    def record_failures(self, failures, analysis_version):
+        """
+        Store images a batch analysis failed on; they get no result, so the next run retries them.
+        :param failures: List of (path, content_hash, error) tuples.
+        :param analysis_version: Version of the analysis that failed.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO analysis_failures (content_hash, analysis_version, path, failed_at, error) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (content_hash, analysis_version) DO UPDATE SET "
+                "path = excluded.path, failed_at = excluded.failed_at, error = excluded.error, "
+                "attempts = attempts + 1",
+                [(content_hash, analysis_version, os.path.abspath(path), now, error)
+                 for path, content_hash, error in failures]
+            )
+
+    def failures(self, analysis_version):
+        """Return the images that failed with an analysis version, most recent first."""
+        rows = self._connection().execute(
+            "SELECT * FROM analysis_failures WHERE analysis_version = ? ORDER BY failed_at DESC",
+            (analysis_version,))
+        return [dict(row) for row in rows]
+
+    def count(self, experiment_id=None):
+        if experiment_id is None:
+            return self._connection().execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM captures WHERE experiment_id = ?", (str(experiment_id),)).fetchone()[0]
+
+    def rebuild(self, folder, batch_size=1000):
+        """
+        Index every image under a folder (including the per-day subfolders).
+
+        Files already indexed with the same size are skipped, so the rebuild
+        can be rerun cheaply; entries whose files are gone are removed.
+        :param folder: Time-lapse folder.
+        :param batch_size: Rows inserted per transaction.
+        :return: Tuple (added, removed).
+        """
+        conn = self._connection()
+        known = {row["path"]: row["size"] for row in conn.execute("SELECT path, size FROM captures")}
+        seen = set()
+        batch = []
+        added = 0
+        for root, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.abspath(os.path.join(root, name))
+                parsed = parse_capture_name(path)
+                if parsed is None:
+                    continue
+                seen.add(path)
+                try:
+                    size = os.path.getsize(path)
+                    if known.get(path) == size:
+                        continue
+                    batch.append((path, parsed[0], parsed[1], size, file_hash(path)))
+                except OSError as e:
+                    logging.warning(f"Skipping {path}: {e}")
+                    continue
+                if len(batch) >= batch_size:
+                    added += self._insert(batch)
+                    batch = []
+        added += self._insert(batch)
+
+        # Only forget files that belonged to the rebuilt folder
+        prefix = os.path.join(os.path.abspath(folder), "")
+        missing = [(path,) for path in known if path.startswith(prefix) and path not in seen]
+        with conn:
+            conn.executemany("DELETE FROM captures WHERE path = ?", missing)
+        logging.info(f"Capture index rebuilt from {folder}: {added} added, {len(missing)} removed.")
+        return added, len(missing)
+
+    def _insert(self, rows):
+        if not rows:
+            return 0
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO captures (path, experiment_id, captured_at, size, content_hash) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the time-lapse capture index from the image folders.")
+    parser.add_argument("folder", help="Time-lapse folder (with one subfolder per day)")
+    parser.add_argument("--db", help="Index database (default: capture_index.sqlite3 next to the folder)")
+    args = parser.parse_args()
+
+    folder = os.path.abspath(os.path.expanduser(args.folder))
+    db_path = args.db or os.path.join(os.path.dirname(folder), "capture_index.sqlite3")
+    index = CaptureIndex(db_path)
+    added, removed = index.rebuild(folder)
+    print(f"{db_path}: {index.count()} captures ({added} added, {removed} removed)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,68 @@
+# src/models/decoding.py
+import numpy as np
+
+
+class OutputDecoder:
+    """
+    Turn a classifier's output tensor into labelled probabilities.
+
+    The top-k classes are found with `np.argpartition`. Only those k scores
+    are dequantized with the tensor's scale and zero point, so the cost does
+    not depend on how many thousand classes the model has.
+    """
+
+    def __init__(self, output_details, labels, top_k=3, threshold=0.0):
+        """
+        :param output_details: Output tensor details of the interpreter.
+        :param labels: Label table from `read_label_file`.
+        :param top_k: Number of candidates reported per detection.
+        :param threshold: Minimum probability for a result to count as a detection.
+        """
+        self.labels = labels
+        self.top_k = top_k
+        self.threshold = threshold
+        scale, zero_point = output_details[0].get('quantization', (0.0, 0))
+        self.scale = float(scale)
+        self.zero_point = int(zero_point)
+
+    def dequantize(self, scores):
+        """Convert raw output values to probabilities."""
+        scores = scores.astype(np.float32)
+        if self.scale:
+            scores = (scores - self.zero_point) * self.scale
+        return scores
+
+    def label(self, index):
+        """Return the label of a class id."""
+        if 0 <= index < len(self.labels):
+            return self.labels[index]
+        return str(index)
+
+    def decode(self, output, category):
+        """
+        Decode one output tensor.
+        :param output: Output tensor (or a view of it).
+        :param category: Model category the output belongs to.
+        :return: Detection dictionary (category, label, label_id, confidence, candidates), or None
+                 if the best probability is below the threshold.
+        """
+        scores = output.reshape(-1)
+        k = min(self.top_k, scores.size)
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        probabilities = self.dequantize(scores[top])
+
+        if probabilities[0] < self.threshold:
+            return None
+
+        candidates = [
+            {"label": self.label(int(index)), "confidence": float(probability)}
+            for index, probability in zip(top, probabilities)
+        ]
+        return {
+            "category": category,
+            "label": candidates[0]["label"],
+            "label_id": int(top[0]),
+            "confidence": candidates[0]["confidence"],
+            "candidates": candidates,
+        }
@@ -0,0 +1,255 @@
+# src/models/detection_store.py
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# One row per detection: 33 bytes, so 100 000 detections take about 3.3 MB.
+# Boxes are (x, y, w, h) in frame pixels, or all -1 for whole-frame results.
+DETECTION_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("category", "u1"),
+    ("label", "i4"),
+    ("confidence", "f4"),
+    ("bbox", "i4", (4,)),
+])
+
+
+class DetectionStore:
+    """
+    Detection history in a preallocated NumPy ring buffer.
+
+    Detections are appended as fixed-size records (category and label are
+    stored as ids), so hours of history fit in a few MB and time-window
+    queries are vectorized mask operations instead of loops over dicts.
+    Rows are written to the database in periodic bulk inserts by `flush`.
+    """
+
+    def __init__(self, labels, capacity=100000):
+        """
+        :param labels: Dict of category -> label table (from `load_models`); the dict order
+                       defines the category ids.
+        :param capacity: Maximum number of detections kept; the oldest are overwritten.
+        """
+        self.categories = list(labels.keys())
+        self.labels = labels
+        self.capacity = capacity
+        self._category_ids = {category: index for index, category in enumerate(self.categories)}
+        self._label_ids = {}
+        self._records = np.zeros(capacity, dtype=DETECTION_DTYPE)
+        self._written = 0  # Total rows ever added
+        self._flushed = 0  # Total rows handed to the database
+        self.lost = 0  # Rows overwritten before they were flushed
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def _label_id(self, category, label):
+        """Look up the id of a label name (for detections decoded without one)."""
+        ids = self._label_ids.get(category)
+        if ids is None:
+            table = self.labels.get(category, [])
+            ids = self._label_ids[category] = {name: index for index, name in enumerate(table)}
+        return ids.get(label, -1)
+
+    def add(self, detections, timestamp=None):
+        """
+        Append detections.
+        :param detections: List of detection dictionaries (category, label[, label_id], confidence[, bbox]).
+        :param timestamp: Detection time (defaults to now).
+        """
+        rows = []
+        timestamp = timestamp or time.time()
+        for detection in detections:
+            category = detection["category"]
+            if category not in self._category_ids:
+                continue
+            label_id = detection.get("label_id")
+            if label_id is None:
+                label_id = self._label_id(category, detection["label"])
+            rows.append((
+                detection.get("timestamp", timestamp),
+                self._category_ids[category],
+                label_id,
+                detection["confidence"],
+                detection.get("bbox") or (-1, -1, -1, -1),
+            ))
+        if not rows:
+            return
+
+        new = np.array(rows, dtype=DETECTION_DTYPE)[-self.capacity:]
+        with self._lock:
+            self.lost += len(rows) - len(new)
+            start = self._written % self.capacity
+            end = start + len(new)
+            if end <= self.capacity:
+                self._records[start:end] = new
+            else:
+                split = self.capacity - start
+                self._records[start:] = new[:split]
+                self._records[:end - self.capacity] = new[split:]
+            self._written += len(new)
+            if self._written - self._flushed > self.capacity:
+                self.lost += self._written - self._flushed - self.capacity
+                self._flushed = self._written - self.capacity
+
+    def _ordered(self, first=None):
+        """Return a copy of the rows from total index `first` on, oldest first."""
+        with self._lock:
+            oldest = max(self._written - self.capacity, 0)
+            first = oldest if first is None else max(first, oldest)
+            count = self._written - first
+            if count <= 0:
+                return np.zeros(0, dtype=DETECTION_DTYPE), self._written
+            start = first % self.capacity
+            indices = (start + np.arange(count)) % self.capacity
+            return self._records[indices], self._written
+
+    def query(self, start=None, end=None, category=None, label=None, min_confidence=None):
+        """
+        Select detections, oldest first.
+        :param start: Earliest timestamp (seconds since the epoch).
+        :param end: Latest timestamp.
+        :param category: Only this category.
+        :param label: Only this label name.
+        :param min_confidence: Minimum confidence (0-1).
+        :return: Structured array of matching records.
+        """
+        records, _ = self._ordered()
+        mask = np.ones(len(records), dtype=bool)
+        if start is not None:
+            mask &= records["timestamp"] >= start
+        if end is not None:
+            mask &= records["timestamp"] <= end
+        if category is not None:
+            if category not in self._category_ids:
+                return records[:0]
+            mask &= records["category"] == self._category_ids[category]
+            if label is not None:
+                mask &= records["label"] == self._label_id(category, label)
+        elif label is not None:
+            matches = np.zeros(len(records), dtype=bool)
+            for category_id, name in enumerate(self.categories):
+                label_id = self._label_id(name, label)
+                if label_id >= 0:
+                    matches |= (records["category"] == category_id) & (records["label"] == label_id)
+            mask &= matches
+        if min_confidence is not None:
+            mask &= records["confidence"] >= min_confidence
+        return records[mask]
+
+    def label_name(self, category_id, label_id):
+        """Return the label name of a stored record."""
+        table = self.labels.get(self.categories[category_id], [])
+        if 0 <= label_id < len(table):
+            return table[label_id]
+        return str(label_id)
+
+    def to_dicts(self, records):
+        """Convert records to detection dictionaries for JSON responses."""
+        detections = []
+        for record in records:
+            detection = {
+                "timestamp": datetime.fromtimestamp(float(record["timestamp"])).isoformat(),
+                "category": self.categories[record["category"]],
+                "label": self.label_name(record["category"], int(record["label"])),
+                "confidence": float(record["confidence"]),
+            }
+            if record["bbox"][0] >= 0:
+                detection["bbox"] = [int(value) for value in record["bbox"]]
+            detections.append(detection)
+        return detections
+
+    def top_labels_per_hour(self, start=None, end=None, category=None, top=5):
+        """
+        Count detections per label for each hour.
+        :param start: Earliest timestamp (seconds since the epoch).
+        :param end: Latest timestamp.
+        :param category: Only this category.
+        :param top: Number of labels reported per hour.
+        :return: List of {"hour", "labels": [{"category", "label", "count"}]} dicts, oldest hour first.
+        """
+        records = self.query(start=start, end=end, category=category)
+        if not len(records):
+            return []
+
+        # Pack (hour, category, label) into one integer key and count with np.unique
+        hours = (records["timestamp"] // 3600).astype(np.int64)
+        labels = records["label"].astype(np.int64) + 1  # Unknown labels (-1) become 0
+        keys = (hours << 40) | (records["category"].astype(np.int64) << 32) | labels
+        keys, counts = np.unique(keys, return_counts=True)
+        key_hours = keys >> 40
+        key_categories = (keys >> 32) & 0xFF
+        key_labels = (keys & 0xFFFFFFFF) - 1
+
+        summary = []
+        for hour in np.unique(key_hours):
+            selected = np.flatnonzero(key_hours == hour)
+            selected = selected[np.argsort(counts[selected], kind="stable")[::-1][:top]]
+            summary.append({
+                "hour": datetime.fromtimestamp(int(hour) * 3600).isoformat(),
+                "labels": [
+                    {
+                        "category": self.categories[int(key_categories[i])],
+                        "label": self.label_name(int(key_categories[i]), int(key_labels[i])),
+                        "count": int(counts[i]),
+                    }
+                    for i in selected
+                ],
+            })
+        return summary
+
+    def flush(self, get_connection, batch_size=1000):
+        """
+        Bulk-insert the rows added since the last flush.
+        :param get_connection: Callable returning a DB-API connection (or None).
+        :param batch_size: Rows per `executemany` call.
+        :return: Number of rows written.
+        """
+        records, written = self._ordered(self._flushed)
+        if not len(records):
+            return 0
+        conn = get_connection()
+        if conn is None:
+            return 0
+
+        rows = [
+            (
+                datetime.fromtimestamp(float(record["timestamp"])),
+                self.categories[record["category"]],
+                self.label_name(record["category"], int(record["label"])),
+                float(record["confidence"]),
+                *(int(value) if record["bbox"][0] >= 0 else None for value in record["bbox"]),
+            )
+            for record in records
+        ]
+        try:
+            cursor = conn.cursor()
+            for i in range(0, len(rows), batch_size):
+                cursor.executemany('''
+                    INSERT INTO detection_history (detected_at, category, label, confidence, bbox_x, bbox_y, bbox_w, bbox_h)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows[i:i + batch_size])
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error writing detection history: {e}")
+            return 0
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._flushed = max(self._flushed, written)
+        return len(rows)
+
+    def stats(self):
+        """Return buffer usage and persistence counters."""
+        return {
+            "stored": len(self),
+            "capacity": self.capacity,
+            "memory_bytes": self._records.nbytes,
+            "pending": self._written - self._flushed,
+            "lost": self.lost,
+        }
@@ -0,0 +1,58 @@
+# src/models/features.py
+from functools import cached_property
+
+import cv2
+
+
+class ImageFeatures:
+    """
+    Image products shared by the steps of one image's analysis.
+
+    Grayscale, blurred, edge and contour images are computed on first use
+    and cached, so reference detection and plant measurement reuse them
+    instead of each converting and edge-detecting the image again. Create
+    one instance per image; it is not meant to outlive that analysis.
+    """
+
+    def __init__(self, image, blur_kernel=(5, 5)):
+        """
+        :param image: BGR image (NumPy array).
+        :param blur_kernel: Gaussian kernel size of `blurred`.
+        """
+        self.image = image
+        self.blur_kernel = blur_kernel
+        self._edges = {}
+        self._contours = {}
+
+    @classmethod
+    def of(cls, image):
+        """Return `image` if it already is an ImageFeatures, else wrap it."""
+        return image if isinstance(image, cls) else cls(image)
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def blurred(self):
+        return cv2.GaussianBlur(self.gray, self.blur_kernel, 0)
+
+    def edges(self, low=100, high=200, blurred=False):
+        """
+        Canny edges of the grayscale (or blurred) image.
+        :param low: Lower Canny threshold.
+        :param high: Upper Canny threshold.
+        :param blurred: Detect edges on the blurred image.
+        """
+        key = (low, high, blurred)
+        if key not in self._edges:
+            self._edges[key] = cv2.Canny(self.blurred if blurred else self.gray, low, high)
+        return self._edges[key]
+
+    def contours(self, low=100, high=200, blurred=False):
+        """External contours of `edges(low, high, blurred)`."""
+        key = (low, high, blurred)
+        if key not in self._contours:
+            self._contours[key], _ = cv2.findContours(self.edges(low, high, blurred),
+                                                      cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return self._contours[key]
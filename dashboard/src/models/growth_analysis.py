@@ -1,19 +1,20 @@
 # src/models/growth_analysis.py
 import cv2
 
-def analyze_image(image_path):
+from src.models.features import ImageFeatures
+
+def analyze_image(image_path, features=None):
     """
     Analyze an image to detect plants and measure their size.
     :param image_path: Path to the image file.
+    :param features: Optional ImageFeatures of the already loaded image (skips reading the file).
     :return: List of plant data (width, height).
     """
-    image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 100, 200)
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if features is None:
+        features = ImageFeatures(cv2.imread(image_path))
 
     plant_data = []
-    for contour in contours:
+    for contour in features.contours(100, 200):
         x, y, w, h = cv2.boundingRect(contour)
         plant_data.append({"width": w, "height": h})
 
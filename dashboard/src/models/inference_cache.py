@@ -0,0 +1,111 @@
+# src/models/inference_cache.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from src.utils.metrics import counter, gauge
+
+# Returned by `lookup` when nothing is cached; a cached result may itself be None
+MISS = object()
+
+CACHE_HITS = counter("rootdash_inference_cache_hits_total", "Inference results reused from the cache.")
+CACHE_MISSES = counter("rootdash_inference_cache_misses_total", "Cache lookups that needed a fresh inference.")
+CACHE_EVICTIONS = counter("rootdash_inference_cache_evictions_total", "Cached results dropped as expired or over the limit.")
+CACHE_ENTRIES = gauge("rootdash_inference_cache_entries", "Results currently held in the inference cache.")
+
+
+class InferenceCache:
+    """
+    Reuse classification results while the scene has not really changed.
+
+    Each image is reduced to a tiny grayscale thumbnail (its signature).
+    A cached result is reused when the signature of the new image differs
+    from the stored one by less than `threshold` grey levels on average.
+    Entries expire after `ttl` seconds so a static scene is still
+    re-checked now and then.
+    """
+
+    def __init__(self, threshold=4.0, ttl=300.0, size=(16, 16), max_entries=8):
+        """
+        :param threshold: Maximum mean absolute difference (0-255) between signatures for a hit.
+        :param ttl: Seconds after which a cached result is evicted.
+        :param size: (width, height) of the signature thumbnail.
+        :param max_entries: Maximum entries kept per category.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.size = size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        CACHE_HITS.set_function(lambda: self.hits)
+        CACHE_MISSES.set_function(lambda: self.misses)
+        CACHE_EVICTIONS.set_function(lambda: self.evictions)
+        CACHE_ENTRIES.set_function(lambda: sum(len(entries) for entries in list(self._entries.values())))
+
+    def signature(self, image):
+        """
+        Compute the signature of an image.
+        :param image: BGR image (NumPy array).
+        :return: Small int16 grayscale thumbnail.
+        """
+        thumbnail = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def lookup(self, category, signature, now=None):
+        """
+        Return a cached result for a similar image, or MISS.
+        :param category: Model category.
+        :param signature: Signature from `signature()`.
+        :param now: Current time (defaults to time.monotonic()).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entries = self._evict(category, now)
+            for _, cached_signature, result in entries:
+                if np.abs(cached_signature - signature).mean() <= self.threshold:
+                    self.hits += 1
+                    return result
+            self.misses += 1
+            return MISS
+
+    def store(self, category, signature, result, now=None):
+        """
+        Cache a fresh result.
+        :param category: Model category.
+        :param signature: Signature of the image the result belongs to.
+        :param result: Detection dictionary, or None if nothing was detected.
+        :param now: Current time (defaults to time.monotonic()).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entries = self._evict(category, now)
+            entries.append((now, signature, result))
+            if len(entries) > self.max_entries:
+                entries.pop(0)
+                self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the number of cached entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": sum(len(entries) for entries in self._entries.values()),
+            }
+
+    def _evict(self, category, now):
+        """Drop expired entries of a category and return the remaining ones."""
+        entries = self._entries.setdefault(category, [])
+        fresh = [entry for entry in entries if now - entry[0] < self.ttl]
+        self.evictions += len(entries) - len(fresh)
+        entries[:] = fresh
+        return entries
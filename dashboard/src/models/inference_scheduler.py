@@ -0,0 +1,66 @@
+# src/models/inference_scheduler.py
+import time
+
+
+class InferenceScheduler:
+    """
+    Decide which model categories to run on each frame.
+
+    Every category gets its own target rate in Hz (plants change over
+    minutes, insects over seconds). On each frame only the categories that
+    are due are invoked, most overdue first and at most `max_per_frame` of
+    them, so the stream frame rate no longer depends on how many models are
+    loaded. Between runs the detector reuses the category's last result.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0, max_per_frame=1):
+        """
+        :param rates: Dict of category -> target rate in Hz. A rate of 0 disables the category.
+        :param default_rate: Rate used for categories missing from `rates`.
+        :param max_per_frame: Maximum number of invocations per frame (None for no limit).
+        """
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.max_per_frame = max_per_frame
+        self._next_due = {}
+
+    def period(self, category):
+        """Return the minimum time between runs of a category, or None if it is disabled."""
+        rate = self.rates.get(category, self.default_rate)
+        if not rate or rate <= 0:
+            return None
+        return 1.0 / rate
+
+    def due(self, categories, now=None):
+        """
+        Return the categories that should run on the current frame.
+        :param categories: Iterable of loaded categories.
+        :param now: Current time (defaults to time.monotonic()).
+        :return: List of categories, most overdue first.
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        for category in categories:
+            if self.period(category) is None:
+                continue
+            next_due = self._next_due.get(category, 0.0)
+            if next_due <= now:
+                due.append((next_due, category))
+
+        due.sort()
+        if self.max_per_frame is not None:
+            due = due[:self.max_per_frame]
+        return [category for _, category in due]
+
+    def record(self, category, now=None):
+        """
+        Schedule a category's next run after it has been invoked.
+        :param category: Category that was just invoked.
+        :param now: Current time (defaults to time.monotonic()).
+        """
+        now = time.monotonic() if now is None else now
+        period = self.period(category) or 0.0
+        # Advance from the previous deadline to hold the target rate; after a stall
+        # (that deadline already passed) restart from now instead of catching up
+        next_due = self._next_due.get(category, now) + period
+        self._next_due[category] = next_due if next_due > now else now + period
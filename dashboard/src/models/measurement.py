@@ -0,0 +1,110 @@
+# src/models/measurement.py
+import cv2
+import numpy as np
+
+# Columns returned by `measure_plants` (pixel units; the *_inches columns are added when a PPI is given)
+PIXEL_COLUMNS = ("area", "x", "y", "width", "height", "centroid_x", "centroid_y")
+
+
+def exg_mask(image, threshold=0.1, min_brightness=30):
+    """
+    Vegetation mask from the excess-green index of chromatic coordinates.
+
+    ExG = 2g - r - b with r, g, b normalized by their sum, so it depends on
+    colour rather than brightness; pixels darker than `min_brightness` (mean
+    of the channels) are excluded because their chromaticity is mostly noise.
+    :param image: BGR image (NumPy array).
+    :param threshold: Minimum ExG (-1..2) of a vegetation pixel, or "otsu" to choose it per image.
+    :param min_brightness: Minimum channel mean (0-255) of a vegetation pixel.
+    :return: uint8 mask (255 = vegetation).
+    """
+    blue, green, red = (channel.astype(np.int16) for channel in cv2.split(image))
+    total = blue + green + red
+    excess = 2 * green - red - blue
+    bright = total >= 3 * min_brightness
+    if threshold == "otsu":
+        # Scale ExG from -1..2 to 0..255 for Otsu's method
+        exg = excess / np.maximum(total, 1).astype(np.float32)
+        scaled = np.clip((exg + 1) * 85, 0, 255).astype(np.uint8)
+        _, mask = cv2.threshold(scaled, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return np.where(bright, mask, 0).astype(np.uint8)
+    # ExG > threshold without dividing every pixel by its sum
+    return ((excess > threshold * total) & bright).astype(np.uint8) * 255
+
+
+def hsv_mask(image, lower=(35, 40, 40), upper=(85, 255, 255)):
+    """
+    Vegetation mask from a hue/saturation/value range (OpenCV hue is 0-179, green is about 35-85).
+    :return: uint8 mask (255 = vegetation).
+    """
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+
+
+def vegetation_mask(image, index="exg", threshold=0.1, open_size=3, close_size=7):
+    """
+    Segment plants from the background.
+
+    Opening removes speckles; closing joins leaves of one plant that are
+    separated by thin gaps, so each plant becomes one connected component.
+    :param image: BGR image (NumPy array).
+    :param index: "exg" or "hsv".
+    :param threshold: ExG threshold (see `exg_mask`); ignored for "hsv".
+    :param open_size: Kernel size of the opening (0 disables it).
+    :param close_size: Kernel size of the closing (0 disables it).
+    :return: uint8 mask (255 = vegetation).
+    """
+    if index == "exg":
+        mask = exg_mask(image, threshold)
+    elif index == "hsv":
+        mask = hsv_mask(image)
+    else:
+        raise ValueError(f"Unknown vegetation index: {index}")
+    if open_size:
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (open_size, open_size)))
+    if close_size:
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (close_size, close_size)))
+    return mask
+
+
+def measure_plants(mask, min_area=500, ppi=None):
+    """
+    Measure every plant in a mask in one pass.
+    :param mask: uint8 vegetation mask.
+    :param min_area: Smallest component (pixels) counted as a plant.
+    :param ppi: Optional pixels per inch; adds width_inches, height_inches and area_sq_inches.
+    :return: Dict of column name -> NumPy array with one entry per plant, largest plant first.
+    """
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    # Row 0 is the background
+    stats, centroids = stats[1:], centroids[1:]
+    keep = stats[:, cv2.CC_STAT_AREA] > min_area
+    stats, centroids = stats[keep], centroids[keep]
+    order = np.argsort(stats[:, cv2.CC_STAT_AREA], kind="stable")[::-1]
+    stats, centroids = stats[order], centroids[order]
+
+    columns = {
+        "area": stats[:, cv2.CC_STAT_AREA],
+        "x": stats[:, cv2.CC_STAT_LEFT],
+        "y": stats[:, cv2.CC_STAT_TOP],
+        "width": stats[:, cv2.CC_STAT_WIDTH],
+        "height": stats[:, cv2.CC_STAT_HEIGHT],
+        "centroid_x": centroids[:, 0],
+        "centroid_y": centroids[:, 1],
+    }
+    if ppi:
+        columns["width_inches"] = columns["width"] / ppi
+        columns["height_inches"] = columns["height"] / ppi
+        columns["area_sq_inches"] = columns["area"] / (ppi * ppi)
+    return columns
+
+
+def to_records(columns, names=None):
+    """
+    Convert columnar results to a list of dictionaries (one per plant).
+    :param columns: Output of `measure_plants`.
+    :param names: Columns to include (all by default).
+    """
+    names = names or list(columns)
+    values = [columns[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
@@ -0,0 +1,27 @@
+# src/models/model_config.py
+# Models and labels for CORAL object detection, per category. Kept in a module of
+# its own so the dashboard and the benchmarks share it without importing app.py.
+# Paths are relative to the dashboard directory; CPU backends use the same file
+# name without the `_edgetpu` suffix (or an explicit `cpu_model_path`).
+MODELS = {
+    "plants": {
+        "model_path": "test_data/mobilenet_v2_1.0_224_inat_plant_quant_edgetpu.tflite",
+        "label_path": "test_data/inat_plant_labels.txt"
+    },
+    "bugs": {
+        "model_path": "test_data/mobilenet_v2_1.0_224_inat_insect_quant_edgetpu.tflite",
+        "label_path": "test_data/inat_insect_labels.txt"
+    },
+    "birds": {
+        "model_path": "test_data/mobilenet_v2_1.0_224_inat_bird_quant_edgetpu.tflite",
+        "label_path": "test_data/inat_bird_labels.txt"
+    },
+    "flowers": {
+        "model_path": "test_data/mobilenet_v2_1.0_224_flowers_quant_edgetpu.tflite",
+        "label_path": "test_data/flower_labels.txt"
+    },
+    "animals": {
+        "model_path": "test_data/mobilenet_v2_1.0_224_inat_mammal_quant_edgetpu.tflite",
+        "label_path": "test_data/inat_mammal_labels.txt"
+    }
+}
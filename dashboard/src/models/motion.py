@@ -0,0 +1,150 @@
+# src/models/motion.py
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Published to subscribers: `boxes` are full-resolution (x, y, w, h) tuples,
+# `area` is the total moving area in full-resolution pixels and `active` is
+# False on the single event sent when motion stops.
+MotionEvent = namedtuple("MotionEvent", ["timestamp", "boxes", "area", "active"])
+
+ALGORITHMS = ("mog2", "knn", "diff")
+
+
+class MotionEngine:
+    """
+    Detect moving regions on a downscaled copy of each frame.
+
+    Background subtraction (MOG2 or KNN) or plain frame differencing runs on
+    a frame shrunk by `scale`, optionally restricted to regions of interest,
+    and the resulting boxes are scaled back to full resolution. One engine
+    is meant to run once per camera; other stages can subscribe to its
+    motion events instead of repeating the work.
+    """
+
+    def __init__(self, algorithm="mog2", scale=0.25, min_area=500, roi=None, diff_threshold=25):
+        """
+        :param algorithm: "mog2", "knn" or "diff" (frame differencing).
+        :param scale: Factor applied to the frame before detection (1.0 for full resolution).
+        :param min_area: Minimum contour area in full-resolution pixels.
+        :param roi: Optional list of regions of interest in full-resolution pixels, each either
+                    an (x, y, w, h) rectangle or a list of (x, y) polygon points.
+        :param diff_threshold: Grey-level change counted as motion by the "diff" algorithm.
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown motion algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.scale = scale
+        self.min_area = min_area
+        self.diff_threshold = diff_threshold
+        self.roi = roi
+        self.active = False
+        self._subtractor = self._create_subtractor()
+        self._previous = None
+        self._mask = None
+        self._mask_shape = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def _create_subtractor(self):
+        if self.algorithm == "mog2":
+            return cv2.createBackgroundSubtractorMOG2()
+        if self.algorithm == "knn":
+            return cv2.createBackgroundSubtractorKNN()
+        return None
+
+    def set_roi(self, roi):
+        """Replace the regions of interest (None watches the whole frame)."""
+        self.roi = roi
+        self._mask = None
+        self._mask_shape = None
+
+    def subscribe(self, callback):
+        """Call `callback(event)` with a MotionEvent whenever motion is seen or stops."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop sending motion events to `callback`."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _roi_mask(self, shape):
+        """Build (once per frame size) the downscaled mask of the regions of interest."""
+        if not self.roi:
+            return None
+        if self._mask is not None and self._mask_shape == shape:
+            return self._mask
+
+        mask = np.zeros(shape[:2], dtype=np.uint8)
+        for region in self.roi:
+            if len(region) == 4 and np.isscalar(region[0]):
+                x, y, w, h = (int(v * self.scale) for v in region)
+                cv2.rectangle(mask, (x, y), (x + w, y + h), 255, -1)
+            else:
+                points = (np.asarray(region, dtype=np.float32) * self.scale).astype(np.int32)
+                cv2.fillPoly(mask, [points], 255)
+        self._mask, self._mask_shape = mask, shape
+        return mask
+
+    def _foreground(self, small):
+        """Return the binary foreground mask of a downscaled frame."""
+        if self.algorithm == "diff":
+            gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+            previous, self._previous = self._previous, gray
+            if previous is None or previous.shape != gray.shape:
+                return np.zeros_like(gray)
+            _, fgmask = cv2.threshold(cv2.absdiff(gray, previous), self.diff_threshold, 255, cv2.THRESH_BINARY)
+            return fgmask
+
+        fgmask = self._subtractor.apply(small)
+        # Shadows are marked 127 by the subtractors; keep only real foreground
+        _, fgmask = cv2.threshold(fgmask, 127, 255, cv2.THRESH_BINARY)
+        return fgmask
+
+    def detect(self, frame):
+        """
+        Detect moving regions in a frame and notify subscribers.
+        :param frame: BGR frame (NumPy array).
+        :return: List of (x, y, w, h) bounding boxes in full-resolution pixels.
+        """
+        if self.scale != 1.0:
+            small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+
+        fgmask = self._foreground(small)
+        mask = self._roi_mask(fgmask.shape)
+        if mask is not None:
+            fgmask = cv2.bitwise_and(fgmask, mask)
+        contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_area = self.min_area * self.scale * self.scale
+        boxes = []
+        area = 0.0
+        for contour in contours:
+            contour_area = cv2.contourArea(contour)
+            if contour_area > min_area:  # Filter out small contours
+                x, y, w, h = cv2.boundingRect(contour)
+                boxes.append((int(x / self.scale), int(y / self.scale),
+                              int(w / self.scale), int(h / self.scale)))
+                area += contour_area / (self.scale * self.scale)
+
+        if boxes or self.active:
+            self.active = bool(boxes)
+            self._notify(MotionEvent(time.time(), boxes, area, self.active))
+        return boxes
+
+    def _notify(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"Error in motion subscriber: {e}")
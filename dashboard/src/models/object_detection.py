@@ -1,11 +1,274 @@
+import logging
+import threading
+import time
+
 import cv2
-import numpy as np
 
-# Initialize background subtractor for motion detection
-fgbg = cv2.createBackgroundSubtractorMOG2()
+from src.models.decoding import OutputDecoder
+from src.models.inference_cache import MISS
+from src.models.motion import MotionEngine
+from src.models.preprocess import SharedPreprocessor
+from src.models.roi import merge_regions, crop_region
+from src.utils.edgedevice import get_tensor_details
+from src.utils.jpeg import encode_jpeg
+from src.utils.metrics import STAGE_SECONDS, INFERENCE_SECONDS
+
+
+class ObjectDetector:
+    """
+    Run motion detection and classification on camera frames.
+
+    A single detector is meant to be shared by everything that consumes the
+    camera, so the models are invoked once per frame no matter how many
+    clients are watching the stream.
+    """
+
+    def __init__(self, interpreters, labels, last_detections, scheduler=None,
+                 mode="full", roi_categories=("bugs", "birds", "animals"), max_regions=3,
+                 cache=None, thresholds=None, top_k=3, motion=None):
+        """
+        :param interpreters: Dict of category -> TFLite interpreter (from `load_models`).
+        :param labels: Dict of category -> label table (from `load_models`).
+        :param last_detections: Deque that receives the latest detection results.
+        :param scheduler: Optional InferenceScheduler deciding which categories run on each frame.
+        :param mode: "full" classifies the whole frame; "motion" only runs inference when
+                     something moves and classifies the moving regions with `roi_categories`.
+        :param roi_categories: Categories classified per motion region in "motion" mode.
+        :param max_regions: Maximum number of motion regions classified per frame.
+        :param cache: Optional InferenceCache used to skip inference on unchanged images.
+        :param thresholds: Dict of category -> minimum probability for a detection.
+        :param top_k: Number of candidate labels reported per detection.
+        :param motion: MotionEngine used for motion detection (a default MOG2 engine if None).
+        """
+        self.interpreters = interpreters
+        self.labels = labels
+        self.last_detections = last_detections
+        self.scheduler = scheduler
+        self.mode = mode
+        self.roi_categories = set(roi_categories)
+        self.max_regions = max_regions
+        self.cache = cache
+        self.motion = motion or MotionEngine()
+        self.categories = list(interpreters.keys())
+        self.preprocessor = SharedPreprocessor(interpreters)
+        thresholds = thresholds or {}
+        self.decoders = {
+            category: OutputDecoder(
+                get_tensor_details(interpreter)[1], labels[category],
+                top_k=top_k, threshold=thresholds.get(category, 0.0)
+            )
+            for category, interpreter in interpreters.items()
+        }
+        self._results = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call `callback(detections)` with the fresh detections whenever new results arrive."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop sending detections to `callback`."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, detections):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(detections)
+            except Exception as e:
+                logging.error(f"Error in detection subscriber: {e}")
+
+    def detect_motion(self, frame):
+        """
+        Detect moving regions in a frame.
+        :param frame: BGR frame (NumPy array).
+        :return: List of (x, y, w, h) bounding boxes for moving objects.
+        """
+        with STAGE_SECONDS.time(stage="motion"):
+            return self.motion.detect(frame)
+
+    def classify(self, frame, boxes=None):
+        """
+        Run the models that are due on the frame.
+
+        Without a scheduler every loaded model runs on every frame. With one,
+        only the due categories are invoked and the others reuse their last
+        result. In "motion" mode nothing runs while the scene is still, and
+        the ROI categories classify each moving region instead of the whole
+        frame. Only fresh results are added to `last_detections`.
+        :param frame: BGR frame (NumPy array).
+        :param boxes: Motion bounding boxes from `detect_motion`.
+        :return: List of detection dictionaries (category, label, confidence[, bbox]) for overlays.
+        """
+        if self.mode == "motion" and not boxes:
+            return self.results()
+
+        if self.scheduler is None:
+            categories = self.categories
+        else:
+            categories = self.scheduler.due(self.categories)
+        if not categories:
+            return self.results()
+
+        if self.mode == "motion":
+            region_categories = [c for c in categories if c in self.roi_categories]
+            frame_categories = [c for c in categories if c not in self.roi_categories]
+        else:
+            region_categories, frame_categories = [], categories
+
+        results = {category: [] for category in categories}
+        fresh = []
+        if frame_categories:
+            for detection in self._classify_image(frame, frame_categories, fresh):
+                results[detection["category"]].append(detection)
+
+        if region_categories:
+            for region in merge_regions(boxes, frame.shape, max_regions=self.max_regions):
+                crop = crop_region(frame, region)
+                for detection in self._classify_image(crop, region_categories, fresh):
+                    detection["bbox"] = list(region)
+                    results[detection["category"]].append(detection)
+
+        # Add the new results to the last_detections list; cache hits are not
+        # repeated there
+        self.last_detections.extend(fresh)
+        if fresh:
+            self._notify(fresh)
+        for category, detections in results.items():
+            self._results[category] = detections
+            if self.scheduler is not None:
+                self.scheduler.record(category)
+
+        return self.results()
+
+    def _classify_image(self, image, categories, fresh):
+        """
+        Classify one image (a frame or a crop) with the given categories.
+        :param image: BGR image (NumPy array).
+        :param categories: Categories to run.
+        :param fresh: List that receives the detections produced by actual inference.
+        :return: List of detection dictionaries, at most one per category.
+        """
+        detections = []
+        misses = list(categories)
+        if self.cache is not None:
+            signature = self.cache.signature(image)
+            misses = []
+            for category in categories:
+                cached = self.cache.lookup(category, signature)
+                if cached is MISS:
+                    misses.append(category)
+                elif cached is not None:
+                    detections.append(dict(cached))
+
+        if misses:
+            # Resize and convert once per input shape, straight into the input tensors
+            self.preprocessor.prepare(image, misses)
+            # Start every model before reading any output, so interpreters
+            # that run in worker processes work in parallel
+            durations = {}
+            for category in misses:
+                start = time.perf_counter()
+                self.interpreters[category].invoke()
+                durations[category] = time.perf_counter() - start
+            for category in misses:
+                start = time.perf_counter()
+                detection = self.decode(category)
+                INFERENCE_SECONDS.observe(durations[category] + time.perf_counter() - start, category=category)
+                if self.cache is not None:
+                    self.cache.store(category, signature, detection)
+                if detection is None:
+                    continue
+                detection = dict(detection)
+                detections.append(detection)
+                fresh.append(detection)
+        return detections
+
+    def results(self):
+        """Return the most recent detections of every category, in model order."""
+        return [detection for category in self.categories for detection in self._results.get(category, [])]
+
+    def decode(self, category):
+        """
+        Read the result of a model that has just been invoked.
+        :param category: Model category.
+        :return: Detection dictionary (category, label, confidence, candidates),
+                 or None if the confidence is below the category's threshold.
+        """
+        interpreter = self.interpreters[category]
+        _, output_details = get_tensor_details(interpreter)
+
+        # Decode straight from a view of the output tensor instead of copying it
+        output_data = interpreter.tensor(output_details[0]['index'])()
+        return self.decoders[category].decode(output_data, category)
+
+    def annotate(self, frame, boxes, detections):
+        """
+        Draw motion boxes and detection labels onto the frame in place.
+        :param frame: BGR frame (NumPy array).
+        :param boxes: Motion bounding boxes from `detect_motion`.
+        :param detections: Detection dictionaries from `classify`.
+        :return: The annotated frame.
+        """
+        with STAGE_SECONDS.time(stage="annotate"):
+            return self._draw(frame, boxes, detections)
+
+    def _draw(self, frame, boxes, detections):
+        # Draw bounding boxes around moving objects
+        for (x, y, w, h) in boxes:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+        # Display the results on the frame
+        for detection in detections:
+            category = detection["category"]
+            text = f"{category.upper()}: {detection['label']} ({detection['confidence']:.2f})"
+            if "bbox" in detection:
+                # Region results are labelled at their region
+                x, y, w, h = detection["bbox"]
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 0), 1)
+                cv2.putText(frame, text, (x, max(y - 8, 12)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+                continue
+            cv2.putText(frame, text,
+                        (10, 30 + 40 * self.categories.index(category)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        return frame
+
+    def process(self, frame):
+        """
+        Run motion detection and classification, then annotate the frame.
+        :param frame: BGR frame (NumPy array).
+        :return: The annotated frame.
+        """
+        boxes = self.detect_motion(frame)
+        detections = self.classify(frame, boxes)
+        return self.annotate(frame, boxes, detections)
+
+
+def encode_frame(frame, quality=80):
+    """
+    Encode a frame to JPEG.
+    :param frame: BGR frame (NumPy array).
+    :param quality: JPEG quality (1-100).
+    :return: JPEG bytes, or None if encoding failed.
+    """
+    return encode_jpeg(frame, quality)
+
 
 def generate_frames(camera, interpreters, labels, last_detections):
-    """Generate video frames with object detection."""
+    """
+    Generate video frames with object detection.
+
+    Reads the camera directly, so every caller competes for frames. The
+    dashboard streams through `src.utils.broadcaster` instead; this generator
+    is kept for standalone use.
+    """
+    detector = ObjectDetector(interpreters, labels, last_detections)
     while True:
         if camera is None:
             break
@@ -13,53 +276,8 @@ def generate_frames(camera, interpreters, labels, last_detections):
         if not success:
             break
 
-        # Apply background subtraction to detect motion
-        fgmask = fgbg.apply(frame)
-        _, fgmask = cv2.threshold(fgmask, 127, 255, cv2.THRESH_BINARY)
-        contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        # Draw bounding boxes around moving objects
-        for contour in contours:
-            if cv2.contourArea(contour) > 500:  # Filter out small contours
-                (x, y, w, h) = cv2.boundingRect(contour)
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-        # Process frame with each model
-        for category, interpreter in interpreters.items():
-            input_details = interpreter.get_input_details()
-            output_details = interpreter.get_output_details()
-            input_shape = input_details[0]['shape']
-
-            img = cv2.resize(frame, (input_shape[1], input_shape[2]))
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            input_data = np.expand_dims(img_rgb, axis=0).astype(np.uint8)
-
-            # Set input tensor and run inference
-            interpreter.set_tensor(input_details[0]['index'], input_data)
-            interpreter.invoke()
-
-            # Get the output tensor and process the result
-            output_data = interpreter.get_tensor(output_details[0]['index'])
-            predicted_label = np.argmax(output_data)
-            confidence = output_data[0][predicted_label]
-
-            # Get the label
-            label = labels[category][predicted_label].strip()
-
-            # Add the result to the last_detections list
-            last_detections.append({
-                "category": category,
-                "label": label,
-                "confidence": float(confidence)
-            })
-
-            # Display the result on the frame
-            cv2.putText(frame, f"{category.upper()}: {label} ({confidence:.2f})",
-                        (10, 30 + 40 * list(interpreters.keys()).index(category)),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-        # Encode the frame to JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
+        frame = encode_frame(detector.process(frame))
+        if frame is None:
+            continue
         yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
\ No newline at end of file
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
@@ -0,0 +1,67 @@
+# src/models/preprocess.py
+import cv2
+import numpy as np
+
+from src.utils.edgedevice import get_tensor_details
+
+
+class SharedPreprocessor:
+    """
+    Prepare one input tensor per frame for every interpreter that needs it.
+
+    Interpreters are grouped by input height, width and dtype at startup.
+    For each group the frame is resized and converted to RGB once, straight
+    into the first interpreter's input buffer through an `interpreter.tensor()`
+    view, and then copied into the other members of the group. No per-frame
+    tensors are allocated and `set_tensor` is never called.
+    """
+
+    def __init__(self, interpreters):
+        """
+        :param interpreters: Dict of category -> TFLite interpreter (from `load_models`).
+        """
+        self.interpreters = interpreters
+        self.groups = {}
+        self._inputs = {}
+        self._resized = {}
+
+        for category, interpreter in interpreters.items():
+            input_details, _ = get_tensor_details(interpreter)
+            _, height, width, _ = input_details[0]['shape']
+            key = (int(height), int(width), np.dtype(input_details[0]['dtype']))
+            self.groups.setdefault(key, []).append(category)
+            # interpreter.tensor() returns a callable; the view itself must not
+            # be held across invoke(), so it is fetched again on every frame
+            self._inputs[category] = interpreter.tensor(input_details[0]['index'])
+
+        for (height, width, dtype) in self.groups:
+            self._resized[(height, width, dtype)] = np.empty((height, width, 3), dtype=np.uint8)
+
+    def input_view(self, category):
+        """Return a writable (height, width, 3) view of a category's input tensor."""
+        return self._inputs[category]()[0]
+
+    def prepare(self, image, categories):
+        """
+        Write the preprocessed image into the input tensors of the given categories.
+        :param image: BGR image (NumPy array), either a full frame or a crop.
+        :param categories: Categories that are about to be invoked.
+        """
+        wanted = set(categories)
+        for key, members in self.groups.items():
+            targets = [category for category in members if category in wanted]
+            if not targets:
+                continue
+
+            height, width, dtype = key
+            resized = self._resized[key]
+            cv2.resize(image, (width, height), dst=resized)
+
+            first = self.input_view(targets[0])
+            if dtype == np.uint8:
+                cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=first)
+            else:
+                first[...] = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+
+            for category in targets[1:]:
+                np.copyto(self.input_view(category), first)
@@ -0,0 +1,65 @@
+# src/models/roi.py
+
+
+def _union(a, b):
+    """Return the smallest box containing both boxes."""
+    x1, y1 = min(a[0], b[0]), min(a[1], b[1])
+    x2 = max(a[0] + a[2], b[0] + b[2])
+    y2 = max(a[1] + a[3], b[1] + b[3])
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def _near(a, b, gap):
+    """Return True if two boxes overlap or are within `gap` pixels of each other."""
+    return not (a[0] + a[2] + gap < b[0] or b[0] + b[2] + gap < a[0] or
+                a[1] + a[3] + gap < b[1] or b[1] + b[3] + gap < a[1])
+
+
+def _square(box, padding, min_size, width, height):
+    """Grow a box into a padded square around its center, clipped to the frame."""
+    x, y, w, h = box
+    side = int(max(w, h) * (1 + padding))
+    side = min(max(side, min_size), width, height)
+    cx, cy = x + w // 2, y + h // 2
+    x = min(max(cx - side // 2, 0), width - side)
+    y = min(max(cy - side // 2, 0), height - side)
+    return (x, y, side, side)
+
+
+def merge_regions(boxes, frame_shape, padding=0.2, gap=16, min_size=64, max_regions=3):
+    """
+    Turn raw motion boxes into a few regions worth classifying.
+
+    Nearby boxes are merged, the result is squared up (the classifiers take
+    square inputs) and only the largest `max_regions` are kept.
+    :param boxes: List of (x, y, w, h) motion boxes.
+    :param frame_shape: Shape of the frame the boxes belong to.
+    :param padding: Fraction of the box size added around each region.
+    :param gap: Boxes closer than this many pixels are merged.
+    :param min_size: Minimum side length of a region in pixels.
+    :param max_regions: Maximum number of regions returned.
+    :return: List of (x, y, w, h) regions, largest first.
+    """
+    height, width = frame_shape[:2]
+    regions = [tuple(int(v) for v in box) for box in boxes]
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if _near(regions[i], regions[j], gap):
+                    regions[i] = _union(regions[i], regions.pop(j))
+                    merged = True
+                    break
+            if merged:
+                break
+
+    regions.sort(key=lambda box: box[2] * box[3], reverse=True)
+    return [_square(box, padding, min_size, width, height) for box in regions[:max_regions]]
+
+
+def crop_region(frame, region):
+    """Return a view of the frame covering the region."""
+    x, y, w, h = region
+    return frame[y:y + h, x:x + w]
@@ -1,24 +1,94 @@
-import gi
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst, GObject
+try:
+    import gi
+    gi.require_version('Gst', '1.0')
+    from gi.repository import Gst
+except (ImportError, ValueError):
+    Gst = None  # Only needed when no capture service is passed in
 import numpy as np
-import cv2
 import os
 import datetime
 import logging
 import time
 
+from src.utils.image_writer import codec_extension, encode_image
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def capture_single_photo(output_folder="/home/boss/BASE/dev_tpu/coral/dashboard/media/time_lapse", camera_device="/dev/video0", experiment_id="exp001", max_retries=3):
+def save_photo(img, output_folder, experiment_id="exp001", writer=None, codec="png", options=None, archive_folder=None, index=None):
+    """
+    Save a captured frame with the standardized naming convention.
+
+    With an ImageWriter the frame is queued and encoded and written in the
+    background, so the capture returns as soon as the frame is handed over.
+
+    :param img: BGR frame (NumPy array).
+    :param output_folder: Base folder; images go into a subfolder per day.
+    :param experiment_id: Unique identifier for the experiment.
+    :param writer: Optional ImageWriter to save the image asynchronously.
+    :param codec: "png", "jpeg" or "webp".
+    :param options: Codec options, e.g. {"quality": 95}.
+    :param archive_folder: Optional base folder for an additional lossless PNG copy.
+    :param index: Optional CaptureIndex to record a synchronously saved image in (a writer records its own).
+    :return: Tuple (success, message) indicating whether the image was saved (or queued).
     """
-    Capture a single photo using GStreamer and save it to a folder with a standardized naming convention.
+    # Get current date and time
+    now = datetime.datetime.now()
+
+    # Create a subfolder for each day to organize images
+    date_folder = now.strftime("%Y-%m-%d")
+    daily_folder = os.path.join(output_folder, date_folder)
+    os.makedirs(daily_folder, exist_ok=True)
+
+    # Standardized naming convention: <experiment_id>_<timestamp>.<extension>
+    timestamp = now.strftime("%Y%m%d_%H%M%S")
+    image_base = os.path.join(daily_folder, f"{experiment_id}_{timestamp}")
+    archive_base = os.path.join(archive_folder, date_folder, f"{experiment_id}_{timestamp}") if archive_folder else None
+    image_path = image_base + codec_extension(codec)
+
+    if writer is not None:
+        future = writer.submit(img, image_base, codec, options, archive_path=archive_base)
+        if future is None:
+            return False, f"Image writer queue is full; {image_path} was not saved"
+        return True, f"Captured {image_path} (queued for saving)"
+
+    # Save synchronously
+    try:
+        targets = [(image_base, codec, options or {})]
+        if archive_base:
+            os.makedirs(os.path.dirname(archive_base), exist_ok=True)
+            targets.append((archive_base, "png", {}))
+        for base, target_codec, target_options in targets:
+            with open(base + codec_extension(target_codec), "wb") as f:
+                f.write(encode_image(img, target_codec, **target_options))
+    except (OSError, RuntimeError) as e:
+        logging.error(f"Error: Failed to save image to {image_path}: {e}")
+        return False, f"Failed to save image to {image_path}"
+    logging.info(f"Saved {image_path}")
+    if index is not None:
+        index.add_file(image_path)
+    return True, f"Successfully captured and saved {image_path}"
+
+def capture_single_photo(output_folder="/home/boss/BASE/dev_tpu/coral/dashboard/media/time_lapse", camera_device="/dev/video0", experiment_id="exp001", max_retries=3, capture_service=None, mode="still", writer=None, codec="png", options=None, archive_folder=None, index=None):
+    """
+    Capture a single photo and save it to a folder with a standardized naming convention.
+
+    With a running `capture_service` the photo is taken from the live camera
+    stream, either the newest frame (`mode="latest"`) or a full-resolution
+    grab (`mode="still"`), so nothing reopens the device and the feed keeps
+    running. Without one, a one-off GStreamer pipeline opens the camera.
     
     :param output_folder: Folder to save the image (default: "/home/boss/BASE/dev_tpu/coral/dashboard/media/time_lapse").
     :param camera_device: Camera device path (default: "/dev/video0").
     :param experiment_id: Unique identifier for the experiment (default: "exp001").
     :param max_retries: Maximum number of retries if the camera is busy.
+    :param capture_service: Optional running CaptureService to take the photo from.
+    :param mode: "still" or "latest" when a capture service is used.
+    :param writer: Optional ImageWriter that encodes and saves the photo in the background.
+    :param codec: Image codec ("png", "jpeg" or "webp").
+    :param options: Codec options, e.g. {"quality": 95}.
+    :param archive_folder: Optional base folder for an additional lossless PNG copy.
+    :param index: Optional CaptureIndex the saved photo is recorded in.
     :return: Tuple (success, message) indicating whether the capture was successful.
     """
     # Log output folder details
@@ -34,11 +104,29 @@ def capture_single_photo(output_folder="/home/boss/BASE/dev_tpu/coral/dashboard/
         logging.error(f"Output folder is not writable: {output_folder}")
         return False, f"Output folder is not writable: {output_folder}"
 
+    if capture_service is not None:
+        for attempt in range(max_retries):
+            if mode == "latest":
+                latest = capture_service.latest()
+                img = latest[1] if latest else None
+            else:
+                img = capture_service.grab_still()
+            if img is not None:
+                return save_photo(img, output_folder, experiment_id, writer, codec, options, archive_folder, index)
+            logging.error(f"Attempt {attempt + 1}: No frame available from the capture service.")
+            time.sleep(0.1)
+        logging.error(f"Failed to capture image after {max_retries} attempts.")
+        return False, "Failed to capture image after multiple attempts."
+
+    if Gst is None:
+        return False, "GStreamer is not available and no capture service was given."
+
     # Initialize GStreamer
     Gst.init(None)
 
     # Retry mechanism
     for attempt in range(max_retries):
+        pipeline = None
         try:
             # Define the GStreamer pipeline
             pipeline_str = (
@@ -69,30 +157,13 @@ def capture_single_photo(output_folder="/home/boss/BASE/dev_tpu/coral/dashboard/
                 height = caps.get_structure(0).get_value("height")
                 success, map_info = buffer.map(Gst.MapFlags.READ)
                 if success:
-                    frame = map_info.data
-                    # Convert raw data to OpenCV format
-                    img = np.ndarray((height, width, 3), dtype=np.uint8, buffer=frame)
-
-                    # Get current date and time
-                    now = datetime.datetime.now()
-
-                    # Create a subfolder for each day to organize images
-                    date_folder = now.strftime("%Y-%m-%d")
-                    daily_folder = os.path.join(output_folder, date_folder)
-                    os.makedirs(daily_folder, exist_ok=True)
-
-                    # Standardized naming convention: <experiment_id>_<timestamp>.png
-                    timestamp = now.strftime("%Y%m%d_%H%M%S")
-                    image_name = f"{experiment_id}_{timestamp}.png"
-                    image_path = os.path.join(daily_folder, image_name)
-
-                    # Save image with lossless compression (PNG format)
-                    if not cv2.imwrite(image_path, img):
-                        logging.error(f"Error: Failed to save image to {image_path}")
-                        return False, f"Failed to save image to {image_path}"
-                    logging.info(f"Saved {image_path}")
-                    return True, f"Successfully captured and saved {image_path}"
-                buffer.unmap(map_info)
+                    try:
+                        # Copy out of the mapped buffer: it is freed with the pipeline,
+                        # possibly before the image writer has encoded the frame
+                        img = np.ndarray((height, width, 3), dtype=np.uint8, buffer=map_info.data).copy()
+                    finally:
+                        buffer.unmap(map_info)
+                    return save_photo(img, output_folder, experiment_id, writer, codec, options, archive_folder, index)
             else:
                 logging.error("Failed to capture frame: No sample returned.")
 
@@ -103,8 +174,9 @@ def capture_single_photo(output_folder="/home/boss/BASE/dev_tpu/coral/dashboard/
             time.sleep(1)  # Wait for 1 second before retrying
         finally:
             # Stop the pipeline
-            pipeline.set_state(Gst.State.NULL)
-            logging.info("Camera released.")
+            if pipeline is not None:
+                pipeline.set_state(Gst.State.NULL)
+                logging.info("Camera released.")
 
     logging.error(f"Failed to capture image after {max_retries} attempts.")
     return False, "Failed to capture image after multiple attempts."
@@ -0,0 +1,439 @@
+# src/models/time_lapse_scheduler.py
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Capture file names have a resolution of one second
+MIN_INTERVAL = 1.0
+
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),  # 0 and 7 = Sunday, as in cron
+)
+
+
+def parse_cron(spec):
+    """
+    Parse a five-field cron expression ("minute hour day month weekday").
+
+    Each field accepts `*`, numbers, ranges (`a-b`), lists (`a,b`) and steps
+    (`*/n`, `a-b/n`); a weekday of 7 also means Sunday.
+    :param spec: Cron expression, e.g. "0 6-18/2 * * *".
+    :return: List of five sets of allowed values.
+    """
+    parts = spec.split()
+    if len(parts) != 5:
+        raise ValueError(f"Cron spec needs 5 fields, got {len(parts)}: {spec!r}")
+
+    fields = []
+    for part, (name, low, high) in zip(parts, CRON_FIELDS):
+        values = set()
+        for item in part.split(","):
+            item, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = (int(value) for value in item.split("-", 1))
+            else:
+                start = end = int(item)
+                if step > 1:
+                    end = high
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid {name} field in cron spec: {part!r}")
+            values.update(range(start, end + 1, step))
+        if name == "weekday" and 7 in values:
+            values.discard(7)
+            values.add(0)
+        fields.append(values)
+    return fields
+
+
+def next_cron_time(fields, after):
+    """
+    Return the first time strictly after `after` that matches a parsed cron spec.
+
+    As in cron, when both day and weekday are restricted a day matches if
+    either does ("0 6 1 * 1" fires on the 1st and on every Monday); a field
+    counts as restricted unless it covers its whole range.
+    :param fields: Output of `parse_cron`.
+    :param after: Unix timestamp.
+    :return: Unix timestamp of the next match.
+    """
+    minutes, hours, days, months, weekdays = fields
+    either_day = len(days) < 31 and len(weekdays) < 7
+    moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = moment + timedelta(days=366 * 5)
+    # Jump a whole month, day or hour at a time when that field does not match
+    while moment < limit:
+        if moment.month not in months:
+            year = moment.year + (moment.month == 12)
+            moment = moment.replace(year=year, month=moment.month % 12 + 1, day=1, hour=0, minute=0)
+            continue
+        day_match = moment.day in days
+        weekday_match = (moment.weekday() + 1) % 7 in weekdays
+        if not ((day_match or weekday_match) if either_day else (day_match and weekday_match)):
+            moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            continue
+        if moment.hour not in hours:
+            moment = (moment + timedelta(hours=1)).replace(minute=0)
+            continue
+        if moment.minute not in minutes:
+            moment += timedelta(minutes=1)
+            continue
+        return moment.timestamp()
+    raise ValueError("Cron spec never matches")
+
+
+def is_number(value):
+    """Return True for a finite int or float (not a bool or a numeric string)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class TimeLapseJob:
+    """One experiment's capture schedule."""
+
+    FIELDS = ("job_id", "experiment_id", "interval", "cron", "start_at", "end_at", "max_images",
+              "output_folder", "paused", "count", "missed", "next_run", "last_run", "last_result",
+              "created_at")
+
+    def __init__(self, job_id, experiment_id, interval=None, cron=None, start_at=None, end_at=None,
+                 max_images=None, output_folder=None, paused=False, count=0, missed=0,
+                 next_run=None, last_run=None, last_result=None, created_at=None):
+        """
+        :param job_id: Unique id of the job.
+        :param experiment_id: Experiment the images belong to.
+        :param interval: Seconds between captures (exclusive with `cron`).
+        :param cron: Five-field cron expression (exclusive with `interval`).
+        :param start_at: Unix timestamp of the first capture (interval jobs; defaults to now).
+        :param end_at: Optional Unix timestamp after which the job finishes.
+        :param max_images: Optional number of captures after which the job finishes.
+        :param output_folder: Folder the images are saved to.
+        """
+        if (interval is None) == (cron is None):
+            raise ValueError("A time-lapse job needs exactly one of interval or cron")
+        if interval is not None:
+            try:
+                interval = float(interval)
+            except (TypeError, ValueError):
+                raise ValueError("Interval must be a number of seconds")
+            if not is_number(interval) or interval < MIN_INTERVAL:
+                raise ValueError(f"Interval must be a finite number of at least {MIN_INTERVAL:g} s")
+        if cron is not None and not isinstance(cron, str):
+            raise ValueError("Cron spec must be a string")
+        for name, value in (("start_at", start_at), ("end_at", end_at)):
+            if value is not None and not is_number(value):
+                raise ValueError(f"{name} must be a Unix timestamp")
+        if max_images is not None and (isinstance(max_images, bool) or not isinstance(max_images, int)
+                                       or max_images < 1):
+            raise ValueError("max_images must be a positive integer")
+        self.job_id = job_id
+        self.experiment_id = experiment_id
+        self.interval = interval
+        self.cron = cron
+        self._cron_fields = parse_cron(cron) if cron else None
+        self.created_at = created_at or time.time()
+        self.start_at = start_at if start_at is not None else self.created_at
+        self.end_at = end_at
+        self.max_images = max_images
+        self.output_folder = output_folder
+        self.paused = paused
+        self.count = count
+        self.missed = missed
+        self.last_run = last_run
+        self.last_result = last_result
+        self.next_run = next_run
+        self.version = 0  # Bumped whenever queued heap entries become stale
+
+    @property
+    def finished(self):
+        if self.max_images is not None and self.count >= self.max_images:
+            return True
+        return self.end_at is not None and self.next_run is not None and self.next_run > self.end_at
+
+    def compute_next(self, now):
+        """
+        Return the first fire time after `now`.
+
+        Interval jobs stay on the grid start_at + k * interval, so late or
+        slow captures never shift later ones; slots that were slept through
+        (e.g. while the app was down) are skipped, not replayed.
+        """
+        if self._cron_fields is not None:
+            return next_cron_time(self._cron_fields, max(now, self.start_at))
+        if now < self.start_at:
+            return self.start_at
+        slots = math.floor((now - self.start_at) / self.interval) + 1
+        return self.start_at + slots * self.interval
+
+    def missed_slots(self, since, until):
+        """
+        Count the schedule slots in (since, until].
+        :param since: Unix timestamp of a slot (excluded).
+        :param until: Unix timestamp (included).
+        """
+        if until <= since:
+            return 0
+        if self._cron_fields is None:
+            return int((until - since) // self.interval)
+        count = 0
+        moment = next_cron_time(self._cron_fields, since)
+        # Bounded, so a minutely job that was down for years does not stall the start
+        while moment <= until and count < 100000:
+            count += 1
+            moment = next_cron_time(self._cron_fields, moment)
+        return count
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data["finished"] = self.finished
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in cls.FIELDS if field in data})
+
+
+class TimeLapseScheduler:
+    """
+    Run every time-lapse job from a single timer thread.
+
+    Jobs sit in a heap ordered by their next fire time and the thread sleeps
+    until the earliest one is due, so idle experiments cost nothing but a
+    heap entry. Captures run on a small worker pool so a slow capture does
+    not delay other experiments. Jobs and their progress are saved to a JSON
+    file after every change and restored on start.
+    """
+
+    def __init__(self, capture, state_path, max_workers=2):
+        """
+        :param capture: Callable `capture(job)` returning (success, message).
+        :param state_path: JSON file the jobs are persisted to.
+        :param max_workers: Maximum number of captures running at once.
+        """
+        self.capture = capture
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self._jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Load the saved jobs and start the timer thread."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._load()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="time-lapse")
+        self._thread = threading.Thread(target=self._run, name="time-lapse-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the timer thread and wait for running captures."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def add_job(self, experiment_id, interval=None, cron=None, start_at=None, end_at=None,
+                max_images=None, output_folder=None):
+        """
+        Schedule a new job.
+        :return: The job as a dictionary.
+        """
+        job = TimeLapseJob(uuid.uuid4().hex[:12], experiment_id, interval=interval, cron=cron,
+                           start_at=start_at, end_at=end_at, max_images=max_images,
+                           output_folder=output_folder)
+        with self._condition:
+            # The first capture is due at start_at (immediately by default)
+            job.next_run = job.compute_next(job.start_at - 1e-3)
+            self._jobs[job.job_id] = job
+            self._schedule(job)
+            self._save()
+        logging.info(f"Time-lapse job {job.job_id} added for {experiment_id}.")
+        return job.to_dict()
+
+    def find_job(self, experiment_id, interval=None, cron=None):
+        """Return an active job with the same experiment and schedule, or None."""
+        try:
+            interval = float(interval) if interval is not None else None
+        except (TypeError, ValueError):
+            return None  # Not a valid schedule; add_job reports why
+        with self._condition:
+            for job in self._jobs.values():
+                if (job.experiment_id == experiment_id and not job.finished
+                        and job.cron == cron and job.interval == interval):
+                    return job.to_dict()
+        return None
+
+    def list_jobs(self):
+        """Return every job as a dictionary, soonest first."""
+        with self._condition:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.next_run or math.inf)
+            return [job.to_dict() for job in jobs]
+
+    def get_job(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def pause(self, job_id):
+        """Pause a job; it keeps its place on the schedule grid."""
+        return self._update(job_id, paused=True)
+
+    def resume(self, job_id):
+        """Resume a paused job at its next slot after now."""
+        return self._update(job_id, paused=False)
+
+    def cancel(self, job_id):
+        """
+        Remove a job.
+        :return: True if the job existed.
+        """
+        with self._condition:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return False
+            job.version += 1
+            self._save()
+            self._condition.notify_all()
+        logging.info(f"Time-lapse job {job_id} cancelled.")
+        return True
+
+    def _update(self, job_id, paused):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.paused = paused
+            job.version += 1
+            if not paused:
+                job.next_run = job.compute_next(time.time())
+                self._schedule(job)
+            self._save()
+            self._condition.notify_all()
+            return job.to_dict()
+
+    def _schedule(self, job):
+        if job.paused or job.finished:
+            return
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job.job_id, job.version))
+        self._condition.notify_all()
+
+    def _run(self):
+        with self._condition:
+            while self._running:
+                # Drop heap entries of cancelled, paused or rescheduled jobs
+                while self._heap:
+                    _, _, job_id, version = self._heap[0]
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.version == version and not job.paused:
+                        break
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                _, _, job_id, _ = heapq.heappop(self._heap)
+                job = self._jobs[job_id]
+                try:
+                    now = time.time()
+                    job.last_run = now
+                    job.missed += job.missed_slots(job.next_run, now)
+                    job.next_run = job.compute_next(now)
+                    job.version += 1
+                    self._schedule(job)
+                    self._save()
+                    self._executor.submit(self._fire, job)
+                except Exception as e:
+                    # One broken job must not stop the timer thread for every experiment
+                    logging.error(f"Time-lapse job {job_id} could not be scheduled and was paused: {e}")
+                    job.paused = True
+                    job.version += 1
+                    self._save()
+
+    def _fire(self, job):
+        try:
+            success, message = self.capture(job)
+        except Exception as e:
+            success, message = False, str(e)
+        with self._condition:
+            # Only saved images count towards max_images
+            if success:
+                job.count += 1
+                if job.finished:
+                    job.version += 1  # Drop the slot queued for the next capture
+            job.last_result = {"success": success, "message": message}
+            count = job.count
+            self._save()
+        if success:
+            logging.info(f"Time-lapse job {job.job_id} ({job.experiment_id}) captured image {count}: {message}")
+        else:
+            logging.error(f"Time-lapse job {job.job_id} ({job.experiment_id}) failed: {message}")
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read time-lapse jobs from {self.state_path}: {e}")
+            return
+
+        now = time.time()
+        for data in saved.get("jobs", []):
+            try:
+                job = TimeLapseJob.from_dict(data)
+            except (TypeError, ValueError) as e:
+                logging.error(f"Skipping invalid time-lapse job {data.get('job_id')}: {e}")
+                continue
+            if job.next_run is None or job.next_run < now:
+                if job.next_run is not None and not job.paused and not job.finished:
+                    # Slots that passed while the app was down, including next_run itself
+                    until = min(now, job.end_at) if job.end_at is not None else now
+                    if job.next_run <= until:
+                        job.missed += 1 + job.missed_slots(job.next_run, until)
+                job.next_run = job.compute_next(now)
+            self._jobs[job.job_id] = job
+            self._schedule(job)
+        logging.info(f"Restored {len(self._jobs)} time-lapse job(s) from {self.state_path}.")
+
+    def _save(self):
+        """Write the jobs atomically (temporary file, then rename)."""
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.state_path}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                json.dump({"jobs": [job.to_dict() for job in self._jobs.values()]}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.state_path)
+        except OSError as e:
+            logging.error(f"Could not save time-lapse jobs to {self.state_path}: {e}")
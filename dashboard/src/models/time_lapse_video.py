@@ -0,0 +1,319 @@
+# src/models/time_lapse_video.py
+import csv
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def parse_capture_time(filename, experiment_id):
+    """
+    Return the capture time of a `<experiment_id>_<YYYYmmdd_HHMMSS>.<ext>` file name.
+    :return: datetime, or None if the name belongs to another experiment or does not match.
+    """
+    stem, extension = os.path.splitext(filename)
+    prefix = f"{experiment_id}_"
+    if extension.lower() not in IMAGE_EXTENSIONS or not stem.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(stem[len(prefix):], "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+
+
+def iter_captures(folder, experiment_id, after=None):
+    """
+    Yield an experiment's captures in timestamp order.
+
+    Only one day's file names are held at a time; images are not opened.
+    :param folder: Time-lapse folder with one `YYYY-MM-DD` subfolder per day.
+    :param experiment_id: Experiment whose images are listed.
+    :param after: Optional datetime; only later captures are yielded.
+    :return: Iterator of (datetime, path) tuples.
+    """
+    try:
+        days = sorted(entry.name for entry in os.scandir(folder) if entry.is_dir())
+    except FileNotFoundError:
+        return
+    for day in days:
+        try:
+            day_date = datetime.strptime(day, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        if after is not None and day_date < after.date():
+            continue
+        captures = []
+        for entry in os.scandir(os.path.join(folder, day)):
+            captured_at = parse_capture_time(entry.name, experiment_id)
+            if captured_at is not None and (after is None or captured_at > after):
+                captures.append((captured_at, entry.path))
+        yield from sorted(captures)
+
+
+def load_heights(csv_path):
+    """
+    Read measured plant heights from the analysis CSV.
+    :param csv_path: Path to time_lapse_data.csv (written by `process_image`).
+    :return: Dict of image file name -> tallest measured height in inches.
+    """
+    heights = {}
+    if not csv_path or not os.path.exists(csv_path):
+        return heights
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                height = float(row["height"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            name = row.get("image_path")
+            if name and height > heights.get(name, 0):
+                heights[name] = height
+    return heights
+
+
+def fit_frame(image, size):
+    """Scale an image into `size` (width, height), keeping its aspect ratio and padding with black."""
+    width, height = size
+    image_height, image_width = image.shape[:2]
+    if (image_width, image_height) == (width, height):
+        return image
+    scale = min(width / image_width, height / image_height)
+    scaled_width, scaled_height = max(int(image_width * scale), 1), max(int(image_height * scale), 1)
+    scaled = cv2.resize(image, (scaled_width, scaled_height), interpolation=cv2.INTER_AREA)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    x, y = (width - scaled_width) // 2, (height - scaled_height) // 2
+    frame[y:y + scaled_height, x:x + scaled_width] = scaled
+    return frame
+
+
+def draw_overlay(frame, captured_at, height=None):
+    """Draw the capture time and, when known, the measured height in the bottom-left corner."""
+    text = captured_at.strftime("%Y-%m-%d %H:%M")
+    if height is not None:
+        text += f"  height {height:.2f} in"
+    scale = max(frame.shape[0] / 720, 0.4)
+    origin = (int(12 * scale), frame.shape[0] - int(16 * scale))
+    cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.8 * scale, (0, 0, 0), int(4 * scale) + 1, cv2.LINE_AA)
+    cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.8 * scale, (255, 255, 255), int(2 * scale) or 1, cv2.LINE_AA)
+    return frame
+
+
+class _SegmentWriter:
+    """Write frames to one video segment, through ffmpeg (H.264) when available, else OpenCV."""
+
+    def __init__(self, path, fps, size, ffmpeg=None):
+        self.path = path
+        self._process = None
+        self._writer = None
+        if ffmpeg:
+            width, height = size
+            self._process = subprocess.Popen(
+                [ffmpeg, "-y", "-loglevel", "error",
+                 "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                 "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+                 "-movflags", "+faststart", path],
+                stdin=subprocess.PIPE
+            )
+        else:
+            # avc1 plays in browsers but needs an OpenCV build with H.264; mp4v always works
+            for fourcc in ("avc1", "mp4v"):
+                self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, tuple(size))
+                if self._writer.isOpened():
+                    break
+            else:
+                raise RuntimeError(f"Could not open a video writer for {path}")
+
+    def write(self, frame):
+        if self._process is not None:
+            self._process.stdin.write(np.ascontiguousarray(frame).tobytes())
+        else:
+            self._writer.write(frame)
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed to write {self.path}")
+        else:
+            self._writer.release()
+
+
+class TimeLapseVideoBuilder:
+    """
+    Build one video per experiment and rendering settings from the time-lapse images.
+
+    Frames are read one at a time in timestamp order. Each build only renders
+    the captures taken since the previous build into a new segment, and the
+    segments are joined into the playable video (with `ffmpeg -c copy` when
+    ffmpeg is installed, so earlier frames are never re-encoded). A JSON
+    manifest next to the video records the segments and the last frame.
+    """
+
+    def __init__(self, source_folder, output_folder, ffmpeg=None):
+        """
+        :param source_folder: Time-lapse folder with one subfolder per day.
+        :param output_folder: Folder for videos, segments and manifests.
+        :param ffmpeg: Path to ffmpeg (looked up on PATH if None; OpenCV is used without it).
+        """
+        self.source_folder = source_folder
+        self.output_folder = output_folder
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="time-lapse-video")
+        self._pending = {}
+
+    @staticmethod
+    def variant(experiment_id, fps=10, size=(1280, 720), overlay=False):
+        """Return the file name stem of a video with the given settings."""
+        width, height = size
+        return f"{experiment_id}_{fps:g}fps_{width}x{height}{'_overlay' if overlay else ''}"
+
+    def video_path(self, experiment_id, fps=10, size=(1280, 720), overlay=False):
+        return os.path.join(self.output_folder, self.variant(experiment_id, fps, size, overlay) + ".mp4")
+
+    def _manifest_path(self, name):
+        return os.path.join(self.output_folder, name + ".json")
+
+    def manifest(self, experiment_id, fps=10, size=(1280, 720), overlay=False):
+        """Return the manifest of a built video, or None."""
+        path = self._manifest_path(self.variant(experiment_id, fps, size, overlay))
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _lock(self, name):
+        with self._locks_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def build(self, experiment_id, fps=10, size=(1280, 720), overlay=False, heights_csv=None, rebuild=False):
+        """
+        Append the captures taken since the last build to an experiment's video.
+        :param experiment_id: Experiment to render.
+        :param fps: Frames per second of the video.
+        :param size: (width, height) of the video; images are letterboxed into it.
+        :param overlay: Draw the capture time and the measured height on each frame.
+        :param heights_csv: Analysis CSV with measured heights (used with `overlay`).
+        :param rebuild: Discard the existing video and render every capture again.
+        :return: The manifest dictionary.
+        """
+        size = tuple(int(value) for value in size)
+        name = self.variant(experiment_id, fps, size, overlay)
+        with self._lock(name):
+            os.makedirs(os.path.join(self.output_folder, "segments"), exist_ok=True)
+            manifest = None if rebuild else self.manifest(experiment_id, fps, size, overlay)
+            if manifest is None:
+                manifest = {"experiment_id": experiment_id, "fps": fps, "size": list(size), "overlay": overlay,
+                            "frames": 0, "first_capture": None, "last_capture": None, "segments": []}
+            after = datetime.fromisoformat(manifest["last_capture"]) if manifest["last_capture"] else None
+            heights = load_heights(heights_csv) if overlay else {}
+
+            start = time.perf_counter()
+            segment = os.path.join("segments", f"{name}_{len(manifest['segments']):05d}.mp4")
+            writer = None
+            frames = 0
+            try:
+                for captured_at, path in iter_captures(self.source_folder, experiment_id, after):
+                    image = cv2.imread(path)
+                    if image is None:
+                        logging.warning(f"Skipping unreadable image {path}")
+                        continue
+                    frame = fit_frame(image, size)
+                    if overlay:
+                        frame = draw_overlay(frame.copy(), captured_at, heights.get(os.path.basename(path)))
+                    if writer is None:
+                        writer = _SegmentWriter(os.path.join(self.output_folder, segment), fps, size, self.ffmpeg)
+                    writer.write(frame)
+                    frames += 1
+                    manifest["first_capture"] = manifest["first_capture"] or captured_at.isoformat()
+                    manifest["last_capture"] = captured_at.isoformat()
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            if frames:
+                manifest["segments"].append(segment)
+                manifest["frames"] += frames
+                self._join(manifest["segments"], self.video_path(experiment_id, fps, size, overlay), fps, size)
+                manifest["updated_at"] = datetime.now().isoformat()
+                self._save_manifest(name, manifest)
+                logging.info(f"Added {frames} frame(s) to {name} in {time.perf_counter() - start:.1f} s.")
+            return manifest
+
+    def _join(self, segments, video_path, fps, size):
+        """Join the segments into the video (replaced atomically)."""
+        temporary = video_path + ".tmp.mp4"
+        paths = [os.path.join(self.output_folder, segment) for segment in segments]
+        if len(paths) == 1:
+            shutil.copyfile(paths[0], temporary)
+        elif self.ffmpeg:
+            list_path = video_path + ".segments.txt"
+            with open(list_path, "w") as f:
+                for path in paths:
+                    f.write(f"file '{os.path.abspath(path)}'\n")
+            try:
+                subprocess.run(
+                    [self.ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+                     "-c", "copy", "-movflags", "+faststart", temporary],
+                    check=True
+                )
+            finally:
+                os.remove(list_path)
+        else:
+            # Without ffmpeg the segments are decoded and re-encoded frame by frame
+            writer = _SegmentWriter(temporary, fps, size)
+            try:
+                for path in paths:
+                    capture = cv2.VideoCapture(path)
+                    while True:
+                        success, frame = capture.read()
+                        if not success:
+                            break
+                        writer.write(frame)
+                    capture.release()
+            finally:
+                writer.close()
+        os.replace(temporary, video_path)
+
+    def _save_manifest(self, name, manifest):
+        path = self._manifest_path(name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def build_async(self, experiment_id, **options):
+        """
+        Queue a build on the background worker; a build already queued for the same video is reused.
+        :return: The Future of the build.
+        """
+        name = self.variant(experiment_id, options.get("fps", 10), tuple(options.get("size", (1280, 720))),
+                            options.get("overlay", False))
+        with self._locks_lock:
+            future = self._pending.get(name)
+            if future is not None and not future.running() and not future.done():
+                return future
+            future = self._executor.submit(self.build, experiment_id, **options)
+            future.add_done_callback(lambda done: self._log_failure(name, done))
+            self._pending[name] = future
+        return future
+
+    @staticmethod
+    def _log_failure(name, future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"Error building time-lapse video {name}: {future.exception()}")
+
+    def building(self, experiment_id, fps=10, size=(1280, 720), overlay=False):
+        """Return True while a build of the video is queued or running."""
+        future = self._pending.get(self.variant(experiment_id, fps, tuple(size), overlay))
+        return future is not None and not future.done()
@@ -0,0 +1,285 @@
+# src/utils/broadcaster.py
+import threading
+import logging
+import time
+from collections import deque
+
+import cv2
+
+from src.utils.jpeg import encode_jpeg, encode_jpeg_i420
+from src.utils.metrics import STAGE_SECONDS, CAPTURE_FAILURES, STREAM_CLIENTS
+
+
+def multipart_chunk(jpeg):
+    """Wrap JPEG bytes as one part of a multipart/x-mixed-replace stream."""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+
+def stream_tier(width=None, quality=None, fps=None, default_quality=80, max_fps=30.0):
+    """
+    Normalize client stream parameters into a shared tier.
+
+    Values are snapped to a coarse grid so clients asking for nearly the
+    same stream share one encoded copy.
+    :param width: Requested frame width in pixels (None for full resolution).
+    :param quality: Requested JPEG quality (None for the default).
+    :param fps: Requested maximum frame rate (None for no limit).
+    :return: Tuple (width, quality, fps).
+    """
+    if width:
+        width = max(160, min(int(width), 4096)) // 16 * 16
+    quality = int(quality or default_quality)
+    quality = max(10, min(quality, 95)) // 5 * 5
+    if fps:
+        fps = max(0.5, min(float(fps), max_fps))
+    return width or None, quality, fps or None
+
+
+class FrameBroadcaster:
+    """
+    Fan out frames to any number of stream subscribers.
+
+    Frames are published once into a small ring buffer and tagged with a
+    sequence number. Subscribers only hold the lock long enough to grab a
+    reference to the newest frame, so a slow client never holds up the
+    producer or the other clients; it simply skips the frames it missed.
+
+    Frames are encoded lazily per (width, quality) tier: the first client
+    of a tier to see a new frame encodes it and every other client on that
+    tier reuses the bytes. Nothing is encoded while nobody is watching, and
+    a tier's cached JPEG is dropped once it has not been asked for in
+    `tier_ttl` seconds.
+    """
+
+    def __init__(self, buffer_size=2, default_quality=80, max_fps=30.0, tier_ttl=5.0):
+        """
+        :param buffer_size: Number of recent frames kept in the ring buffer.
+        :param default_quality: JPEG quality used when a client does not ask for one.
+        :param max_fps: Upper bound for the per-client frame rate.
+        :param tier_ttl: Seconds after its last request that a tier's encoded frame is evicted
+                         (longer than the slowest client's frame interval, 1 / 0.5 fps).
+        """
+        self.default_quality = default_quality
+        self.max_fps = max_fps
+        self._frames = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._clients = 0
+        self._closed = False
+        self._encoded = {}
+        self._tier_locks = {}
+        self._tier_used = {}
+        self._tier_clients = {}
+        self.tier_ttl = tier_ttl
+        self._last_prune = time.monotonic()
+        STREAM_CLIENTS.set_function(lambda: self._clients)
+
+    @property
+    def clients(self):
+        """Number of currently connected stream subscribers."""
+        return self._clients
+
+    @property
+    def sequence(self):
+        """Sequence number of the newest published frame."""
+        return self._sequence
+
+    def tiers(self):
+        """Return the number of connected clients per (width, quality) tier."""
+        with self._condition:
+            return {f"{width or 'full'}@q{quality}": count
+                    for (width, quality), count in self._tier_clients.items() if count}
+
+    def publish(self, frame, captured_at=None):
+        """
+        Publish a frame to all subscribers.
+        :param frame: BGR frame, or I420 frame as a 2-D array.
+        :param captured_at: Time the frame was captured (defaults to now).
+        """
+        with self._condition:
+            self._sequence += 1
+            self._frames.append((self._sequence, captured_at or time.time(), frame))
+            self._condition.notify_all()
+
+    def latest(self):
+        """
+        Return the newest frame without waiting.
+        :return: Tuple (sequence, captured_at, frame), or None if nothing was published yet.
+        """
+        with self._condition:
+            return self._frames[-1] if self._frames else None
+
+    def wait_for_frame(self, last_sequence=0, timeout=5.0):
+        """
+        Block until a frame newer than `last_sequence` is available.
+        :param last_sequence: Sequence number of the last frame the caller saw.
+        :param timeout: Maximum time to wait in seconds.
+        :return: Tuple (sequence, captured_at, frame), or None on timeout or close.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._closed or self._sequence > last_sequence, timeout=timeout
+            )
+            if self._closed or self._sequence <= last_sequence:
+                return None
+            return self._frames[-1]
+
+    def encoded(self, item, width=None, quality=None):
+        """
+        Return the JPEG of a published frame for one tier, encoding it at most once.
+        :param item: Tuple (sequence, captured_at, frame) from `wait_for_frame`.
+        :param width: Output width in pixels (None for full resolution).
+        :param quality: JPEG quality (None for the default).
+        :return: JPEG bytes, or None if encoding failed.
+        """
+        sequence, _, frame = item
+        if width and width >= frame.shape[1]:
+            # No upscaling: share the full-resolution tier
+            width = None
+        key = (width, quality or self.default_quality)
+        now = time.monotonic()
+        with self._condition:
+            if now - self._last_prune > self.tier_ttl:
+                self._prune_tiers(now)
+            lock = self._tier_locks.setdefault(key, threading.Lock())
+            self._tier_used[key] = now
+
+        with lock:
+            cached = self._encoded.get(key)
+            if cached is not None and cached[0] >= sequence:
+                return cached[1]
+
+            with STAGE_SECONDS.time(stage="encode"):
+                if width and frame.ndim == 3 and width < frame.shape[1]:
+                    height = int(frame.shape[0] * width / frame.shape[1])
+                    jpeg = encode_jpeg(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA), key[1])
+                elif frame.ndim == 2 and width:
+                    # Scaled tiers of an I420 source go through BGR
+                    bgr = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+                    height = int(bgr.shape[0] * width / bgr.shape[1])
+                    jpeg = encode_jpeg(cv2.resize(bgr, (width, height), interpolation=cv2.INTER_AREA), key[1])
+                elif frame.ndim == 2:
+                    jpeg = encode_jpeg_i420(frame, key[1])
+                else:
+                    jpeg = encode_jpeg(frame, key[1])
+
+            if jpeg is not None:
+                with self._condition:
+                    # Skip the cache if the tier was evicted while encoding
+                    if self._tier_locks.get(key) is lock:
+                        self._encoded[key] = (sequence, jpeg)
+            return jpeg
+
+    def _prune_tiers(self, now):
+        """Forget tiers nobody asked for in `tier_ttl` seconds (call with the condition held)."""
+        self._last_prune = now
+        for key in [key for key, used in self._tier_used.items() if now - used > self.tier_ttl]:
+            del self._tier_used[key]
+            self._tier_locks.pop(key, None)
+            self._encoded.pop(key, None)
+
+    def stream(self, width=None, quality=None, fps=None):
+        """
+        Yield multipart JPEG chunks for one HTTP client.
+        :param width: Requested frame width in pixels (None for full resolution).
+        :param quality: Requested JPEG quality (None for the default).
+        :param fps: Maximum frame rate for this client (None for every frame).
+        """
+        width, quality, fps = stream_tier(width, quality, fps, self.default_quality, self.max_fps)
+        tier = (width, quality)
+        with self._condition:
+            self._clients += 1
+            self._tier_clients[tier] = self._tier_clients.get(tier, 0) + 1
+        logging.info(f"Stream client connected ({self._clients} active).")
+        try:
+            last_sequence = 0
+            next_send = 0.0
+            while not self._closed:
+                if fps:
+                    # Sleep off the client's frame interval, then take the newest frame
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                item = self.wait_for_frame(last_sequence)
+                if item is None:
+                    continue
+                last_sequence = item[0]
+                jpeg = self.encoded(item, width, quality)
+                if jpeg is None:
+                    continue
+                if fps:
+                    next_send = time.monotonic() + 1.0 / fps
+                yield multipart_chunk(jpeg)
+        finally:
+            with self._condition:
+                self._clients -= 1
+                self._tier_clients[tier] -= 1
+                if not self._tier_clients[tier]:
+                    del self._tier_clients[tier]
+            logging.info(f"Stream client disconnected ({self._clients} active).")
+
+    def close(self):
+        """Wake up and release every subscriber."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class CaptureWorker:
+    """
+    Background thread that owns the camera.
+
+    Each frame is read once, run through `process_frame` once and published
+    to the broadcaster, which encodes it for the connected clients.
+    """
+
+    def __init__(self, camera, process_frame, broadcaster, retry_delay=1.0):
+        """
+        :param camera: Object with a cv2.VideoCapture-style `read()` method.
+        :param process_frame: Callable that takes a BGR frame and returns the annotated frame.
+        :param broadcaster: FrameBroadcaster that receives the frames.
+        :param retry_delay: Seconds to wait after a failed camera read.
+        """
+        self.camera = camera
+        self.process_frame = process_frame
+        self.broadcaster = broadcaster
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the capture thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        if self.camera is None:
+            logging.error("No camera available; capture worker not started.")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="capture-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the capture thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with STAGE_SECONDS.time(stage="capture"):
+                success, frame = self.camera.read()
+            if not success:
+                CAPTURE_FAILURES.inc()
+                logging.warning("Failed to read frame from camera; retrying.")
+                time.sleep(self.retry_delay)
+                continue
+            captured_at = time.time()
+
+            try:
+                frame = self.process_frame(frame)
+            except Exception as e:
+                logging.error(f"Error processing frame: {e}")
+                continue
+
+            self.broadcaster.publish(frame, captured_at)
@@ -8,6 +8,8 @@ def get_camera():
         if not camera.isOpened():
             print("Error: Could not open camera.")
             return None
+        # Keep only the newest frame in the driver buffer so readers never see stale frames
+        camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         print("USB Camera initialized successfully!")
         return camera
     except Exception as e:
@@ -0,0 +1,315 @@
+# src/utils/capture_service.py
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import gi
+    gi.require_version('Gst', '1.0')
+    from gi.repository import Gst
+except (ImportError, ValueError):
+    Gst = None
+
+
+class CaptureService(ABC):
+    """
+    Long-lived owner of the camera.
+
+    Frames are captured continuously on a background thread. `read()` is a
+    drop-in for cv2.VideoCapture.read() for the live feed, while stills for
+    the time-lapse are taken with `latest()` or `grab_still()` from the same
+    stream, so a capture never reopens the device or pauses the feed.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._captured_at = None
+        self._sequence = 0
+        self._read_sequence = 0
+        self._running = False
+
+    def isOpened(self):
+        return self._running
+
+    def _publish(self, frame, captured_at=None):
+        with self._condition:
+            self._frame = frame
+            self._captured_at = captured_at or time.time()
+            self._sequence += 1
+            self._condition.notify_all()
+
+    def read(self, timeout=2.0):
+        """
+        Wait for a frame newer than the last one returned by `read()`.
+
+        The frame is a copy: the live feed draws detections into it, which
+        must not end up in the stills returned by `latest()` and `grab_still()`.
+        :param timeout: Maximum time to wait in seconds.
+        :return: Tuple (success, frame) like cv2.VideoCapture.read().
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > self._read_sequence or not self._running,
+                                     timeout=timeout)
+            if self._sequence <= self._read_sequence:
+                return False, None
+            self._read_sequence = self._sequence
+            return True, self._frame.copy()
+
+    def latest(self):
+        """
+        Return the newest live frame without waiting.
+        :return: Tuple (captured_at, frame), or None if nothing was captured yet.
+        """
+        with self._condition:
+            if self._frame is None:
+                return None
+            return self._captured_at, self._frame.copy()
+
+    def grab_still(self, timeout=5.0):
+        """
+        Capture a still from the running stream.
+        :param timeout: Maximum time to wait in seconds.
+        :return: BGR frame, or None on timeout.
+        """
+        with self._condition:
+            sequence = self._sequence
+            self._condition.wait_for(lambda: self._sequence > sequence, timeout=timeout)
+            if self._sequence <= sequence:
+                return None
+            return self._frame.copy()
+
+    @abstractmethod
+    def start(self):
+        """Start capturing frames in the background."""
+
+    @abstractmethod
+    def stop(self):
+        """Stop capturing and release the camera."""
+
+    def release(self):
+        self.stop()
+
+
+class OpenCVCaptureService(CaptureService):
+    """Capture service around a cv2.VideoCapture-style camera."""
+
+    def __init__(self, camera, retry_delay=1.0):
+        """
+        :param camera: Opened camera with a `read()` method (e.g. from `get_camera`).
+        :param retry_delay: Seconds to wait after a failed read.
+        """
+        super().__init__()
+        self.camera = camera
+        self.retry_delay = retry_delay
+        self._thread = None
+
+    def start(self):
+        """Start the capture thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="capture-service", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop capturing and release the camera."""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self.camera.release()
+
+    def _run(self):
+        while self._running:
+            success, frame = self.camera.read()
+            if not success:
+                logging.warning("Failed to read frame from camera; retrying.")
+                time.sleep(self.retry_delay)
+                continue
+            self._publish(frame)
+
+
+class GStreamerCaptureService(CaptureService):
+    """
+    Capture service built on one persistent GStreamer pipeline.
+
+    The camera runs at the still resolution and a tee splits the stream: the
+    live branch is scaled down for the dashboard, and the full-resolution
+    branch sits behind a closed valve that `grab_still()` opens for a single
+    frame. Both branches use leaky queues and dropping appsinks, so a busy
+    consumer never stalls the camera.
+    """
+
+    def __init__(self, device="/dev/video0", live_size=(640, 480), still_size=None,
+                 framerate=30, source_format="YUY2", retry_delay=2.0):
+        """
+        :param device: V4L2 device path.
+        :param live_size: (width, height) of the frames returned by `read()`.
+        :param still_size: (width, height) the camera is opened at and stills are taken at
+                           (defaults to `live_size`).
+        :param framerate: Camera frame rate.
+        :param source_format: Raw format requested from the camera.
+        :param retry_delay: Seconds to wait before restarting the pipeline after an error.
+        """
+        super().__init__()
+        if Gst is None:
+            raise RuntimeError("GStreamer Python bindings (gi) are not available")
+        Gst.init(None)
+        self.device = device
+        self.live_size = tuple(live_size)
+        self.still_size = tuple(still_size or live_size)
+        self.framerate = framerate
+        self.source_format = source_format
+        self.retry_delay = retry_delay
+        self._pipeline = None
+        self._valve = None
+        self._still_lock = threading.Lock()
+        self._still_condition = threading.Condition()
+        self._still = None
+        self._still_sequence = 0
+        self._watch_thread = None
+
+    def _description(self):
+        still_width, still_height = self.still_size
+        live_width, live_height = self.live_size
+        return (
+            f"v4l2src device={self.device} ! "
+            f"video/x-raw,format={self.source_format},width={still_width},height={still_height},"
+            f"framerate={self.framerate}/1 ! tee name=t "
+            "t. ! queue leaky=downstream max-size-buffers=1 ! videoscale ! videoconvert ! "
+            f"video/x-raw,format=BGR,width={live_width},height={live_height} ! "
+            "appsink name=live emit-signals=true max-buffers=1 drop=true sync=false "
+            "t. ! queue leaky=downstream max-size-buffers=1 ! valve name=still_valve drop=true ! "
+            "videoconvert ! video/x-raw,format=BGR ! "
+            "appsink name=still emit-signals=true max-buffers=1 drop=true sync=false"
+        )
+
+    @staticmethod
+    def _to_array(sample):
+        """Copy a BGR sample into a NumPy array, honouring the row stride."""
+        buffer = sample.get_buffer()
+        structure = sample.get_caps().get_structure(0)
+        width = structure.get_value("width")
+        height = structure.get_value("height")
+        success, map_info = buffer.map(Gst.MapFlags.READ)
+        if not success:
+            return None
+        try:
+            data = np.frombuffer(map_info.data, dtype=np.uint8)
+            stride = data.size // height
+            return data[:stride * height].reshape(height, stride)[:, :width * 3].reshape(height, width, 3).copy()
+        finally:
+            buffer.unmap(map_info)
+
+    def _on_live_sample(self, appsink):
+        frame = self._to_array(appsink.emit("pull-sample"))
+        if frame is not None:
+            self._publish(frame)
+        return Gst.FlowReturn.OK
+
+    def _on_still_sample(self, appsink):
+        frame = self._to_array(appsink.emit("pull-sample"))
+        # One frame per grab: close the valve again straight away
+        self._valve.set_property("drop", True)
+        if frame is not None:
+            with self._still_condition:
+                self._still = frame
+                self._still_sequence += 1
+                self._still_condition.notify_all()
+        return Gst.FlowReturn.OK
+
+    def _build(self):
+        self._pipeline = Gst.parse_launch(self._description())
+        self._valve = self._pipeline.get_by_name("still_valve")
+        self._pipeline.get_by_name("live").connect("new-sample", self._on_live_sample)
+        self._pipeline.get_by_name("still").connect("new-sample", self._on_still_sample)
+        self._pipeline.set_state(Gst.State.PLAYING)
+        logging.info(f"Capture pipeline started on {self.device}.")
+
+    def start(self):
+        """Start the pipeline and the thread that restarts it after errors."""
+        if self._running:
+            return
+        self._running = True
+        self._build()
+        self._watch_thread = threading.Thread(target=self._watch, name="capture-service", daemon=True)
+        self._watch_thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the pipeline and release the device."""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._watch_thread:
+            self._watch_thread.join(timeout)
+        if self._pipeline is not None:
+            self._pipeline.set_state(Gst.State.NULL)
+            self._pipeline = None
+
+    def _watch(self):
+        while self._running:
+            bus = self._pipeline.get_bus()
+            message = bus.timed_pop_filtered(500 * Gst.MSECOND, Gst.MessageType.ERROR | Gst.MessageType.EOS)
+            if message is None:
+                continue
+            if message.type == Gst.MessageType.ERROR:
+                error, _ = message.parse_error()
+                logging.error(f"Capture pipeline error: {error.message}; restarting.")
+            else:
+                logging.warning("Capture pipeline reached end of stream; restarting.")
+            self._pipeline.set_state(Gst.State.NULL)
+            time.sleep(self.retry_delay)
+            if self._running:
+                self._build()
+
+    def grab_still(self, timeout=5.0):
+        """
+        Capture one full-resolution frame from the running stream.
+        :param timeout: Maximum time to wait in seconds.
+        :return: BGR frame at `still_size`, or None on timeout.
+        """
+        with self._still_lock:
+            with self._still_condition:
+                sequence = self._still_sequence
+            self._valve.set_property("drop", False)
+            with self._still_condition:
+                self._still_condition.wait_for(lambda: self._still_sequence > sequence, timeout=timeout)
+                if self._still_sequence <= sequence:
+                    self._valve.set_property("drop", True)
+                    return None
+                return self._still
+
+
+def create_capture_service(backend="auto", device="/dev/video0", live_size=(640, 480),
+                           still_size=None, framerate=30):
+    """
+    Create and start the camera capture service.
+    :param backend: "gstreamer", "opencv" or "auto" (GStreamer when its bindings are installed).
+    :param device: V4L2 device path for GStreamer.
+    :param live_size: (width, height) of the live frames.
+    :param still_size: (width, height) of full-resolution stills (GStreamer only).
+    :param framerate: Camera frame rate (GStreamer only).
+    :return: A started CaptureService, or None if no camera could be opened.
+    """
+    if backend in ("auto", "gstreamer") and Gst is not None:
+        try:
+            service = GStreamerCaptureService(device, live_size, still_size, framerate)
+            service.start()
+            return service
+        except Exception as e:
+            logging.error(f"GStreamer capture failed ({e}); falling back to OpenCV.")
+    elif backend == "gstreamer":
+        logging.error("GStreamer is not available; falling back to OpenCV.")
+
+    from src.utils.camera import get_camera
+    camera = get_camera()
+    if camera is None:
+        return None
+    service = OpenCVCaptureService(camera)
+    service.start()
+    return service
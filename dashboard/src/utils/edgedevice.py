@@ -1,26 +1,158 @@
-import tflite_runtime.interpreter as tflite
+import os
+import weakref
+import numpy as np
 
-def load_models(models):
-    """Load all interpreters and labels."""
-    interpreters = {}
+# Edge TPU runtime library used for the delegate
+EDGETPU_LIBRARY = os.getenv("EDGETPU_LIBRARY", "/usr/lib/aarch64-linux-gnu/libedgetpu.so.1")
+
+# Input/output tensor details per interpreter, cached when the model is loaded
+_tensor_details = weakref.WeakKeyDictionary()
+
+# TFLite runtime, imported when the first model is loaded so that importing this
+# module (e.g. for get_tensor_details) works without tflite installed
+_tflite = None
+
+def get_tflite():
+    """
+    Import the TFLite runtime on first use.
+    :return: Tuple (interpreter module, load_delegate function).
+    """
+    global _tflite
+    if _tflite is None:
+        try:
+            import tflite_runtime.interpreter as tflite
+            _tflite = (tflite, tflite.load_delegate)
+        except ImportError:
+            # Full TensorFlow install (e.g. an x86 development box)
+            from tensorflow import lite as tflite
+            _tflite = (tflite, tflite.experimental.load_delegate)
+    return _tflite
+
+def get_tensor_details(interpreter):
+    """
+    Return the cached input and output tensor details of an interpreter.
+    :param interpreter: TFLite interpreter with allocated tensors.
+    :return: Tuple (input_details, output_details).
+    """
+    details = _tensor_details.get(interpreter)
+    if details is None:
+        details = (interpreter.get_input_details(), interpreter.get_output_details())
+        _tensor_details[interpreter] = details
+    return details
+
+def edgetpu_available():
+    """Return True if the Edge TPU delegate can be loaded."""
+    _, load_delegate = get_tflite()
+    try:
+        load_delegate(EDGETPU_LIBRARY)
+        return True
+    except (ValueError, OSError, RuntimeError):
+        return False
+
+def cpu_model_path(paths):
+    """
+    Return the CPU-compatible model for a model entry.
+
+    Edge TPU compiled models only run with the delegate, so the CPU backend
+    uses `cpu_model_path` if given, otherwise the same file name without the
+    `_edgetpu` suffix.
+    """
+    if paths.get("cpu_model_path"):
+        return paths["cpu_model_path"]
+    return paths["model_path"].replace("_edgetpu.tflite", ".tflite")
+
+def load_interpreter(paths, backend="edgetpu", num_threads=None):
+    """
+    Create an interpreter with allocated tensors for one model.
+    :param paths: Model entry with `model_path` (and optionally `cpu_model_path`).
+    :param backend: "edgetpu" or "cpu".
+    :param num_threads: Number of CPU threads for the CPU backend.
+    :return: TFLite interpreter.
+    """
+    tflite, load_delegate = get_tflite()
+    if backend == "edgetpu":
+        # Initialize the TensorFlow Lite interpreter with Edge TPU delegate
+        interpreter = tflite.Interpreter(
+            model_path=paths["model_path"],
+            experimental_delegates=[load_delegate(EDGETPU_LIBRARY)]
+        )
+    else:
+        interpreter = tflite.Interpreter(model_path=cpu_model_path(paths), num_threads=num_threads)
+    interpreter.allocate_tensors()  # Allocate memory for the model
+    get_tensor_details(interpreter)  # Cache tensor details for the frame loop
+    return interpreter
+
+def read_label_file(label_path):
+    """
+    Parse a label file once into a compact array of label names.
+
+    Lines of the form "<id> <name>" are placed at their id; other lines are
+    taken in file order. Whitespace is stripped here so the frame loop never
+    has to.
+    :param label_path: Path to the label file.
+    :return: NumPy object array of label names indexed by class id.
+    """
+    with open(label_path, "r") as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    entries = {}
+    for row, line in enumerate(lines):
+        pair = line.split(maxsplit=1)
+        if len(pair) == 2 and pair[0].isdigit():
+            entries[int(pair[0])] = pair[1].strip()
+        else:
+            entries[row] = line
+
+    table = np.full(max(entries) + 1 if entries else 0, "", dtype=object)
+    for index, name in entries.items():
+        table[index] = name
+    return table
+
+def load_labels(models):
+    """Load the label file of every model."""
     labels = {}
+    for category, paths in models.items():
+        try:
+            labels[category] = read_label_file(paths["label_path"])
+        except (OSError, ValueError) as e:
+            print(f"Error loading {category} labels: {e}")
+    return labels
+
+def load_models(models, backend="auto", num_threads=None, processes=0):
+    """
+    Load all interpreters and labels.
+    :param models: Dict of category -> model entry (`model_path`, `label_path`, optional `cpu_model_path`).
+    :param backend: "edgetpu", "cpu", "pool" (CPU interpreters spread over worker processes)
+                    or "auto" (Edge TPU if present, otherwise "pool" when `processes` > 1, else "cpu").
+    :param num_threads: Number of CPU threads per CPU interpreter.
+    :param processes: Number of worker processes for the "pool" backend.
+    :return: Tuple (interpreters, labels).
+    """
+    if backend == "auto":
+        if edgetpu_available():
+            backend = "edgetpu"
+        else:
+            backend = "pool" if processes > 1 else "cpu"
+            print(f"Edge TPU not available; using the {backend} backend.")
+
+    labels = load_labels(models)
+    models = {category: paths for category, paths in models.items() if category in labels}
 
+    if backend == "pool":
+        from src.utils.interpreter_pool import InterpreterPool
+        pool = InterpreterPool(models, processes=processes, num_threads=num_threads)
+        return pool.interpreters, labels
+
+    interpreters = {}
     for category, paths in models.items():
         try:
-            # Initialize the TensorFlow Lite interpreter with Edge TPU delegate
-            interpreter = tflite.Interpreter(
-                model_path=paths["model_path"],
-                experimental_delegates=[tflite.load_delegate('/usr/lib/aarch64-linux-gnu/libedgetpu.so.1')]
-            )
-            interpreter.allocate_tensors()  # Allocate memory for the model
-            interpreters[category] = interpreter
-
-            # Load the labels for the model
-            with open(paths["label_path"], "r") as f:
-                labels[category] = f.readlines()
-
-            print(f"Edge TPU Delegate loaded successfully for {category} detection.")
+            interpreters[category] = load_interpreter(paths, backend, num_threads)
+            if backend == "edgetpu":
+                print(f"Edge TPU Delegate loaded successfully for {category} detection.")
+            else:
+                print(f"CPU interpreter loaded successfully for {category} detection.")
         except Exception as e:
-            print(f"Error loading {category} model or labels: {e}")
+            print(f"Error loading {category} model: {e}")
 
-    return interpreters, labels
\ No newline at end of file
+    labels = {category: labels[category] for category in interpreters}
+    return interpreters, labels
@@ -0,0 +1,173 @@
+# src/utils/events.py
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+
+def format_event(event, data, event_id=None):
+    """
+    Format one server-sent event.
+    :param event: Event type (the `event:` field).
+    :param data: JSON-serializable payload.
+    :param event_id: Optional event id (the `id:` field).
+    :return: The event as a string ending in a blank line.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Subscription:
+    """Bounded per-client queue; a slow client loses its oldest events, not the newest."""
+
+    def __init__(self, events, queue_size):
+        self.events = set(events) if events else None
+        self._items = deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+
+    def put(self, item):
+        if self.events is not None and item[1] not in self.events:
+            return
+        with self._condition:
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items, timeout=timeout):
+                return None
+            return self._items.popleft()
+
+
+class EventBus:
+    """
+    Publish application events to server-sent-event subscribers.
+
+    Producers (the detector, the sensor sampler, the growth watcher) publish
+    once and every connected browser tab receives the event on its open
+    /events stream, so request volume follows how often data changes rather
+    than how many tabs are polling. The newest event of each type is kept
+    and replayed to new subscribers, so a tab renders current data without
+    a separate request.
+    """
+
+    def __init__(self, queue_size=100, heartbeat=15.0):
+        """
+        :param queue_size: Events buffered per subscriber before the oldest are dropped.
+        :param heartbeat: Seconds between keep-alive comments on an idle stream.
+        """
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers = []
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._closed = False
+
+    @property
+    def clients(self):
+        """Number of connected subscribers."""
+        return len(self._subscribers)
+
+    def subscribers(self, event):
+        """Number of connected subscribers that receive an event type."""
+        with self._lock:
+            return sum(1 for subscription in self._subscribers
+                       if subscription.events is None or event in subscription.events)
+
+    def publish(self, event, data):
+        """
+        Send an event to every subscriber.
+        :param event: Event type, e.g. "detections" or "sensor".
+        :param data: JSON-serializable payload.
+        """
+        with self._lock:
+            self._next_id += 1
+            item = (self._next_id, event, data)
+            self._latest[event] = item
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(item)
+
+    def latest(self, event):
+        """Return the payload of the newest event of a type, or None."""
+        item = self._latest.get(event)
+        return item[2] if item else None
+
+    def stream(self, events=None):
+        """
+        Yield server-sent-event chunks for one HTTP client.
+        :param events: Optional list of event types to receive (all types if None).
+        """
+        subscription = _Subscription(events, self.queue_size)
+        with self._lock:
+            replay = sorted(item for event, item in self._latest.items()
+                            if subscription.events is None or event in subscription.events)
+            self._subscribers.append(subscription)
+        logging.info(f"Event client connected ({self.clients} active).")
+        try:
+            # Ask the browser to reconnect after 3 s if the connection drops
+            yield "retry: 3000\n\n"
+            for event_id, event, data in replay:
+                yield format_event(event, data, event_id)
+            while not self._closed:
+                item = subscription.get(self.heartbeat)
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id, event, data = item
+                yield format_event(event, data, event_id)
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscription)
+            logging.info(f"Event client disconnected ({self.clients} active).")
+
+    def close(self):
+        """End every open stream at its next event or heartbeat."""
+        self._closed = True
+
+
+class PeriodicTask:
+    """Background thread that calls a function at a fixed rate."""
+
+    def __init__(self, name, interval, func):
+        """
+        :param name: Thread name, used in log messages.
+        :param interval: Seconds between calls.
+        :param func: Callable run without arguments.
+        """
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.func()
+            except Exception as e:
+                logging.error(f"Error in periodic task '{self.name}': {e}")
+            # Schedule from the previous deadline so the rate does not drift
+            next_run = max(next_run + self.interval, time.monotonic())
+            self._stop.wait(next_run - time.monotonic())
@@ -0,0 +1,247 @@
+# src/utils/image_writer.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from src.utils.metrics import counter, gauge, histogram
+
+# Codec name -> (file extension, default options)
+CODECS = {
+    "png": (".png", {"compression": 3}),
+    "jpeg": (".jpg", {"quality": 95}),
+    "webp": (".webp", {"quality": 90}),
+}
+
+IMAGE_ENCODE_SECONDS = histogram("rootdash_image_encode_seconds", "Still image encode time.", ("codec",))
+IMAGE_WRITE_SECONDS = histogram("rootdash_image_write_seconds", "Still image disk write time (including fsync).", ("codec",))
+IMAGE_BYTES = counter("rootdash_image_bytes_total", "Bytes of still images written.", ("codec",))
+IMAGE_FAILURES = counter("rootdash_image_write_failures_total", "Still images that could not be saved.")
+IMAGE_PENDING = gauge("rootdash_image_writer_pending", "Still images queued or being written.")
+
+
+def codec_extension(codec):
+    """Return the file extension of a codec."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown image codec: {codec}")
+    return CODECS[codec][0]
+
+
+def encode_image(image, codec="png", **options):
+    """
+    Encode an image in memory.
+    :param image: BGR image (NumPy array).
+    :param codec: "png", "jpeg" or "webp".
+    :param options: compression (png, 0-9), quality (jpeg/webp, 1-100), lossless (webp).
+    :return: Encoded bytes.
+    """
+    extension, defaults = CODECS[codec]
+    options = {**defaults, **options}
+    if codec == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, int(options["compression"])]
+    elif codec == "jpeg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(options["quality"])]
+    else:
+        # OpenCV writes lossless WebP for any quality above 100
+        params = [cv2.IMWRITE_WEBP_QUALITY, 101 if options.get("lossless") else int(options["quality"])]
+    success, buffer = cv2.imencode(extension, image, params)
+    if not success:
+        raise RuntimeError(f"Failed to encode image as {codec}")
+    return buffer.tobytes()
+
+
+class ImageWriter:
+    """
+    Encode and save still images on a bounded background worker pool.
+
+    The capturing thread only hands over the frame; encoding (which releases
+    the GIL) and the disk write happen on the workers. Files are written to
+    a temporary name and renamed, so readers never see a partial image.
+    With `fsync` the data is flushed to the card before the write counts as
+    done; `sync_batch` > 1 defers those flushes and syncs that many files at
+    once to spare the SD card, but never for longer than `max_sync_delay`.
+    """
+
+    def __init__(self, workers=2, max_pending=16, fsync=False, sync_batch=1, index=None, max_sync_delay=60.0):
+        """
+        :param workers: Number of encode/write threads.
+        :param max_pending: Maximum images queued or in progress; `submit` waits for room beyond that.
+        :param fsync: Flush every file (and its directory) to disk.
+        :param sync_batch: With `fsync`, number of files synced together.
+        :param index: Optional CaptureIndex that every saved image (not archive copies) is recorded in.
+        :param max_sync_delay: With `sync_batch` > 1, seconds after which an incomplete batch is synced
+                               anyway (time-lapse captures can be hours apart).
+        """
+        self.index = index
+        self.fsync = fsync
+        self.sync_batch = max(int(sync_batch), 1)
+        self.max_sync_delay = max_sync_delay
+        self._sync_timer = None
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._unsynced = []
+        self._pending = 0
+        self.written = 0
+        self.failed = 0
+        self.bytes_written = 0
+        IMAGE_PENDING.set_function(lambda: self._pending)
+
+    @property
+    def pending(self):
+        """Number of images queued or being written."""
+        return self._pending
+
+    def submit(self, image, path, codec="png", options=None, archive_path=None, archive_codec="png",
+               callback=None, timeout=None):
+        """
+        Queue an image for saving.
+        :param image: BGR image (NumPy array); it must not be modified afterwards.
+        :param path: Destination path without extension (the codec's extension is added).
+        :param codec: "png", "jpeg" or "webp".
+        :param options: Codec options (see `encode_image`).
+        :param archive_path: Optional path (without extension) for an additional lossless copy.
+        :param archive_codec: Codec of the archive copy ("png", or "webp" which is written lossless).
+        :param callback: Optional `callback(success, paths_or_error)` run on the worker when done.
+        :param timeout: Maximum seconds to wait for room in the queue (None waits indefinitely).
+        :return: A Future resolving to the list of written paths, or None if the queue stayed full.
+        """
+        codec_extension(codec)
+        if not self._slots.acquire(timeout=timeout):
+            logging.error("Image writer queue is full; image dropped.")
+            IMAGE_FAILURES.inc()
+            return None
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(self._save, image, path, codec, options or {},
+                                     archive_path, archive_codec, callback)
+
+    def _save(self, image, path, codec, options, archive_path, archive_codec, callback):
+        try:
+            targets = [(path, codec, options)]
+            if archive_path:
+                targets.append((archive_path, archive_codec, {"lossless": True, "compression": 3}))
+            paths = [self._write(image, target, target_codec, target_options, index=(i == 0))
+                     for i, (target, target_codec, target_options) in enumerate(targets)]
+            result = (True, paths)
+            return paths
+        except Exception as e:
+            logging.error(f"Error saving image {path}: {e}")
+            self.failed += 1
+            IMAGE_FAILURES.inc()
+            result = (False, str(e))
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            if callback is not None:
+                try:
+                    callback(*result)
+                except Exception as e:
+                    logging.error(f"Error in image writer callback: {e}")
+
+    def _write(self, image, path, codec, options, index=False):
+        start = time.perf_counter()
+        data = encode_image(image, codec, **options)
+        IMAGE_ENCODE_SECONDS.observe(time.perf_counter() - start, codec=codec)
+
+        start = time.perf_counter()
+        final_path = path + codec_extension(codec)
+        directory = os.path.dirname(final_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = final_path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+            if self.fsync and self.sync_batch == 1:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temporary, final_path)
+        if self.fsync:
+            self._sync(final_path)
+        IMAGE_WRITE_SECONDS.observe(time.perf_counter() - start, codec=codec)
+
+        IMAGE_BYTES.inc(len(data), codec=codec)
+        with self._lock:
+            self.written += 1
+            self.bytes_written += len(data)
+        logging.info(f"Saved {final_path} ({len(data) / 1024:.0f} KiB)")
+        if index and self.index is not None:
+            try:
+                self.index.add_file(final_path, hashlib.sha256(data).hexdigest())
+            except Exception as e:
+                logging.error(f"Error indexing {final_path}: {e}")
+        return final_path
+
+    def _sync(self, path):
+        """Sync a written file (and its directory), or batch it with the next ones."""
+        with self._lock:
+            self._unsynced.append(path)
+            if len(self._unsynced) < self.sync_batch:
+                if self._sync_timer is None:
+                    self._sync_timer = threading.Timer(self.max_sync_delay, self.flush)
+                    self._sync_timer.daemon = True
+                    self._sync_timer.start()
+                return
+            paths, self._unsynced = self._unsynced, []
+            self._cancel_sync_timer()
+        self._sync_paths(paths)
+
+    def _cancel_sync_timer(self):
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+    def _sync_paths(self, paths):
+        directories = set()
+        for path in paths:
+            if self.sync_batch > 1:
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError as e:
+                    logging.error(f"Error syncing {path}: {e}")
+            directories.add(os.path.dirname(path) or ".")
+        # The rename is only durable once the directory entry is synced
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+    def flush(self):
+        """Sync any files still waiting for a batched fsync."""
+        with self._lock:
+            paths, self._unsynced = self._unsynced, []
+            self._cancel_sync_timer()
+        if paths:
+            self._sync_paths(paths)
+
+    def close(self, wait=True):
+        """Finish the queued writes, stop the workers and sync the remaining files."""
+        self._executor.shutdown(wait=wait)
+        self.flush()
+
+    def stats(self):
+        """Return queue depth and write counters."""
+        return {
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "written": self.written,
+            "failed": self.failed,
+            "bytes_written": self.bytes_written,
+            "unsynced": len(self._unsynced),
+        }
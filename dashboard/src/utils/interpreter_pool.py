@@ -0,0 +1,132 @@
+# src/utils/interpreter_pool.py
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.utils.edgedevice import load_interpreter, get_tensor_details
+
+# Interpreters owned by the current worker process
+_worker_interpreters = {}
+
+
+def _init_worker(models, num_threads):
+    """Load this worker's share of the models once, when the process starts."""
+    for category, paths in models.items():
+        _worker_interpreters[category] = load_interpreter(paths, "cpu", num_threads)
+
+
+def _worker_details(category):
+    return get_tensor_details(_worker_interpreters[category])
+
+
+def _worker_invoke(category, input_data):
+    interpreter = _worker_interpreters[category]
+    input_details, output_details = get_tensor_details(interpreter)
+    interpreter.set_tensor(input_details[0]['index'], input_data)
+    interpreter.invoke()
+    return interpreter.get_tensor(output_details[0]['index'])
+
+
+class RemoteInterpreter:
+    """
+    Interpreter-like proxy for a model that lives in a pool worker.
+
+    It exposes the parts of the TFLite interpreter API the frame pipeline
+    uses. `invoke()` only submits the job, and reading the output tensor
+    waits for it, so invoking several categories back to back runs them in
+    parallel across the worker processes.
+    """
+
+    def __init__(self, executor, category, input_details, output_details):
+        self._executor = executor
+        self._category = category
+        self._input_details = input_details
+        self._output_details = output_details
+        self._input_index = input_details[0]['index']
+        self._input = np.zeros(input_details[0]['shape'], dtype=input_details[0]['dtype'])
+        self._future = None
+        self._output = None
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return self._input_details
+
+    def get_output_details(self):
+        return self._output_details
+
+    def set_tensor(self, index, value):
+        np.copyto(self._input, value)
+
+    def invoke(self):
+        # The input is copied because it is pickled after submit() returns
+        self._future = self._executor.submit(_worker_invoke, self._category, self._input.copy())
+        self._output = None
+
+    def _result(self):
+        if self._output is None and self._future is not None:
+            self._output = self._future.result()
+        return self._output
+
+    def tensor(self, index):
+        if index == self._input_index:
+            return lambda: self._input
+        return self._result
+
+    def get_tensor(self, index):
+        if index == self._input_index:
+            return self._input.copy()
+        return self._result().copy()
+
+
+class InterpreterPool:
+    """
+    Spread CPU interpreters over a pool of worker processes.
+
+    Categories are assigned round-robin to single-process executors, so each
+    model is loaded once and every core can run inference at the same time.
+    This is the fallback when the Edge TPU is missing or busy, and lets the
+    same pipeline run on a plain Linux box.
+    """
+
+    def __init__(self, models, processes=None, num_threads=1):
+        """
+        :param models: Dict of category -> model entry (see `load_models`).
+        :param processes: Number of worker processes (defaults to the number of cores).
+        :param num_threads: Number of CPU threads per interpreter.
+        """
+        processes = max(1, min(processes or os.cpu_count() or 1, len(models)))
+        shares = [{} for _ in range(processes)]
+        for i, (category, paths) in enumerate(models.items()):
+            shares[i % processes][category] = paths
+
+        # The pool is usually created on a warm-up thread while other threads run,
+        # and forking a multithreaded process can deadlock the child on a lock
+        # held by another thread. Workers are therefore started by a fork server,
+        # which only preloads this module (not app.py) and has no other threads.
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        self.executors = []
+        self.interpreters = {}
+        for share in shares:
+            executor = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                           initargs=(share, num_threads))
+            self.executors.append(executor)
+            for category in share:
+                try:
+                    input_details, output_details = executor.submit(_worker_details, category).result()
+                except Exception as e:
+                    logging.error(f"Error loading {category} model in worker process: {e}")
+                    continue
+                self.interpreters[category] = RemoteInterpreter(executor, category, input_details, output_details)
+
+        logging.info(f"Interpreter pool started with {processes} processes for {list(self.interpreters)}.")
+
+    def close(self):
+        """Shut down every worker process."""
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,59 @@
+# src/utils/jpeg.py
+import logging
+
+import cv2
+import numpy as np
+
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+# Use simplejpeg (libjpeg-turbo) when it is installed; set to False to force OpenCV
+USE_SIMPLEJPEG = simplejpeg is not None
+
+
+def encode_jpeg(frame, quality=80):
+    """
+    Encode a BGR frame to JPEG.
+    :param frame: BGR frame (NumPy array).
+    :param quality: JPEG quality (1-100).
+    :return: JPEG bytes, or None if encoding failed.
+    """
+    try:
+        if USE_SIMPLEJPEG and simplejpeg is not None:
+            return simplejpeg.encode_jpeg(
+                np.ascontiguousarray(frame), quality=quality,
+                colorspace="BGR", colorsubsampling="420", fastdct=True
+            )
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes() if ret else None
+    except Exception as e:
+        logging.error(f"Error encoding JPEG: {e}")
+        return None
+
+
+def encode_jpeg_i420(yuv, quality=80):
+    """
+    Encode an I420 (YUV 4:2:0 planar) frame to JPEG without converting to BGR.
+
+    Sources that already deliver I420 skip the colour conversion entirely
+    with simplejpeg; OpenCV needs a BGR frame, so it converts first.
+    :param yuv: I420 frame as a (height * 3 / 2, width) uint8 array.
+    :param quality: JPEG quality (1-100).
+    :return: JPEG bytes, or None if encoding failed.
+    """
+    height = yuv.shape[0] * 2 // 3
+    width = yuv.shape[1]
+    if not (USE_SIMPLEJPEG and simplejpeg is not None):
+        return encode_jpeg(cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420), quality)
+    try:
+        flat = yuv.reshape(-1)
+        chroma = (height // 2) * (width // 2)
+        y = flat[:height * width].reshape(height, width)
+        u = flat[height * width:height * width + chroma].reshape(height // 2, width // 2)
+        v = flat[height * width + chroma:height * width + 2 * chroma].reshape(height // 2, width // 2)
+        return simplejpeg.encode_jpeg_yuv_planes(y, u, v, quality=quality, fastdct=True)
+    except Exception as e:
+        logging.error(f"Error encoding JPEG: {e}")
+        return None
@@ -0,0 +1,277 @@
+# src/utils/metrics.py
+import bisect
+import math
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond encodes to multi-second DB queries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for a named metric with optional labels."""
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def set_function(self, func, **labels):
+        """Read the value from `func()` whenever the metric is collected."""
+        with self._lock:
+            self._functions[self._key(labels)] = func
+
+    def samples(self):
+        """Return a list of (label values, value) pairs."""
+        with self._lock:
+            samples = dict(self._values)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            try:
+                samples[key] = float(func())
+            except Exception:
+                continue
+        return sorted(samples.items())
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. dropped frames or failed connects."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. connected clients or queue depth."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class _Timer:
+    """Context manager that observes its elapsed time on a histogram."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in fixed buckets.
+
+    Observing is a bisect and a few additions under a lock, cheap enough to
+    time every frame. Quantiles for the JSON view are estimated from the
+    buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Return a context manager that observes the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            return sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+
+    def quantile(self, q, counts, count):
+        """Estimate the q-quantile from bucket counts by linear interpolation."""
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            if bound != math.inf:
+                lower = bound
+        return lower
+
+
+class Registry:
+    """Collection of metrics rendered by the /metrics endpoints."""
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in metric.samples():
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets, counts):
+                    cumulative += bucket_count
+                    le = (("le", "+Inf" if bound == math.inf else repr(bound)),)
+                    lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, key, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(metric.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{_format_labels(metric.labelnames, key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        """
+        Return every metric as a JSON-friendly dictionary.
+        :return: Dict of metric name -> {"type", "help", "values"}; histogram values carry
+                 count, sum, mean and estimated p50/p90/p99 instead of buckets.
+        """
+        data = {}
+        for metric in self.metrics():
+            values = []
+            for key, value in metric.samples():
+                entry = {"labels": dict(zip(metric.labelnames, key))}
+                if metric.kind == "histogram":
+                    counts, total, count = value
+                    entry.update({
+                        "count": count,
+                        "sum": total,
+                        "mean": total / count if count else None,
+                        "p50": metric.quantile(0.5, counts, count),
+                        "p90": metric.quantile(0.9, counts, count),
+                        "p99": metric.quantile(0.99, counts, count),
+                    })
+                else:
+                    entry["value"] = value
+                values.append(entry)
+            data[metric.name] = {"type": metric.kind, "help": metric.documentation, "values": values}
+        return data
+
+
+# Process-wide default registry
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    """Return the counter `name` from the default registry, creating it if needed."""
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    """Return the gauge `name` from the default registry, creating it if needed."""
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Return the histogram `name` from the default registry, creating it if needed."""
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+# Metrics shared by the vision pipeline and the web app
+STAGE_SECONDS = histogram("rootdash_stage_seconds", "Time spent in each frame processing stage.", ("stage",))
+INFERENCE_SECONDS = histogram("rootdash_inference_seconds", "Model invoke and decode time per category.", ("category",))
+FRAMES_DROPPED = counter("rootdash_frames_dropped_total", "Frames discarded by a full pipeline queue.", ("queue",))
+CAPTURE_FAILURES = counter("rootdash_capture_failures_total", "Failed camera reads.")
+QUEUE_DEPTH = gauge("rootdash_queue_depth", "Frames waiting in each pipeline queue.", ("queue",))
+STREAM_CLIENTS = gauge("rootdash_stream_clients", "Connected /video_feed clients.")
+DB_QUERY_SECONDS = histogram("rootdash_db_query_seconds", "Database connect and query time.", ("query",))
+DB_CONNECT_FAILURES = counter("rootdash_db_connect_failures_total", "Failed database connections.")
+HTTP_REQUEST_SECONDS = histogram("rootdash_http_request_seconds", "Flask request handling time.",
+                                 ("endpoint", "method", "status"))
+TASK_SECONDS = histogram("rootdash_task_seconds", "Duration of photo captures and analysis runs.", ("task",))
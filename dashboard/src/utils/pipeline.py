@@ -0,0 +1,178 @@
+# src/utils/pipeline.py
+import threading
+import logging
+import time
+from collections import deque
+
+from src.utils.metrics import STAGE_SECONDS, FRAMES_DROPPED, CAPTURE_FAILURES, QUEUE_DEPTH
+
+
+class LatestQueue:
+    """
+    Bounded hand-off queue between pipeline stages.
+
+    When the queue is full the oldest item is discarded, so a slow consumer
+    always picks up the newest frame instead of working through a backlog
+    of stale ones.
+    """
+
+    def __init__(self, maxsize=1, name=None):
+        """
+        :param maxsize: Maximum number of items held before the oldest is dropped.
+        :param name: Queue name used for the dropped-frame metric.
+        """
+        self.name = name
+        self._items = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full."""
+        with self._condition:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                FRAMES_DROPPED.inc(queue=self.name)
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item.
+        :param timeout: Maximum time to wait in seconds.
+        :return: The item, or None on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items, timeout=timeout):
+                return None
+            return self._items.popleft()
+
+
+class _Stage:
+    """Worker thread that applies one step of the pipeline."""
+
+    def __init__(self, name, work, source, sink, stop_event):
+        self.name = name
+        self.work = work
+        self.source = source
+        self.sink = sink
+        self.stop_event = stop_event
+        self.processed = 0
+        self.last_duration = 0.0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-{self.name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            item = self.source.get(timeout=0.5)
+            if item is None:
+                continue
+            start = time.perf_counter()
+            try:
+                result = self.work(item)
+            except Exception as e:
+                logging.error(f"Error in pipeline stage '{self.name}': {e}")
+                continue
+            self.last_duration = time.perf_counter() - start
+            self.processed += 1
+            if result is not None and self.sink is not None:
+                self.sink.put(result)
+
+
+class DetectionPipeline:
+    """
+    Staged capture -> motion -> inference -> annotate pipeline.
+
+    Every stage runs on its own thread and hands frames to the next stage
+    through a LatestQueue, so TPU inference, CPU motion detection and
+    drawing overlap; JPEG encoding happens per stream tier in the
+    broadcaster. Displayed latency is bounded by the slowest stage
+    rather than the sum of all of them, and stale frames are dropped instead
+    of piling up behind a busy stage.
+    """
+
+    def __init__(self, camera, detector, broadcaster, queue_size=1, retry_delay=1.0):
+        """
+        :param camera: Object with a cv2.VideoCapture-style `read()` method.
+        :param detector: ObjectDetector used for the motion, inference and annotation steps.
+        :param broadcaster: FrameBroadcaster that receives the annotated frames.
+        :param queue_size: Capacity of each inter-stage queue.
+        :param retry_delay: Seconds to wait after a failed camera read.
+        """
+        self.camera = camera
+        self.detector = detector
+        self.broadcaster = broadcaster
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._capture_thread = None
+
+        self.queues = {
+            name: LatestQueue(queue_size, name=name) for name in ("motion", "inference", "annotate")
+        }
+        for name, queue in self.queues.items():
+            QUEUE_DEPTH.set_function(queue.__len__, queue=name)
+        self.stages = [
+            _Stage("motion", self._motion, self.queues["motion"], self.queues["inference"], self._stop),
+            _Stage("inference", self._inference, self.queues["inference"], self.queues["annotate"], self._stop),
+            _Stage("annotate", self._annotate, self.queues["annotate"], None, self._stop),
+        ]
+
+    def start(self):
+        """Start the capture thread and every stage worker."""
+        if self._capture_thread and self._capture_thread.is_alive():
+            return
+        if self.camera is None:
+            logging.error("No camera available; detection pipeline not started.")
+            return
+        self._stop.clear()
+        self._capture_thread = threading.Thread(target=self._capture, name="pipeline-capture", daemon=True)
+        self._capture_thread.start()
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the capture thread and every stage worker."""
+        self._stop.set()
+        for thread in [self._capture_thread] + [stage.thread for stage in self.stages]:
+            if thread and thread.is_alive():
+                thread.join(timeout)
+
+    def stats(self):
+        """Return per-stage throughput, latency and queue statistics."""
+        return {
+            stage.name: {
+                "processed": stage.processed,
+                "last_duration": stage.last_duration,
+                "queue_depth": len(stage.source),
+                "dropped": stage.source.dropped,
+            }
+            for stage in self.stages
+        }
+
+    def _capture(self):
+        while not self._stop.is_set():
+            with STAGE_SECONDS.time(stage="capture"):
+                success, frame = self.camera.read()
+            if not success:
+                CAPTURE_FAILURES.inc()
+                logging.warning("Failed to read frame from camera; retrying.")
+                time.sleep(self.retry_delay)
+                continue
+            self.queues["motion"].put((time.time(), frame))
+
+    def _motion(self, item):
+        captured_at, frame = item
+        return captured_at, frame, self.detector.detect_motion(frame)
+
+    def _inference(self, item):
+        captured_at, frame, boxes = item
+        return captured_at, frame, boxes, self.detector.classify(frame, boxes)
+
+    def _annotate(self, item):
+        captured_at, frame, boxes, detections = item
+        self.broadcaster.publish(self.detector.annotate(frame, boxes, detections), captured_at)
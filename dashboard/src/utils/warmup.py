@@ -0,0 +1,106 @@
+# src/utils/warmup.py
+import threading
+import logging
+import time
+
+
+class Warmup:
+    """
+    Run named startup tasks (heavy imports, model loading, camera setup) and
+    report their readiness.
+
+    Tasks run in the order they were added, either inline, on a background
+    thread, or lazily the first time something waits for one of them. A
+    failing task is recorded instead of raised, so a missing camera or TPU
+    only disables the routes that need it. Each task's duration is kept for
+    the startup-time breakdown.
+    """
+
+    def __init__(self):
+        self._tasks = []
+        self._status = {}
+        self._events = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._created_at = time.perf_counter()
+        self._timings = {}
+
+    def add(self, name, func, requires=()):
+        """
+        Register a startup task.
+        :param name: Task name.
+        :param func: Callable run without arguments; its return value is kept as the result.
+        :param requires: Names of tasks that must succeed before this one runs.
+        """
+        self._tasks.append((name, func, tuple(requires)))
+        self._status[name] = {"state": "pending", "duration": None, "error": None}
+        self._events[name] = threading.Event()
+
+    def record(self, name, duration):
+        """Record the duration of a startup step that ran outside the task list (e.g. imports)."""
+        self._timings[name] = duration
+
+    def start(self, background=True):
+        """
+        Run the registered tasks once.
+        :param background: Run them on a daemon thread instead of blocking the caller.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            if background:
+                self._thread.start()
+        if not background:
+            self._thread.run()
+
+    def ready(self, name):
+        """Return True if the task finished successfully."""
+        return self._status.get(name, {}).get("state") == "ready"
+
+    def wait(self, name, timeout=None):
+        """
+        Wait for a task, starting the warm-up if nothing has started it yet.
+        :param name: Task name.
+        :param timeout: Maximum time to wait in seconds.
+        :return: True if the task finished successfully.
+        """
+        self.start()
+        self._events[name].wait(timeout)
+        return self.ready(name)
+
+    def result(self, name):
+        """Return the value returned by a finished task, or None."""
+        return self._results.get(name)
+
+    def status(self):
+        """Return readiness and the startup-time breakdown."""
+        return {
+            "ready": all(status["state"] == "ready" for status in self._status.values()),
+            "started": self._thread is not None,
+            "uptime": time.perf_counter() - self._created_at,
+            "timings": dict(self._timings),
+            "tasks": {name: dict(status) for name, status in self._status.items()},
+        }
+
+    def _run(self):
+        for name, func, requires in self._tasks:
+            status = self._status[name]
+            missing = [required for required in requires if not self.ready(required)]
+            if missing:
+                status.update(state="skipped", error=f"Requires {', '.join(missing)}")
+                self._events[name].set()
+                continue
+
+            status["state"] = "running"
+            start = time.perf_counter()
+            try:
+                self._results[name] = func()
+                status["state"] = "ready"
+            except Exception as e:
+                logging.error(f"Startup task '{name}' failed: {e}")
+                status.update(state="failed", error=str(e))
+            status["duration"] = time.perf_counter() - start
+            logging.info(f"Startup task '{name}' {status['state']} in {status['duration']:.2f}s.")
+            self._events[name].set()
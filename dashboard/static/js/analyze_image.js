@@ -1,3 +1,20 @@
+const POLL_INTERVAL_MS = 1000;
+
+// Wait for a queued analysis job to finish and return its final status
+async function waitForJob(statusUrl) {
+    while (true) {
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.message);
+        }
+        if (job.state === "done" || job.state === "failed") {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+    }
+}
+
 async function analyzeImages() {
     console.log("Analyze button clicked!"); // Debugging
     try {
@@ -9,10 +26,16 @@ async function analyzeImages() {
         });
 
         const result = await response.json();
-        if (response.ok) {
-            alert("Analysis successful!\n" + result.message);
-        } else {
+        if (!response.ok) {
             alert("Analysis failed!\n" + result.message);
+            return;
+        }
+
+        const job = await waitForJob(result.status_url);
+        if (job.state === "done") {
+            alert("Analysis successful!\n" + `Analyzed ${job.result.analyzed} image(s).`);
+        } else {
+            alert("Analysis failed!\n" + job.error);
         }
     } catch (error) {
         alert("Error calling the API: " + error.message);
@@ -21,16 +21,25 @@ export async function updateDetectionData() {
     try {
         const response = await fetch(endpoints.inferenceData);
         if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
-        const data = await response.json();
+        await renderDetectionData(await response.json());
+    } catch (error) {
+        console.error("Error updating detection data:", error);
+    }
+}
+
+// Display the last detections (from a fetch or a "detections" event)
+export async function renderDetectionData(data) {
+    try {
+        if (data.length === 0) return;
 
         // Find the detection with the highest confidence score
         const highestConfidenceDetection = data.reduce((prev, current) =>
             prev.confidence > current.confidence ? prev : current
         );
 
-        // Highlight the detection insights box if confidence > 230
+        // Highlight the detection insights box if confidence > 90%
         const detectionInsightsBox = document.getElementById("detection-insights-box");
-        if (highestConfidenceDetection.confidence > 230) {
+        if (highestConfidenceDetection.confidence > 0.9) {
             detectionInsightsBox.classList.add("highlight");
         } else {
             detectionInsightsBox.classList.remove("highlight");
@@ -45,7 +54,7 @@ export async function updateDetectionData() {
 				
 			
                 <div class="content">
-                    <h6>Breaking: ${highestConfidenceDetection.label} detected with ${highestConfidenceDetection.confidence.toFixed(2)} confidence!</h6>
+                    <h6>Breaking: ${highestConfidenceDetection.label} detected with ${(highestConfidenceDetection.confidence * 100).toFixed(1)}% confidence!</h6>
                     <p>Did you know? ${highestConfidenceDetection.label} is a fascinating species!</p>
                     <p>Stay tuned for more updates on detected objects in your environment.</p>
                 </div>
@@ -64,12 +73,12 @@ export async function updateDetectionData() {
                 <tr>
                     <td>${detection.category}</td>
                     <td>${detection.label}</td>
-                    <td>${detection.confidence.toFixed(2)}</td>
+                    <td>${(detection.confidence * 100).toFixed(1)}%</td>
                 </tr>
             `
             )
             .join("");
     } catch (error) {
-        console.error("Error updating detection data:", error);
+        console.error("Error displaying detection data:", error);
     }
 }
\ No newline at end of file
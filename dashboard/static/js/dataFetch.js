@@ -1,10 +1,30 @@
-import { fetchSensorData } from './dataSensor.js';
+import { fetchSensorData, renderSensorData } from './dataSensor.js';
 import { fetchGrowthRateData, fetchGrowthGraph, fetchSeasonalStatus } from './dataGrowth.js';
 import { fetchHarvestScheduler } from './dataHarvest.js';
-import { updateDetectionData } from './dataDetection.js';
+import { updateDetectionData, renderDetectionData } from './dataDetection.js';
+import { subscribeToEvents } from './events.js';
 
-// Periodically fetch and update data
+// Refresh everything derived from the growth data
+function fetchGrowthData() {
+    fetchGrowthRateData();
+    fetchGrowthGraph();
+    fetchSeasonalStatus();
+    fetchHarvestScheduler();
+}
+
+// Fetch the data once, then update it from server-pushed events
 export function startDataFetching() {
+    // Initial data fetch
+    fetchGrowthData();
+
+    const subscribed = subscribeToEvents({
+        sensor: renderSensorData,
+        detections: renderDetectionData,
+        growth: fetchGrowthData,
+    });
+    if (subscribed) return;
+
+    // No EventSource support: fall back to polling
     setInterval(fetchSensorData, 2000);
     setInterval(fetchGrowthRateData, 5000);
     setInterval(fetchGrowthGraph, 5000);
@@ -12,11 +32,6 @@ export function startDataFetching() {
     setInterval(fetchHarvestScheduler, 10000);
     setInterval(updateDetectionData, 2000);
 
-    // Initial data fetch
     fetchSensorData();
-    fetchGrowthRateData();
-    fetchGrowthGraph();
-    fetchSeasonalStatus();
-    fetchHarvestScheduler();
     updateDetectionData();
 }
\ No newline at end of file
@@ -0,0 +1,23 @@
+import { endpoints } from './routing.js';
+
+// Subscribe once to the server-sent event stream. `handlers` maps event
+// types ("detections", "sensor", "growth") to callbacks that receive the
+// parsed payload. Returns false if the browser has no EventSource support.
+export function subscribeToEvents(handlers) {
+    if (!window.EventSource) return false;
+
+    const source = new EventSource(endpoints.events);
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, (event) => {
+            try {
+                handler(JSON.parse(event.data));
+            } catch (error) {
+                console.error(`Error handling ${type} event:`, error);
+            }
+        });
+    });
+
+    // The browser reconnects on its own; just note when the stream drops
+    source.onerror = () => console.warn("Event stream disconnected; reconnecting...");
+    return true;
+}
\ No newline at end of file
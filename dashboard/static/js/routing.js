@@ -5,5 +5,6 @@ export const endpoints = {
     harvestScheduler: "/harvest_scheduler",
     growthGraph: "/growth_graph",
     sensorData: "/sensor_data",
-    inferenceData: "/inference_data"
+    inferenceData: "/inference_data",
+    events: "/events"
 };
\ No newline at end of file
@@ -137,15 +137,16 @@ async function updateDetectionData() {
         const response = await fetch(endpoints.inferenceData);
         if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
         const data = await response.json();
+        if (data.length === 0) return;
 
         // Find the detection with the highest confidence score
         const highestConfidenceDetection = data.reduce((prev, current) =>
             prev.confidence > current.confidence ? prev : current
         );
 
-        // Highlight the detection insights box if confidence > 30
+        // Highlight the detection insights box if confidence > 90%
         const detectionInsightsBox = document.getElementById("detection-insights-box");
-        if (highestConfidenceDetection.confidence > 30) {
+        if (highestConfidenceDetection.confidence > 0.9) {
             detectionInsightsBox.classList.add("highlight");
         } else {
             detectionInsightsBox.classList.remove("highlight");
@@ -159,7 +160,7 @@ async function updateDetectionData() {
             <div class="insight-card">
                 <img src="${imageUrl}" alt="${highestConfidenceDetection.label}">
                 <div class="content">
-                    <h4>Breaking: ${highestConfidenceDetection.label} detected with ${highestConfidenceDetection.confidence.toFixed(2)} confidence!</h4>
+                    <h4>Breaking: ${highestConfidenceDetection.label} detected with ${(highestConfidenceDetection.confidence * 100).toFixed(1)}% confidence!</h4>
                     <p>Did you know? ${highestConfidenceDetection.label} is a fascinating species!</p>
                     <p>Stay tuned for more updates on detected objects in your environment.</p>
                 </div>
@@ -178,7 +179,7 @@ async function updateDetectionData() {
                 <tr>
                     <td>${detection.category}</td>
                     <td class="label-small-font">${detection.label}</td>
-                    <td>${detection.confidence.toFixed(2)}</td>
+                    <td>${(detection.confidence * 100).toFixed(1)}%</td>
                 </tr>
             `
             )
@@ -203,18 +204,5 @@ function takeSnapshot() {
     link.click();
 }
 
-// Periodically fetch and update data
-setInterval(fetchSensorData, 2000);
-setInterval(fetchGrowthRateData, 5000);
-setInterval(fetchGrowthGraph, 5000);
-setInterval(fetchSeasonalStatus, 10000);
-setInterval(fetchHarvestScheduler, 10000);
-setInterval(updateDetectionData, 2000);
-
-// Initial data fetch
-fetchSensorData();
-fetchGrowthRateData();
-fetchGrowthGraph();
-fetchSeasonalStatus();
-fetchHarvestScheduler();
-updateDetectionData();
\ No newline at end of file
+// Data is fetched and kept up to date by dataFetch.js (started from main.js);
+// polling here as well would double every request
\ No newline at end of file